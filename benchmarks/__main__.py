@@ -0,0 +1,122 @@
+"""
+Benchmark suite for the TEA pipeline.
+
+Run from the repository root:
+
+    python -m benchmarks run                  # time every case and print the results
+    python -m benchmarks save                 # time every case and store them as the baseline
+    python -m benchmarks compare              # fail when a case is slower than the baseline allows
+
+Use `-k <text>` to select cases by name and `--threshold 0.25` (or TEA_BENCH_THRESHOLD) to set the
+allowed slowdown relative to the baseline best-of-N time.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.cases import CASES
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DEFAULT_THRESHOLD = 0.25
+
+
+def time_case(fn, repeat):
+    """Times `repeat` calls of `fn` after one warm-up call and returns the timings in seconds."""
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def run_cases(selection=None):
+    """Runs the selected cases and returns {name: {'median_s', 'min_s', 'repeat'}}."""
+    results = {}
+    for name, (fn, repeat) in CASES.items():
+        if selection and selection not in name:
+            continue
+        timings = time_case(fn, repeat)
+        results[name] = {
+            'median_s': statistics.median(timings),
+            'min_s': min(timings),
+            'repeat': repeat,
+        }
+        print(f"{name:40s} median {results[name]['median_s'] * 1000:12.3f} ms   min {results[name]['min_s'] * 1000:12.3f} ms")
+    return results
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def save_baseline(results, path):
+    baseline = {'environment': environment(), 'cases': {}}
+    if os.path.exists(path):
+        with open(path) as f:
+            baseline['cases'] = json.load(f).get('cases', {})
+    baseline['cases'].update(results)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"Saved {len(results)} cases to {path}")
+
+
+def compare(results, path, threshold):
+    """Prints the change of every case against the baseline and returns the names of the regressions."""
+    with open(path) as f:
+        baseline = json.load(f)['cases']
+
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:40s} new case, no baseline")
+            continue
+        ratio = result['min_s'] / baseline[name]['min_s']
+        status = 'REGRESSION' if ratio > 1 + threshold else 'ok'
+        print(f"{name:40s} {ratio:7.2f}x baseline  {status}")
+        if status == 'REGRESSION':
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['run', 'save', 'compare'])
+    parser.add_argument('-k', dest='selection', help='only run cases whose name contains this text')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline JSON file')
+    parser.add_argument('--threshold', type=float,
+                        default=float(os.environ.get('TEA_BENCH_THRESHOLD', DEFAULT_THRESHOLD)),
+                        help='allowed slowdown relative to the baseline best-of-N time, e.g. 0.25 for +25%%')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    results = run_cases(args.selection)
+
+    if args.command == 'save':
+        save_baseline(results, args.baseline)
+    elif args.command == 'compare':
+        regressions = compare(results, args.baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
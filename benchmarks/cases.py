@@ -0,0 +1,337 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from input.capex_input import get_capex_data
+from input.opex_input import get_opex_data
+from input.electrolyser_input import get_electrolyser_data
+from input.pretreat import get_pretreat_equipment_cost_data
+from input.cash_flow_input import get_cash_flow_data
+from input.data_reader import populate_db_from_excel
+from input.bulk_import import import_workbook_directory
+from input.parameters import get_parameters
+from electrolyser_calc import electrolyser_formulae
+from capex_calc import capex_formulae
+from opex_calc import opex_formulae
+from cash_flow_calc import cash_flow_formulae
+from discounted_cash_flow import (
+    discounted_cash_flow_analysis, discounted_cash_flow_batch, discounted_cash_flow_schedule, discounted_cash_flow_table,
+    internal_rate_of_return
+)
+
+excel_file_path = 'data/input.xlsx'
+
+# Registered cases: name -> (function, number of timed repeats)
+CASES = {}
+
+# Scenarios evaluated per vectorized call in the batched cases, to bound peak memory
+BATCH_CHUNK_SIZE = 100_000
+
+
+def case(name, repeat=5):
+    """Registers the decorated zero-argument function as benchmark case `name`."""
+    def decorator(fn):
+        CASES[name] = (fn, repeat)
+        return fn
+    return decorator
+
+
+def _scratch_db_path():
+    return os.path.join(tempfile.gettempdir(), 'tea_benchmark.db')
+
+
+@case('excel_import', repeat=3)
+def excel_import():
+    # Import into a scratch database so the benchmark never rewrites data/database.db
+    populate_db_from_excel(excel_file_path, _scratch_db_path())
+
+
+def _site_directory(n_sites=50):
+    """Creates (once) a scratch directory of `n_sites` copies of the input workbook, one per site folder."""
+    directory = os.path.join(tempfile.gettempdir(), f'tea_benchmark_sites_{n_sites}')
+    for site in range(n_sites):
+        path = os.path.join(directory, f'site_{site:04d}', 'input.xlsx')
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(excel_file_path, path)
+    return directory
+
+
+@case('bulk_import_50', repeat=3)
+def bulk_import():
+    import_workbook_directory(_site_directory(), os.path.join(tempfile.gettempdir(), 'tea_benchmark_sites.db'))
+
+
+@case('db.get_capex_data', repeat=20)
+def read_capex():
+    get_capex_data()
+
+
+@case('db.get_opex_data', repeat=20)
+def read_opex():
+    get_opex_data()
+
+
+@case('db.get_electrolyser_data', repeat=20)
+def read_electrolyser():
+    get_electrolyser_data()
+
+
+@case('db.get_cash_flow_data', repeat=20)
+def read_cash_flow():
+    get_cash_flow_data()
+
+
+@case('db.get_pretreat_equipment_cost_data', repeat=20)
+def read_pretreat():
+    get_pretreat_equipment_cost_data()
+
+
+@case('db.get_parameters', repeat=20)
+def read_parameters():
+    get_parameters()
+
+
+_params = None
+
+
+def _cached_parameters():
+    # The formula cases time the arithmetic only; the reads are covered by the db.* cases
+    global _params
+    if _params is None:
+        _params = get_parameters()
+    return _params
+
+
+@case('electrolyser_formulae', repeat=50)
+def electrolyser():
+    electrolyser_formulae(_cached_parameters())
+
+
+@case('capex_formulae', repeat=50)
+def capex():
+    capex_formulae(_cached_parameters())
+
+
+@case('opex_formulae', repeat=50)
+def opex():
+    opex_formulae(_cached_parameters())
+
+
+@case('cash_flow_formulae', repeat=50)
+def cash_flow():
+    cash_flow_formulae(0.00679, _cached_parameters())
+
+
+@case('discounted_cash_flow_analysis', repeat=20)
+def discounted_cash_flow():
+    discounted_cash_flow_analysis(2.75, 25.0, 0.00679, _cached_parameters())
+
+
+@case('dashboard_rerun', repeat=3)
+def dashboard_rerun():
+    """Headless equivalent of one `main()` rerun: import, reads, formulae, DCF and both sensitivity charts."""
+    from charts import discount_rate_sensitivity_figure, water_price_sensitivity_figure
+
+    populate_db_from_excel(excel_file_path, _scratch_db_path())
+    get_capex_data()
+    get_opex_data()
+    get_electrolyser_data()
+    cash_flow_data = get_cash_flow_data()
+    get_pretreat_equipment_cost_data()
+
+    tax_rate, discount_rate, _, water_price, *_ = cash_flow_data
+    capex_formulae()
+    opex_formulae()
+    electrolyser_formulae()
+    cash_flow_formulae(water_price)
+    schedule = discounted_cash_flow_schedule(discount_rate, tax_rate, water_price)
+    discounted_cash_flow_table(schedule)
+    internal_rate_of_return(schedule['Free Cash Flow'][0])
+    discount_rate_sensitivity_figure(discount_rate, tax_rate, water_price)[0].to_json()
+    water_price_sensitivity_figure(discount_rate, tax_rate, water_price)[0].to_json()
+
+
+def run_batch(n_scenarios, seed=0):
+    """Evaluates `n_scenarios` random variations of the base case in chunks of `BATCH_CHUNK_SIZE`."""
+    base = _cached_parameters()
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_scenarios, BATCH_CHUNK_SIZE):
+        size = min(BATCH_CHUNK_SIZE, n_scenarios - start)
+        params = dict(base)
+        for name in ('capacity', 'current_density', 'e_cell', 'reactor_cost', 'electricity_unit_cost'):
+            params[name] = base[name] * rng.uniform(0.7, 1.3, size)
+        discounted_cash_flow_batch(
+            rng.uniform(1.0, 10.0, size), base['tax_rate'], base['water_selling_price'] * rng.uniform(0.7, 1.3, size),
+            params
+        )
+
+
+@case('batch_1e3', repeat=10)
+def batch_thousand():
+    run_batch(1_000)
+
+
+@case('batch_1e5', repeat=3)
+def batch_hundred_thousand():
+    run_batch(100_000)
+
+
+@case('batch_1e6', repeat=1)
+def batch_million():
+    run_batch(1_000_000)
+
+
+@case('import_tea_core', repeat=5)
+def import_tea_core():
+    """Cold import of the headless core in a fresh interpreter; `benchmarks.import_time` checks its budget."""
+    from benchmarks.import_time import measure
+
+    measure()
+
+
+@case('optimize_current_density', repeat=5)
+def current_density_optimizer():
+    """Vectorized grid of 200 current densities plus golden-section refinement on an example polarization curve."""
+    from design_optimizer import optimize_current_density
+
+    params = dict(_cached_parameters())
+    params.update(
+        reversible_potential=0.06, tafel_slope=0.12, exchange_current_density=1.0, area_specific_resistance=5e-5
+    )
+    optimize_current_density(params)
+
+
+@case('capacity_sweep_300', repeat=10)
+def capacity_sweep_300():
+    """NPV and levelized cost of 300 plant sizes in one vectorized run."""
+    from capacity_sweep import capacity_sweep
+
+    capacity_sweep(2.75, 25.0, 0.00679, _cached_parameters())
+
+
+@case('pretreat_equipment_costs', repeat=20)
+def pretreat_equipment_costs():
+    """500 itemized equipment rows costed for 300 scenarios with size scaling and escalation."""
+    from pretreat_calc import equipment_costs
+
+    rng = np.random.default_rng(0)
+    n_items = 500
+    items = {
+        'equipment': [f'item {i}' for i in range(n_items)],
+        'cost': rng.uniform(1e3, 1e6, n_items),
+        'base_capacity': rng.uniform(1e2, 1e4, n_items),
+        'capacity': rng.uniform(1e2, 1e4, n_items),
+        'exponent': rng.uniform(0.4, 0.9, n_items),
+        'base_year': rng.integers(2000, 2024, n_items).astype(float),
+    }
+    equipment_costs(items, np.geomspace(0.1, 10, 300), 2030, np.linspace(1, 5, 300)).sum(axis=0)
+
+
+@case('design_space_5000', repeat=5)
+def design_space_5000():
+    """Latin hypercube of 5,000 designs, vectorized evaluation and Pareto front of CAPEX, OPEX and NPV."""
+    from design_space import explore_design_space
+
+    explore_design_space(2.75, 25.0, 0.00679, _cached_parameters(), seed=0)
+
+
+@case('pareto_front_100k', repeat=5)
+def pareto_front_100k():
+    """Non-dominated sort of 100,000 random points in three objectives."""
+    from design_space import pareto_front
+
+    pareto_front(np.random.default_rng(0).random((100_000, 3)))
+
+
+@case('financing_batch_10k', repeat=5)
+def financing_batch_10k():
+    """Debt schedules, WACC NPV and equity IRR of 10,000 financing structures in one vectorized pass."""
+    from financing import financed_cash_flow_batch
+
+    rng = np.random.default_rng(0)
+    n = 10_000
+    financed_cash_flow_batch(
+        25.0, 0.00679, _cached_parameters(), debt_fraction=rng.uniform(0, 80, n), interest_rate=rng.uniform(2, 10, n),
+        tenor=rng.integers(5, 16, n), grace_period=rng.integers(0, 3, n), cost_of_equity=rng.uniform(6, 15, n)
+    )
+
+
+@case('escalation_batch_10k', repeat=5)
+def escalation_batch_10k():
+    """Discounted cash flows of 10,000 inflation and per-category escalation scenarios in one vectorized pass."""
+    from discounted_cash_flow import discounted_cash_flow_batch
+    from escalation import ESCALATION_RATES, INFLATION_RATE
+
+    rng = np.random.default_rng(0)
+    n = 10_000
+    params = dict(_cached_parameters())
+    params.update((name, rng.uniform(0, 5, n)) for name in (INFLATION_RATE, *ESCALATION_RATES.values()))
+    discounted_cash_flow_batch(2.75, 25.0, 0.00679, params)
+
+
+@case('learning_curve_26x1000', repeat=5)
+def learning_curve_26x1000():
+    """Levelized cost and NPV of 1,000 scenarios installed in each year from 2025 to 2050 in one vectorized call."""
+    from learning_curve import learning_curve_batch
+
+    params = dict(_cached_parameters())
+    params['capacity'] = params['capacity'] * np.linspace(0.5, 2, 1000)
+    learning_curve_batch(2.75, 25.0, 0.00679, params)
+
+
+@case('portfolio_10k', repeat=5)
+def portfolio_10k():
+    """Cash flows of 10,000 sites with staggered starts, aggregated by calendar year with a shared cost pool."""
+    from portfolio import portfolio_analysis
+
+    rng = np.random.default_rng(0)
+    n = 10_000
+    params = dict(_cached_parameters())
+    params['capacity'] = params['capacity'] * rng.uniform(0.5, 2, n)
+    portfolio_analysis(
+        2.75, 25.0, 0.00679, params, start_years=rng.integers(2025, 2040, n), shared_costs={'overhead': 1e7}
+    )
+
+
+@case('monthly_batch_10k', repeat=5)
+def monthly_batch_10k():
+    """252-period monthly schedules, NPV and IRR of 10,000 scenarios in one vectorized pass."""
+    from periodic_cash_flow import period_cash_flow_batch, seasonal_profile
+
+    params = dict(_cached_parameters())
+    params['capacity'] = params['capacity'] * np.linspace(0.5, 2, 10_000)
+    period_cash_flow_batch(2.75, 25.0, 0.00679, params, 'monthly', profile=seasonal_profile(20))
+
+
+def _scenario_db(n_variants=200):
+    """Creates (once) a scratch database holding `n_variants` capacity variants of the base scenario."""
+    from input.scenarios import save_variant
+
+    path = os.path.join(tempfile.gettempdir(), f'tea_benchmark_scenarios_{n_variants}.db')
+    if not os.path.exists(path):
+        populate_db_from_excel(excel_file_path, path)
+        for variant in range(n_variants):
+            save_variant(f'variant_{variant}', {'capacity': 500.0 + 10 * variant}, db_file_path=path)
+    return path
+
+
+@case('sql_udf_100k', repeat=5)
+def sql_udf_100k():
+    """100,000 rows of tea_npv and tea_lcoa over 201 stored scenarios, scenario table build included."""
+    import sqlite3
+
+    from sql_functions import register_tea_functions
+
+    path = _scenario_db()
+    conn = sqlite3.connect(path)
+    try:
+        register_tea_functions(conn, path)
+        conn.execute('''
+            WITH RECURSIVE row (i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM row WHERE i < 99999)
+            SELECT SUM(tea_npv(1 + i % 201, 2 + i % 7)), SUM(tea_lcoa(1 + i % 201)) FROM row
+        ''').fetchone()
+    finally:
+        conn.close()
@@ -0,0 +1,105 @@
+"""
+Cold-import budget of the headless `tea` core.
+
+Starts a fresh interpreter with `python -X importtime`, imports the core the way a batch worker does
+and checks the cumulative import time against a budget. Fails as well when the import pulls in a
+module that the core must not depend on (streamlit, plotly, pandas, openpyxl).
+
+Run from the repository root:
+
+    python -m benchmarks.import_time                 # best of 5 runs against the 200 ms budget
+    python -m benchmarks.import_time --budget-ms 150 --runs 10
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What a batch worker needs: the parameter store and the vectorized DCF
+CORE_IMPORT = 'import tea; tea.get_parameters; tea.discounted_cash_flow_batch'
+
+FORBIDDEN_MODULES = ('streamlit', 'plotly', 'pandas', 'openpyxl')
+
+DEFAULT_BUDGET_MS = 200.0
+
+
+def parse_importtime(stderr):
+    """
+    Parses `-X importtime` output.
+
+    Returns:
+        list: (module, self_us, cumulative_us, depth) per imported module, in import order.
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        imports.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return imports
+
+
+def measure(statement=CORE_IMPORT):
+    """
+    Imports `statement` in a fresh interpreter from the repository root.
+
+    Returns:
+        tuple: (import time of the core in ms, its imports as returned by `parse_importtime`).
+    """
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    imports = parse_importtime(completed.stderr)
+    # Drop the interpreter's own startup imports (site, encodings, ...), which precede `import tea`
+    start = next(i for i, (name, _, _, depth) in enumerate(imports) if name == 'tea' and depth == 0)
+    imports = imports[start:]
+    # Top-level entries include everything they import in turn, so their sum is the total
+    total_us = sum(cumulative for _, _, cumulative, depth in imports if depth == 0)
+    return total_us / 1000, imports
+
+
+def check(budget_ms=DEFAULT_BUDGET_MS, runs=5, statement=CORE_IMPORT):
+    """
+    Measures `runs` cold imports and checks the fastest against `budget_ms`.
+
+    Returns:
+        tuple: (best time in ms, imports of the best run, list of problems; empty when within budget).
+    """
+    best_ms, best_imports = min((measure(statement) for _ in range(runs)), key=lambda result: result[0])
+    problems = []
+    if best_ms > budget_ms:
+        problems.append(f"cold import took {best_ms:.1f} ms, budget is {budget_ms:.0f} ms")
+    imported = {name.split('.')[0] for name, *_ in best_imports}
+    for module in FORBIDDEN_MODULES:
+        if module in imported:
+            problems.append(f"the core imports '{module}'")
+    return best_ms, best_imports, problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.import_time', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--budget-ms', type=float,
+                        default=float(os.environ.get('TEA_IMPORT_BUDGET_MS', DEFAULT_BUDGET_MS)),
+                        help='allowed cold import time of the core in milliseconds')
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters to start; the fastest counts')
+    parser.add_argument('--top', type=int, default=10, help='number of slowest top-level imports to list')
+    args = parser.parse_args(argv)
+
+    best_ms, imports, problems = check(args.budget_ms, args.runs)
+    print(f"tea core cold import: {best_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    top_level = sorted((entry for entry in imports if entry[3] == 0), key=lambda entry: entry[2], reverse=True)
+    for name, _, cumulative_us, _ in top_level[:args.top]:
+        print(f"  {name:40s} {cumulative_us / 1000:8.1f} ms")
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
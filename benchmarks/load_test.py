@@ -0,0 +1,152 @@
+"""
+Headless concurrent-session load test for the Streamlit dashboard.
+
+Simulates N browser sessions with Streamlit's AppTest (no browser, no network). Every session loads
+`main.py` and then moves the sidebar sliders in a random but reproducible sequence, rerunning the
+script after each move, while all sessions share one process like they do on the server.
+
+Run from the repository root:
+
+    python -m benchmarks.load_test --sessions 8 --reruns 10
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit.testing.v1 import AppTest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, 'main.py')
+
+# Sidebar sliders a user typically moves between reruns
+SLIDER_LABELS = ('Discount Rate (%)', 'Tax Rate (%)', 'Water Selling Price ($/Gal)')
+
+
+def _find_slider(app, label):
+    for slider in app.slider:
+        if slider.label == label:
+            return slider
+    return None
+
+
+def _next_value(slider, rng):
+    """Picks a new value within the slider's range, on its step grid."""
+    minimum, maximum, step = slider.proto.min, slider.proto.max, slider.proto.step
+    steps = int(round((maximum - minimum) / step))
+    return round(minimum + rng.randint(0, steps) * step, 10)
+
+
+def run_session(session_id, reruns, seed, timeout, start_barrier):
+    """
+    Runs one simulated session and returns its rerun latencies (seconds) and error count.
+
+    The first entry is the initial page load; the others follow a slider move each. A rerun that
+    raised, or whose page shows an exception or error, counts as an error. When the previous rerun
+    failed before rendering the sidebar, the next rerun repeats without moving a slider.
+    """
+    rng = random.Random(seed + session_id)
+    app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    latencies = []
+    errors = 0
+
+    start_barrier.wait()
+    for rerun in range(reruns + 1):
+        if rerun:
+            slider = _find_slider(app, rng.choice(SLIDER_LABELS))
+            if slider is not None:
+                slider.set_value(_next_value(slider, rng))
+        start = time.perf_counter()
+        try:
+            app.run()
+        except Exception:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+        if app.exception or app.error:
+            errors += 1
+    return latencies, errors
+
+
+def percentile(values, fraction):
+    """Returns the `fraction` percentile of `values` by linear interpolation."""
+    ordered = sorted(values)
+    if not ordered:
+        return float('nan')
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def peak_rss_mib():
+    """Peak resident set size of this process in MiB (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_load_test(sessions, reruns, seed=0, timeout=120):
+    """
+    Runs `sessions` concurrent sessions of `reruns` slider moves each.
+
+    Returns:
+        dict: Latency percentiles (ms), throughput (reruns/s), error count and peak RSS (MiB).
+    """
+    start_barrier = threading.Barrier(sessions)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix='load-session') as executor:
+        futures = [
+            executor.submit(run_session, session_id, reruns, seed, timeout, start_barrier)
+            for session_id in range(sessions)
+        ]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for session_latencies, _ in results for latency in session_latencies]
+    return {
+        'sessions': sessions,
+        'reruns_per_session': reruns,
+        'completed_reruns': len(latencies),
+        'errors': sum(errors for _, errors in results),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': round(statistics.fmean(latencies) * 1000, 1) if latencies else float('nan'),
+            'p50': round(percentile(latencies, 0.50) * 1000, 1),
+            'p90': round(percentile(latencies, 0.90) * 1000, 1),
+            'p99': round(percentile(latencies, 0.99) * 1000, 1),
+            'max': round(max(latencies) * 1000, 1) if latencies else float('nan'),
+        },
+        'peak_rss_mib': round(peak_rss_mib(), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.load_test', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=4, help='number of concurrent sessions')
+    parser.add_argument('--reruns', type=int, default=10, help='slider moves per session after the first load')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the slider sequences')
+    parser.add_argument('--timeout', type=float, default=120, help='timeout of a single rerun in seconds')
+    parser.add_argument('--json', dest='json_path', help='also write the report to this JSON file')
+    args = parser.parse_args(argv)
+
+    # The app resolves its data and CSS paths relative to the repository root
+    os.chdir(REPO_ROOT)
+    report = run_load_test(args.sessions, args.reruns, args.seed, args.timeout)
+
+    print(json.dumps(report, indent=2))
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
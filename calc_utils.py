@@ -0,0 +1,17 @@
+import numpy as np
+
+
+def round_values(value, ndigits=None):
+    """
+    Rounds a scalar like the built-in `round`, or every element of a numpy array.
+
+    Parameters:
+        value (float or np.ndarray): The value(s) to round.
+        ndigits (int, optional): Number of decimals. When omitted, scalars are rounded to an int.
+
+    Returns:
+        float, int or np.ndarray: The rounded value(s).
+    """
+    if isinstance(value, np.ndarray):
+        return np.round(value, ndigits or 0)
+    return round(value, ndigits) if ndigits is not None else round(value)
@@ -0,0 +1,90 @@
+import numpy as np
+
+from discounted_cash_flow import discounted_cash_flow_batch, levelized_cost_of_ammonia
+from input.parameters import get_parameters
+from perf import timed
+
+# Cost scaling exponents of the six-tenths rule: value at scale S = reference value * S ** exponent.
+# Throughput scales linearly; pretreatment and balance of plant costs grow slower than the plant.
+DEFAULT_SCALING_EXPONENTS = {
+    'capacity': 1.0,
+    'treated_water_quantity': 1.0,
+    'pretreat_pec': 0.6,
+    'balance_of_plant': 0.6,
+}
+
+# Parameters given as a percentage of the reactor cost, which itself grows linearly with capacity.
+# Their exponent applies to the resulting cost, so the percentage scales with S ** (exponent - 1).
+PERCENT_OF_REACTOR_COST = ('balance_of_plant',)
+
+# Plant sizes evaluated by default, as multiples of the scenario's capacity
+DEFAULT_SCALES = np.geomspace(0.1, 10, 300)
+
+
+def scale_parameters(params, scales, exponents=None):
+    """
+    Resizes a plant by the six-tenths rule, for many sizes at once.
+
+    Parameters:
+        params (dict): Parameter mapping of the reference plant, as returned by `get_parameters`.
+        scales (array-like): Plant sizes as multiples of the reference capacity.
+        exponents (dict, optional): Maps parameter names to their scaling exponent. Defaults to
+            `DEFAULT_SCALING_EXPONENTS`; parameters not listed keep their reference value.
+
+    Returns:
+        dict: A new parameter mapping in which each scaled parameter is an array with one element per size,
+        ready for the vectorized formulae. Itemized pretreatment equipment is resized item by item with
+        its own exponents instead of through 'pretreat_pec'.
+    """
+    scales = np.asarray(scales, dtype=float)
+    exponents = DEFAULT_SCALING_EXPONENTS if exponents is None else exponents
+
+    scaled = dict(params)
+    for name, exponent in exponents.items():
+        if name in PERCENT_OF_REACTOR_COST:
+            exponent -= 1
+        scaled[name] = params[name] * scales ** exponent
+    if params.get('pretreat_items') is not None:
+        scaled['pretreat_scale'] = params.get('pretreat_scale', 1.0) * scales
+    return scaled
+
+
+@timed()
+def capacity_sweep(discount_rate, tax_rate, water_selling_price, params=None, scales=DEFAULT_SCALES,
+                   exponents=None):
+    """
+    Evaluates NPV and levelized cost across plant sizes in one vectorized run.
+
+    Parameters:
+        discount_rate (float): The discount rate (%).
+        tax_rate (float): The tax rate (%).
+        water_selling_price (float): The water selling price ($/Gal).
+        params (dict, optional): Parameter mapping of the reference plant. Defaults to the database.
+        scales (array-like): Plant sizes as multiples of the reference capacity. Defaults to 300 sizes
+            from a tenth to ten times the reference.
+        exponents (dict, optional): Scaling exponents, see `scale_parameters`.
+
+    Returns:
+        dict: Arrays with one element per size:
+            - 'scale': The size relative to the reference plant.
+            - 'capacity': The ammonia capacity (kg/day).
+            - 'npv': Final cumulative NPV ($M).
+            - 'capex': Total capital expenditure ($).
+            - 'levelized_cost': Levelized cost of ammonia ($/kg).
+    """
+    if params is None:
+        params = get_parameters()
+
+    scales = np.asarray(scales, dtype=float)
+    scaled = scale_parameters(params, scales, exponents)
+    results = discounted_cash_flow_batch(discount_rate, tax_rate, water_selling_price, scaled)
+
+    return {
+        'scale': scales,
+        'capacity': np.broadcast_to(scaled['capacity'], scales.shape),
+        'npv': results['npv'],
+        'capex': results['capex'],
+        'levelized_cost': np.broadcast_to(
+            levelized_cost_of_ammonia(discount_rate, water_selling_price, scaled), scales.shape
+        ),
+    }
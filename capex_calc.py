@@ -1,19 +1,28 @@
 # Import the functions from the necessary modules
-from input.capex_input import get_capex_data
-from input.pretreat import get_pretreat_equipment_cost_data
-from input.electrolyser_input import get_electrolyser_data
+from calc_utils import round_values
+from input.parameters import get_parameters
 from electrolyser_calc import electrolyser_formulae
+from pretreat_calc import pretreat_capital_cost
+from perf import timed
 
-# Import the get_electrolyser_data function from the input.electrolyser_input module
-
-def capex_formulae():
+@timed()
+def capex_formulae(params=None):
     """
     This function contains all formulae for computing additional inputs to the TEA model.
     It first reads all the variables needed for additional computauion.
     Note that this computations will be done in python, rather than excel since the user will be provided with the flexibility to manipulate the values.
+
+    Parameters:
+    ----------
+    params (dict, optional): Parameter mapping as returned by `get_parameters`, with float or numpy array values.
+        Defaults to the parameters stored in the database. Itemized pretreatment equipment ('pretreat_items')
+        is costed item by item in the scenarios whose 'pretreat_pec' is 0, see `pretreat_calc.pretreat_capital_cost`.
     """
-    # Call the function to retrieve the data
-    pretreat_pec = get_pretreat_equipment_cost_data()
+    # Retrieve the data
+    if params is None:
+        params = get_parameters()
+
+    pretreat_pec = pretreat_capital_cost(params)
 
     (
         current,
@@ -30,20 +39,18 @@ def capex_formulae():
         electrolyer_opex,
         electrolyser_foc,
         electrolyser_voc
-    ) = electrolyser_formulae()
+    ) = electrolyser_formulae(params)
 
     # Total PEC
     total_capital_cost = pretreat_pec + electrolyser_pec
     
-    (
-        install_cost,
-        controls_and_instrumentation,
-        piping_and_electricals,
-        building_and_services,
-        indirect_cost,
-        startup_cost,
-        working_capital
-    ) = get_capex_data()
+    install_cost = params['installation']
+    controls_and_instrumentation = params['controls_and_instrumentation']
+    piping_and_electricals = params['piping_and_electricals']
+    building_and_services = params['building_and_services']
+    indirect_cost = params['indirect_cost']
+    startup_cost = params['startup_cost']
+    working_capital = params['working_capital']
 
     install_cost_total = (install_cost * pretreat_pec)/100
     controls_and_instrumentation_total = (controls_and_instrumentation * pretreat_pec)/100
@@ -57,17 +64,17 @@ def capex_formulae():
     capex = fixed_capital_investment + startup_cost_total + working_capital_total
     
     return (
-        round(install_cost_total, 2),
-        round(controls_and_instrumentation_total, 2),
-        round(piping_and_electricals_total, 2),
-        round(building_and_services_total, 2),
-        round(indirect_cost_total, 2),
-        round(direct_cost, 2),
-        round(fixed_capital_investment, 2),
-        round(startup_cost_total, 2),
-        round(working_capital_total, 2),
-        round (capex, 2),
-        round(total_capital_cost,2)
+        round_values(install_cost_total, 2),
+        round_values(controls_and_instrumentation_total, 2),
+        round_values(piping_and_electricals_total, 2),
+        round_values(building_and_services_total, 2),
+        round_values(indirect_cost_total, 2),
+        round_values(direct_cost, 2),
+        round_values(fixed_capital_investment, 2),
+        round_values(startup_cost_total, 2),
+        round_values(working_capital_total, 2),
+        round_values(capex, 2),
+        round_values(total_capital_cost,2)
     )
 
 
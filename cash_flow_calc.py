@@ -1,12 +1,13 @@
 # Import the functions from the necessary modules
-from input.cash_flow_input import get_cash_flow_data
-from input.capex_input import get_capex_data
+from calc_utils import round_values
+from input.parameters import get_parameters
 from electrolyser_calc import electrolyser_formulae
-from input.electrolyser_input import get_electrolyser_data
-from input.pretreat import get_pretreat_equipment_cost_data
 from capex_calc import capex_formulae
+from pretreat_calc import pretreat_capital_cost
+from perf import timed
 
-def cash_flow_formulae(water_selling_price):
+@timed()
+def cash_flow_formulae(water_selling_price, params=None):
     """
     This function contains all formulae for computing additional inputs to the TEA model.
     It first reads all the variables needed for additional computation.
@@ -16,37 +17,26 @@ def cash_flow_formulae(water_selling_price):
     Parameters:
     ----------
     water_selling_price (float): The price of water, which can be varied for sensitivity analysis.
+    params (dict, optional): Parameter mapping as returned by `get_parameters`, with float or numpy array values.
+        Defaults to the parameters stored in the database.
 
     Returns:
     -------
     tuple
         A tuple containing the calculated financial values needed for DCF analysis.
     """
-    # Call the function to retrieve the additional data needed for computation (capex, cash flow, raw data and calculated data)
-    pretreat_pec = get_pretreat_equipment_cost_data()
+    # Retrieve the additional data needed for computation (capex, cash flow, raw data and calculated data)
+    if params is None:
+        params = get_parameters()
 
-    (
-        install_cost,
-        controls_and_instrumentation,
-        piping_and_electricals,
-        building_and_services,
-        indirect_cost,
-        startup_cost,
-        working_capital
-    ) = get_capex_data()
-
-    (
-        tax_rate,
-        discount_rate,
-        water_cost_price,
-        _,
-        ammonia_selling_price,
-        chemical_selling_price,
-        depreciation_time,
-        life_of_plant,
-        land,
-        treated_water_quantity
-    ) = get_cash_flow_data()
+    pretreat_pec = pretreat_capital_cost(params)
+    ammonia_selling_price = params['ammonia_selling_price']
+    depreciation_time = params['depreciation_time']
+    land = params['land']
+    treated_water_quantity = params['treated_water_quantity']
+    capacity = params['capacity']
+    capacity_factor = params['capacity_factor']
+    time = params['time']
 
     (
         install_cost_total,
@@ -60,7 +50,7 @@ def cash_flow_formulae(water_selling_price):
         working_capital_total,
         capex,
         total_capital_cost
-    ) = capex_formulae()
+    ) = capex_formulae(params)
 
     (
         current,
@@ -77,28 +67,7 @@ def cash_flow_formulae(water_selling_price):
         electrolyer_opex,
         electrolyser_foc,
         electrolyser_voc
-    ) = electrolyser_formulae()
-
-    (
-        faradaic_constant,
-        time,
-        no_of_electrons,
-        faradaic_efficiency,
-        molar_weight,
-        capacity,
-        capacity_factor,
-        current_density,
-        reactor_cost,
-        e_cell,
-        balance_of_plant,
-        maintenance_frequency,
-        maintenance_factor,
-        catalyst_percentage,
-        catalyst_lifespan,
-        capacity_factor,
-        electrolyser_installation_cost,
-        separation_cost
-    ) = get_electrolyser_data()
+    ) = electrolyser_formulae(params)
 
     # Calculate financial metrics based on provided and retrieved values
     land_cost = (land * fixed_capital_investment) / 100
@@ -113,14 +82,14 @@ def cash_flow_formulae(water_selling_price):
 
     # Return the calculated financial metrics
     return (
-        round(land_cost, 2),
-        round(total_capital_investment, 2),
-        round(depreciation, 2),
-        round(total_pec, 2),
-        round(working_capital_total),
-        round(total_revenue),
-        round(water_revenue),
-        round(ammonia_revenue)
+        round_values(land_cost, 2),
+        round_values(total_capital_investment, 2),
+        round_values(depreciation, 2),
+        round_values(total_pec, 2),
+        round_values(working_capital_total),
+        round_values(total_revenue),
+        round_values(water_revenue),
+        round_values(ammonia_revenue)
     )
 
 if __name__ == "__main__":
@@ -0,0 +1,336 @@
+import numpy as np
+import plotly.graph_objs as go
+
+from discounted_cash_flow import discounted_cash_flow_analysis
+
+
+def discount_rate_sensitivity_figure(discount_rate, tax_rate, water_price, params=None):
+    """
+    Builds the cumulative NPV chart for a range of discount rates around the selected one.
+
+    Parameters:
+        discount_rate (float): The discount rate selected in the sidebar (%).
+        tax_rate (float): The tax rate selected in the sidebar (%).
+        water_price (float): The water selling price selected in the sidebar ($/Gal).
+        params (dict, optional): Parameters of the active scenario. Defaults to the database.
+
+    Returns:
+        tuple: A Plotly figure and a list of error messages for the rates that could not be evaluated.
+    """
+    # Generate a range of discount rates from -30% to +30% of the slider value in 10% increments
+    discount_rates = [discount_rate + (discount_rate * i * 0.1) for i in range(-3, 4)]
+    cumulative_npvs = {}
+    errors = []
+    years = None
+    for rate in discount_rates:
+        try:
+            dcf_result = discounted_cash_flow_analysis(rate, tax_rate, water_price, params)  # Pass water_price for dynamic updates
+            cumulative_npvs[f"{rate:.2f}%"] = dcf_result['Cumulative NPV']
+            years = dcf_result['Year']
+        except Exception as e:
+            errors.append(f"Error calculating DCF at {rate:.2f}% discount rate: {e}")
+            continue
+
+    # Prepare data for Plotly
+    fig = go.Figure()
+    for rate_label, npv in cumulative_npvs.items():
+        line_width = 4 if rate_label == f"{discount_rate:.2f}%" else 2
+        fig.add_trace(go.Scatter(
+            x=years, y=npv, mode='lines',
+            name=f"<b>{rate_label} (Current)</b>" if line_width == 4 else rate_label,
+            line=dict(width=line_width)
+        ))
+
+    # Update layout for bold yellow horizontal line at y=0
+    fig.update_layout(
+        title="Cumulative NPV over Time at Different Discount Rates",
+        xaxis_title="Years",
+        yaxis_title="Cumulative NPV ($M)",
+        legend_title="Discount Rates",
+        template="plotly_white",
+        shapes=[
+            dict(
+                type="line",
+                xref="paper",  # Make the line span the entire plot width
+                x0=0,
+                x1=1,
+                y0=0,
+                y1=0,
+                line=dict(color="yellow", width=3)
+            )
+        ]
+    )
+    return fig, errors
+
+
+def water_price_sensitivity_figure(discount_rate, tax_rate, water_price, params=None):
+    """
+    Builds the chart of final cumulative NPV against the water selling price.
+
+    Parameters:
+        discount_rate (float): The discount rate selected in the sidebar (%).
+        tax_rate (float): The tax rate selected in the sidebar (%).
+        water_price (float): The water selling price selected in the sidebar ($/Gal).
+        params (dict, optional): Parameters of the active scenario. Defaults to the database.
+
+    Returns:
+        tuple: A Plotly figure and a list of error messages for the prices that could not be evaluated.
+    """
+    # Vary water price from -30% to +30%
+    water_prices = [water_price * (1 + i * 0.1) for i in range(-3, 4)]
+    evaluated_prices = []
+    npv_last_values = []
+    errors = []
+
+    for price in water_prices:
+        try:
+            dcf_result = discounted_cash_flow_analysis(discount_rate, tax_rate, price, params)
+            evaluated_prices.append(price)
+            npv_last_values.append(dcf_result['Cumulative NPV'].iloc[-1])  # Last year cumulative NPV
+        except Exception as e:
+            errors.append(f"Error calculating DCF at water price {price}: {e}")
+            continue
+
+    # Plot NPV last values vs. Water Price
+    fig_water_price = go.Figure(data=go.Scatter(
+        x=evaluated_prices,
+        y=npv_last_values,
+        mode='lines+markers'
+    ))
+    fig_water_price.update_layout(
+        title="Sensitivity of NPV to Water Selling Price",
+        xaxis_title="Water Selling Price ($/Gal)",
+        yaxis_title="Cumulative NPV ($M)",
+        template="plotly_white",
+        shapes=[
+            dict(
+                type="line",
+                xref="paper",  # Make the line span the entire plot width
+                x0=0,  # Start at the left edge of the plot
+                x1=1,  # End at the right edge of the plot
+                y0=0,
+                y1=0,
+                line=dict(color="yellow", width=3)
+            )
+        ]
+    )
+    return fig_water_price, errors
+
+
+def current_density_figure(discount_rate, water_price, params):
+    """
+    Builds the chart of levelized cost of ammonia against the electrolyser current density, marking the optimum.
+
+    Parameters:
+        discount_rate (float): The discount rate selected in the sidebar (%).
+        water_price (float): The water selling price selected in the sidebar ($/Gal).
+        params (dict): Parameters of the active scenario, holding the polarization curve.
+
+    Returns:
+        tuple: A Plotly figure and a list of error messages.
+    """
+    from design_optimizer import optimize_current_density
+
+    try:
+        optimum, curve = optimize_current_density(params, discount_rate=discount_rate, water_selling_price=water_price)
+    except Exception as e:
+        return go.Figure(), [f"Error optimizing the current density: {e}"]
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=curve['current_density'], y=curve['levelized_cost'], mode='lines', name="Levelized cost",
+        customdata=curve['e_cell'], hovertemplate="%{x:,.0f} A/m2, %{customdata:.3f} V: %{y:.4f} $/kg"
+    ))
+    fig.add_trace(go.Scatter(
+        x=[optimum['current_density']], y=[optimum['levelized_cost']], mode='markers',
+        name=f"<b>Optimum: {optimum['current_density']:,.0f} A/m2 at {optimum['e_cell']:.3f} V</b>",
+        marker=dict(size=12, color="yellow", line=dict(width=2))
+    ))
+    fig.update_layout(
+        title="Levelized Cost of Ammonia at Different Current Densities",
+        xaxis_title="Current Density (A/m2)",
+        yaxis_title="Levelized Cost of Ammonia ($/kg)",
+        xaxis_type="log",
+        template="plotly_white"
+    )
+    return fig, []
+
+
+def capacity_sweep_figure(discount_rate, tax_rate, water_price, params, scales, exponents):
+    """
+    Builds the cost curve of levelized cost of ammonia and final cumulative NPV against the plant capacity.
+
+    Parameters:
+        discount_rate (float): The discount rate selected in the sidebar (%).
+        tax_rate (float): The tax rate selected in the sidebar (%).
+        water_price (float): The water selling price selected in the sidebar ($/Gal).
+        params (dict): Parameters of the active scenario, the reference plant.
+        scales (array-like): Plant sizes as multiples of the reference capacity.
+        exponents (dict): Cost scaling exponents, see `capacity_sweep.scale_parameters`.
+
+    Returns:
+        tuple: A Plotly figure and a list of error messages.
+    """
+    from capacity_sweep import capacity_sweep
+
+    try:
+        sweep = capacity_sweep(discount_rate, tax_rate, water_price, params, scales, exponents)
+    except Exception as e:
+        return go.Figure(), [f"Error sweeping the plant capacity: {e}"]
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=sweep['capacity'], y=sweep['levelized_cost'], mode='lines', name="Levelized Cost ($/kg)",
+        line=dict(width=3)
+    ))
+    fig.add_trace(go.Scatter(
+        x=sweep['capacity'], y=sweep['npv'], mode='lines', name="Final Cumulative NPV ($M)",
+        line=dict(width=2, dash="dash"), yaxis="y2"
+    ))
+    fig.update_layout(
+        title="Cost Curve: Levelized Cost of Ammonia and NPV by Plant Capacity",
+        xaxis_title="Ammonia Capacity (kg/day)",
+        xaxis_type="log",
+        yaxis=dict(title="Levelized Cost of Ammonia ($/kg)"),
+        yaxis2=dict(title="Final Cumulative NPV ($M)", overlaying="y", side="right", showgrid=False),
+        legend=dict(x=0.5, xanchor="center", y=-0.25, orientation="h"),
+        template="plotly_white",
+        shapes=[
+            dict(
+                type="line",
+                xref="x",
+                x0=params['capacity'],  # Mark the capacity of the active scenario
+                x1=params['capacity'],
+                yref="paper",
+                y0=0,
+                y1=1,
+                line=dict(color="yellow", width=3)
+            )
+        ]
+    )
+    return fig, []
+
+
+def learning_curve_figure(discount_rate, tax_rate, water_price, params, learning_rates, curves=None,
+                          deployment_growth=None):
+    """
+    Builds the cost decline of the plant over its installation year: levelized cost of ammonia and final
+    cumulative NPV as the technology learns.
+
+    Parameters:
+        discount_rate (float): The discount rate selected in the sidebar (%).
+        tax_rate (float): The tax rate selected in the sidebar (%).
+        water_price (float): The water selling price selected in the sidebar ($/Gal).
+        params (dict): Parameters of the active scenario, the plant installed in the first year.
+        learning_rates (dict): Learning rate (%) per parameter, see `learning_curve.project_parameters`.
+        curves (dict, optional): Learning curves of the workbook.
+        deployment_growth (float, optional): Yearly growth of the installed capacity (%). Defaults to
+            `learning_curve.DEFAULT_DEPLOYMENT_GROWTH`.
+
+    Returns:
+        tuple: A Plotly figure and a list of error messages.
+    """
+    from learning_curve import DEFAULT_DEPLOYMENT_GROWTH, learning_curve_batch
+
+    if deployment_growth is None:
+        deployment_growth = DEFAULT_DEPLOYMENT_GROWTH
+    try:
+        projection = learning_curve_batch(
+            discount_rate, tax_rate, water_price, params, learning_rates=learning_rates, curves=curves,
+            deployment_growth=deployment_growth
+        )
+    except Exception as e:
+        return go.Figure(), [f"Error projecting the learning curves: {e}"]
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=projection['installation_year'], y=projection['levelized_cost'][:, 0], mode='lines+markers',
+        name="Levelized Cost ($/kg)", line=dict(width=3)
+    ))
+    fig.add_trace(go.Scatter(
+        x=projection['installation_year'], y=projection['npv'][:, 0], mode='lines',
+        name="Final Cumulative NPV ($M)", line=dict(width=2, dash="dash"), yaxis="y2"
+    ))
+    fig.update_layout(
+        title="Cost Decline: Levelized Cost of Ammonia and NPV by Installation Year",
+        xaxis_title="Installation Year",
+        yaxis=dict(title="Levelized Cost of Ammonia ($/kg)"),
+        yaxis2=dict(title="Final Cumulative NPV ($M)", overlaying="y", side="right", showgrid=False),
+        legend=dict(x=0.5, xanchor="center", y=-0.25, orientation="h"),
+        template="plotly_white",
+    )
+    return fig, []
+
+
+def pareto_front_figure(designs, results, front):
+    """
+    Builds the scatter of candidate designs by CAPEX and OPEX, highlighting the Pareto front colored by NPV.
+
+    Parameters:
+        designs (dict): The sampled design variables, as returned by `design_space.sample_designs`.
+        results (dict): 'capex', 'opex' and 'npv' of every candidate, as returned by `design_space.evaluate_designs`.
+        front (np.ndarray): Indices of the Pareto-optimal candidates.
+
+    Returns:
+        go.Figure: The figure. Each point's customdata starts with its candidate index, so a selected
+        point can be mapped back to its design.
+    """
+    names = list(designs)
+    customdata = np.column_stack([np.arange(len(results['npv'])), results['npv']] + [designs[name] for name in names])
+    hovertemplate = "CAPEX %{x:,.2f} $M, OPEX %{y:,.3f} $M/yr<br>NPV %{customdata[1]:,.2f} $M<br>" + "<br>".join(
+        f"{name}: %{{customdata[{column}]:,.4g}}" for column, name in enumerate(names, start=2)
+    ) + "<extra></extra>"
+
+    fig = go.Figure()
+    fig.add_trace(go.Scattergl(
+        x=results['capex'] / 1_000_000, y=results['opex'] / 1_000_000, mode='markers', name="Candidates",
+        marker=dict(size=4, color="lightgray"), customdata=customdata, hovertemplate=hovertemplate
+    ))
+    fig.add_trace(go.Scatter(
+        x=results['capex'][front] / 1_000_000, y=results['opex'][front] / 1_000_000, mode='markers',
+        name="<b>Pareto front</b>", customdata=customdata[front], hovertemplate=hovertemplate,
+        marker=dict(size=10, color=results['npv'][front], colorscale="Viridis", showscale=True,
+                    colorbar=dict(title="NPV ($M)"), line=dict(width=1))
+    ))
+    fig.update_layout(
+        title="Design Space: CAPEX vs. OPEX, Pareto Front Colored by NPV",
+        xaxis_title="CAPEX ($M)",
+        yaxis_title="OPEX ($M/year)",
+        legend=dict(x=0.5, xanchor="center", y=-0.2, orientation="h"),
+        template="plotly_white"
+    )
+    return fig
+
+
+def portfolio_figure(portfolio):
+    """
+    Builds the fleet's free cash flow and cumulative cash flow by calendar year.
+
+    Parameters:
+        portfolio (dict): The results of `portfolio.portfolio_analysis`.
+
+    Returns:
+        go.Figure: Bars of the yearly free cash flow after shared costs and a line of the shared costs,
+        in $M, with the cumulative cash flow on a second axis.
+    """
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        x=portfolio['calendar_year'], y=portfolio['cash_flow'] / 1_000_000, name="Free Cash Flow ($M)"
+    ))
+    fig.add_trace(go.Scatter(
+        x=portfolio['calendar_year'], y=-portfolio['shared_cost'] / 1_000_000, mode='lines',
+        name="Shared Costs ($M)", line=dict(width=2, dash="dot")
+    ))
+    fig.add_trace(go.Scatter(
+        x=portfolio['calendar_year'], y=np.cumsum(portfolio['cash_flow']) / 1_000_000, mode='lines',
+        name="Cumulative Cash Flow ($M)", line=dict(width=3), yaxis="y2"
+    ))
+    fig.update_layout(
+        title="Portfolio Cash Flow by Calendar Year",
+        xaxis_title="Calendar Year",
+        yaxis=dict(title="Yearly Cash Flow ($M)"),
+        yaxis2=dict(title="Cumulative Cash Flow ($M)", overlaying="y", side="right", showgrid=False),
+        legend=dict(x=0.5, xanchor="center", y=-0.25, orientation="h"),
+        template="plotly_white",
+    )
+    return fig
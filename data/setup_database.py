@@ -1,52 +1,13 @@
-import sqlite3
+from input.connection import write_connection
+from input.schema import migrate
 
 def initialize_database():
     """
-    This was used to initializes database. Optional function which will be removed"""
-    conn = sqlite3.connect('data/database.db')
-    cursor = conn.cursor()
-
-    # Create tables for each sheet
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS capex_factors (
-            Category TEXT,
-            Value REAL
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS opex_factors (
-            Category TEXT,
-            Value REAL
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS electrolyser (
-            Category TEXT,
-            Value REAL
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS cash_flow (
-            Category TEXT,
-            Value REAL
-        )
-    ''')
-
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS pretreat_equipment_cost (
-            Category TEXT,
-            Value REAL
-        )
-    ''')
-
-    # Insert sample data or load data from your Excel files
-    # ...
-
-    conn.commit()
-    conn.close()
+    Creates the typed parameter schema of `input.schema` in the configured database (data/database.db
+    or TEA_DB_PATH), migrating the original per-sheet layout when present. `populate_db_from_excel`
+    does the same on every import, so this is only needed for an empty database."""
+    with write_connection() as conn:
+        migrate(conn)
 
 if __name__ == "__main__":
-    initialize_database()
\ No newline at end of file
+    initialize_database()
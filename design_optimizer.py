@@ -0,0 +1,138 @@
+import logging
+
+import numpy as np
+
+from discounted_cash_flow import levelized_cost_of_ammonia
+from electrolyser_calc import cell_voltage, electrolyser_formulae, has_polarization_model
+from input.parameters import get_parameters
+from perf import timed
+
+logger = logging.getLogger(__name__)
+
+# Candidate current densities evaluated in the vectorized pass, log-spaced over the bounds
+DEFAULT_GRID_SIZE = 200
+
+# Bounds of the search relative to the current density of the sheet
+DEFAULT_BOUNDS_FACTOR = 10
+
+# Width of the golden-section bracket, relative to the optimum, at which the refinement stops
+DEFAULT_TOLERANCE = 1e-6
+
+# Inverse golden ratio, the fraction of the bracket kept in each golden-section step
+INVERSE_GOLDEN_RATIO = (np.sqrt(5) - 1) / 2
+
+
+def levelized_cost_curve(current_densities, params, discount_rate=None, water_selling_price=None):
+    """
+    Evaluates the levelized cost of ammonia for many current densities in one vectorized pass.
+
+    Parameters:
+        current_densities (array-like): Current densities to evaluate (A/m2).
+        params (dict): Parameter mapping of one scenario, holding the polarization curve.
+        discount_rate (float, optional): The discount rate (%). Defaults to the scenario's.
+        water_selling_price (float, optional): The water selling price ($/Gal). Defaults to the scenario's.
+
+    Returns:
+        dict: Arrays with one element per current density:
+            - 'current_density': The evaluated current densities (A/m2).
+            - 'e_cell': The cell voltage from the polarization curve (V).
+            - 'electrolyser_capital_cost': Total capital cost of the electrolyser ($).
+            - 'electricity_cost': Yearly electricity cost ($).
+            - 'levelized_cost': Levelized cost of ammonia ($/kg).
+    """
+    current_densities = np.asarray(current_densities, dtype=float)
+    discount_rate = params['discount_rate'] if discount_rate is None else discount_rate
+    water_selling_price = params['water_selling_price'] if water_selling_price is None else water_selling_price
+
+    design = dict(params)
+    design['current_density'] = current_densities
+    electrolyser = electrolyser_formulae(design)
+
+    return {
+        'current_density': current_densities,
+        'e_cell': cell_voltage(current_densities, params),
+        'electrolyser_capital_cost': electrolyser[7],
+        'electricity_cost': electrolyser[10],
+        'levelized_cost': np.broadcast_to(
+            levelized_cost_of_ammonia(discount_rate, water_selling_price, design), current_densities.shape
+        ),
+    }
+
+
+@timed()
+def optimize_current_density(params=None, bounds=None, discount_rate=None, water_selling_price=None,
+                             n_grid=DEFAULT_GRID_SIZE, tolerance=DEFAULT_TOLERANCE):
+    """
+    Finds the current density that minimizes the levelized cost of ammonia.
+
+    A higher current density needs less electrolyser area, and so less capital, but a higher cell voltage
+    and so more electricity. The candidates of a log-spaced grid are evaluated as one vectorized batch,
+    then the best bracket of the grid is refined by golden-section search.
+
+    Parameters:
+        params (dict, optional): Parameter mapping of one scenario, holding the polarization curve
+            (see `electrolyser_calc.has_polarization_model`). Defaults to the parameters stored in the database.
+        bounds (tuple, optional): (lowest, highest) current density to consider (A/m2). Defaults to a tenth
+            and ten times the scenario's current density.
+        discount_rate (float, optional): The discount rate (%). Defaults to the scenario's.
+        water_selling_price (float, optional): The water selling price ($/Gal). Defaults to the scenario's.
+        n_grid (int): Number of grid candidates.
+        tolerance (float): Bracket width, relative to the optimum, at which the refinement stops.
+
+    Returns:
+        tuple: (optimum, curve):
+            - optimum: dict with the optimal 'current_density' (A/m2), its 'e_cell' (V) and 'levelized_cost' ($/kg).
+            - curve: the grid evaluated by `levelized_cost_curve`, for plotting cost against current density.
+
+    Raises:
+        ValueError: If the parameters have no polarization curve, without which the cost only falls with
+            the current density, or the bounds are not positive and increasing.
+    """
+    if params is None:
+        params = get_parameters()
+    if not has_polarization_model(params):
+        raise ValueError(
+            "The current density can only be optimized with a polarization curve; add its parameters "
+            "(reversible_potential, tafel_slope, exchange_current_density, area_specific_resistance) "
+            "to the electrolyser sheet"
+        )
+    if bounds is None:
+        bounds = (params['current_density'] / DEFAULT_BOUNDS_FACTOR, params['current_density'] * DEFAULT_BOUNDS_FACTOR)
+    low, high = bounds
+    if not 0 < low < high:
+        raise ValueError(f"Invalid current density bounds {bounds}")
+
+    # Coarse pass: every candidate in one vectorized evaluation
+    curve = levelized_cost_curve(np.geomspace(low, high, n_grid), params, discount_rate, water_selling_price)
+    best = int(np.argmin(curve['levelized_cost']))
+    grid = curve['current_density']
+    a, b = grid[max(best - 1, 0)], grid[min(best + 1, n_grid - 1)]
+
+    def cost(current_density):
+        return float(levelized_cost_curve(
+            [current_density], params, discount_rate, water_selling_price
+        )['levelized_cost'][0])
+
+    # Refinement: golden-section search within the neighbours of the best candidate
+    c, d = b - INVERSE_GOLDEN_RATIO * (b - a), a + INVERSE_GOLDEN_RATIO * (b - a)
+    cost_c, cost_d = cost(c), cost(d)
+    while b - a > tolerance * (a + b) / 2:
+        if cost_c < cost_d:
+            b, d, cost_d = d, c, cost_c
+            c = b - INVERSE_GOLDEN_RATIO * (b - a)
+            cost_c = cost(c)
+        else:
+            a, c, cost_c = c, d, cost_d
+            d = a + INVERSE_GOLDEN_RATIO * (b - a)
+            cost_d = cost(d)
+
+    current_density = (a + b) / 2
+    optimum = {
+        'current_density': current_density,
+        'e_cell': cell_voltage(current_density, params),
+        'levelized_cost': cost(current_density),
+    }
+    if best in (0, n_grid - 1):
+        logger.warning("The optimal current density %.1f A/m2 lies at the bound of %s", current_density, bounds)
+    logger.debug("Optimal current density %.1f A/m2 at %.4f $/kg", current_density, optimum['levelized_cost'])
+    return optimum, curve
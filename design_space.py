@@ -0,0 +1,197 @@
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from discounted_cash_flow import discounted_cash_flow_batch
+from input.parameters import get_parameters
+from perf import timed
+
+# Design variables an engineer controls, sampled by `sample_designs`
+DESIGN_VARIABLES = ('capacity', 'current_density', 'capacity_factor', 'maintenance_frequency', 'catalyst_percentage')
+
+# Hours in a year, the upper limit of the capacity factor
+HOURS_PER_YEAR = 8760
+
+# Default bounds of each design variable, relative to the scenario's value
+DEFAULT_BOUNDS_FACTORS = (0.5, 1.5)
+
+# Widest bounds offered for each design variable, relative to the scenario's value
+BOUNDS_LIMIT_FACTORS = (0.25, 2.0)
+
+# Values of the bundled base case, which bounds are taken relative to when a scenario sets a design
+# variable to 0 (relative bounds would collapse to a single point)
+REFERENCE_VALUES = {
+    'capacity': 1000.0, 'current_density': 3000.0, 'capacity_factor': 8000.0, 'maintenance_frequency': 3.0,
+    'catalyst_percentage': 5.0,
+}
+
+# Candidates evaluated per vectorized call, to bound peak memory
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+def _relative_bounds(params, factors):
+    bounds = {}
+    for name in DESIGN_VARIABLES:
+        value = float(params[name])
+        if value <= 0:
+            value = REFERENCE_VALUES[name]
+        bounds[name] = (value * factors[0], value * factors[1])
+    bounds['capacity_factor'] = (bounds['capacity_factor'][0], min(bounds['capacity_factor'][1], HOURS_PER_YEAR))
+    return bounds
+
+
+def default_bounds(params):
+    """
+    Returns {design variable: (low, high)} around the values of a scenario (around `REFERENCE_VALUES` for
+    values of 0); the capacity factor is capped at `HOURS_PER_YEAR`.
+    """
+    return _relative_bounds(params, DEFAULT_BOUNDS_FACTORS)
+
+
+def bounds_limits(params):
+    """
+    Returns the widest {design variable: (low, high)} bounds offered for a scenario, e.g. as slider ranges:
+    `BOUNDS_LIMIT_FACTORS` around its values (around `REFERENCE_VALUES` for values of 0), with the
+    capacity factor allowed up to `HOURS_PER_YEAR`.
+    """
+    limits = _relative_bounds(params, BOUNDS_LIMIT_FACTORS)
+    limits['capacity_factor'] = (limits['capacity_factor'][0], float(HOURS_PER_YEAR))
+    return limits
+
+
+def sample_designs(bounds, n_samples, seed=None):
+    """
+    Draws a Latin hypercube sample of the design space.
+
+    Parameters:
+        bounds (dict): Maps each design variable to its (low, high) bounds.
+        n_samples (int): Number of candidate designs.
+        seed (int, optional): Seed of the random generator, for reproducible samples.
+
+    Returns:
+        dict: Maps each design variable to an array of `n_samples` values. Each variable's range is cut into
+        `n_samples` equal strata holding one value each, so every range is covered evenly.
+    """
+    rng = np.random.default_rng(seed)
+    designs = {}
+    for name, (low, high) in bounds.items():
+        strata = (rng.permutation(n_samples) + rng.random(n_samples)) / n_samples
+        designs[name] = low + strata * (high - low)
+    return designs
+
+
+@timed()
+def evaluate_designs(designs, discount_rate, tax_rate, water_selling_price, params=None,
+                     chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Evaluates CAPEX, OPEX and NPV of every candidate design in vectorized batches.
+
+    Parameters:
+        designs (dict): Maps design variables to arrays with one value per candidate, e.g. from `sample_designs`.
+        discount_rate (float): The discount rate (%).
+        tax_rate (float): The tax rate (%).
+        water_selling_price (float): The water selling price ($/Gal).
+        params (dict, optional): Parameter mapping holding the values of every other parameter. Defaults to
+            the database.
+        chunk_size (int): Candidates per vectorized evaluation.
+
+    Returns:
+        dict: Arrays with one element per candidate: 'capex' ($), 'opex' ($/year) and 'npv' ($M).
+    """
+    if params is None:
+        params = get_parameters()
+
+    n = len(next(iter(designs.values())))
+    results = {column: np.empty(n) for column in ('capex', 'opex', 'npv')}
+    for start in range(0, n, chunk_size):
+        chunk = dict(params)
+        chunk.update((name, np.asarray(values[start:start + chunk_size], dtype=float))
+                     for name, values in designs.items())
+        evaluated = discounted_cash_flow_batch(discount_rate, tax_rate, water_selling_price, chunk)
+        for column, values in results.items():
+            values[start:start + chunk_size] = evaluated[column]
+    return results
+
+
+def pareto_front(objectives):
+    """
+    Finds the non-dominated points of two or three objectives to minimize.
+
+    A point is dominated when another one is at least as good in every objective and better in one.
+    The points are sorted by the first objective once (O(n log n)); a sweep then keeps the best trade-offs
+    of the remaining objectives seen so far: the running minimum for two objectives (O(n)), a staircase
+    searched by bisection for three. The staircase is a Python list, so each new step inserted into it
+    shifts the steps after it: three objectives take O(n log n) comparisons but O(n^2) element moves in
+    the worst case (a staircase as long as the front), which are memory moves and cheap in practice.
+
+    Parameters:
+        objectives (array-like): (n, 2) or (n, 3) array, one row per point. Negate objectives to maximize.
+
+    Returns:
+        np.ndarray: Sorted indices of the non-dominated points. Identical points are all kept.
+
+    Raises:
+        ValueError: For fewer than two or more than three objectives.
+    """
+    objectives = np.asarray(objectives, dtype=float)
+    if objectives.ndim != 2 or objectives.shape[1] not in (2, 3):
+        raise ValueError(f"Expected an (n, 2) or (n, 3) array of objectives, got shape {objectives.shape}")
+
+    # Duplicates would dominate each other in the sweep; decide once per distinct point
+    points, inverse = np.unique(objectives, axis=0, return_inverse=True)
+    # np.unique sorts the rows lexicographically, which is the sweep order
+    on_front = np.zeros(len(points), dtype=bool)
+
+    if points.shape[1] == 2:
+        best = np.inf
+        for i, (_, second) in enumerate(points):
+            if second < best:
+                on_front[i] = True
+                best = second
+    else:
+        # Staircase of non-dominated (second, third) pairs: second ascending, third strictly descending
+        seconds, thirds = [], []
+        for i, (_, second, third) in enumerate(points):
+            position = bisect_right(seconds, second)
+            if position and thirds[position - 1] <= third:
+                continue
+            on_front[i] = True
+            start = bisect_left(seconds, second)
+            end = start
+            while end < len(seconds) and thirds[end] >= third:
+                end += 1
+            seconds[start:end] = [second]
+            thirds[start:end] = [third]
+
+    return np.flatnonzero(on_front[inverse.reshape(-1)])
+
+
+@timed()
+def explore_design_space(discount_rate, tax_rate, water_selling_price, params=None, bounds=None,
+                         n_samples=5000, seed=None):
+    """
+    Samples the design space, evaluates every candidate and extracts the Pareto front of low CAPEX,
+    low OPEX and high NPV.
+
+    Parameters:
+        discount_rate, tax_rate, water_selling_price (float): As for `evaluate_designs`.
+        params (dict, optional): Parameter mapping of the scenario to explore around. Defaults to the database.
+        bounds (dict, optional): (low, high) bounds per design variable. Defaults to `default_bounds`.
+        n_samples (int): Number of candidate designs.
+        seed (int, optional): Seed of the sample.
+
+    Returns:
+        tuple: (designs, results, front):
+            - designs: the sampled design variables, as returned by `sample_designs`.
+            - results: 'capex', 'opex' and 'npv' of every candidate, as returned by `evaluate_designs`.
+            - front: indices of the Pareto-optimal candidates.
+    """
+    if params is None:
+        params = get_parameters()
+    if bounds is None:
+        bounds = default_bounds(params)
+
+    designs = sample_designs(bounds, n_samples, seed)
+    results = evaluate_designs(designs, discount_rate, tax_rate, water_selling_price, params)
+    front = pareto_front(np.column_stack([results['capex'], results['opex'], -results['npv']]))
+    return designs, results, front
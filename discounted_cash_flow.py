@@ -1,34 +1,134 @@
-import os
-import streamlit as st
 import numpy as np
-import pandas as pd
 
 # Import the functions from the necessary modules
-from input.capex_input import get_capex_data
-from input.opex_input import get_opex_data
-from input.electrolyser_input import get_electrolyser_data
-from input.pretreat import get_pretreat_equipment_cost_data
-from input.cash_flow_input import get_cash_flow_data
-from input.data_reader import populate_db_from_excel
+from escalation import (
+    category_rate, escalated_operating_cost, escalated_revenue, escalation_factors, has_escalation,
+    nominal_discount_rate, to_real
+)
 from electrolyser_calc import electrolyser_formulae
 from capex_calc import capex_formulae
 from opex_calc import opex_formulae
 from cash_flow_calc import cash_flow_formulae
+from input.parameters import get_parameters
+from perf import timed
 
-def discounted_cash_flow_analysis(discount_rate, tax_rate, water_selling_price):
+# Analysis period (0 to 20 years)
+ANALYSIS_YEARS = np.arange(0, 21)
+
+# Share of the full production sold in each year: two-thirds in year 2, full from year 3
+PRODUCTION_RAMP = np.zeros(len(ANALYSIS_YEARS))
+PRODUCTION_RAMP[2] = 2 / 3
+PRODUCTION_RAMP[3:] = 1
+
+# Columns of the cash flow schedule, in the order of the DCF table
+SCHEDULE_COLUMNS = (
+    'Annual Investment', 'Operating Cost', 'Revenue', 'Depreciation', 'Net Profit Before Taxes',
+    'Federal Income Tax', 'Net Profit After Taxes', 'Free Cash Flow', 'Cumulative Cash Flow',
+    'Net Present Value (NPV)', 'Cumulative NPV'
+)
+
+
+def cash_flow_schedule(total_capital_investment, land_cost, working_capital_total, opex, total_revenue,
+                       depreciation, tax_rate, discount_rate, yearly_opex=None, yearly_revenue=None):
     """
-    Performs a discounted cash flow (DCF) analysis to assess the profitability of a project
-    over its lifespan by considering revenue, costs, taxes, and discounting cash flows.
+    Builds the yearly cash flow schedule for one or many scenarios at once.
 
     Parameters:
-        discount_rate (float): The discount rate to apply for NPV calculations.
-        tax_rate (float): The tax rate to apply for tax calculations.
-        water_selling_price (float): The price of water to be varied for sensitivity analysis.
+        total_capital_investment, land_cost, working_capital_total, opex, total_revenue, depreciation (float or np.ndarray):
+            Outputs of the cash flow and OPEX formulae, in $.
+        tax_rate (float or np.ndarray): The tax rate to apply for tax calculations (%).
+        discount_rate (float or np.ndarray): The discount rate to apply for NPV calculations (%).
+        All array inputs must broadcast to a common shape (n,).
+        yearly_opex, yearly_revenue (np.ndarray, optional): (n, years) operating cost and revenue at full
+            production in each year, e.g. escalated by `escalation`. Default to `opex` and `total_revenue`
+            in every year.
 
     Returns:
-        pd.DataFrame: A DataFrame containing calculated DCF values, including NPV and cumulative NPV.
+        dict: Maps each name in `SCHEDULE_COLUMNS` to an (n, years) array in $, with n = 1 for scalar inputs.
     """
+    inputs = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (
+        total_capital_investment, land_cost, working_capital_total, opex, total_revenue, depreciation,
+        tax_rate, discount_rate
+    )))
+    (
+        total_capital_investment,
+        land_cost,
+        working_capital_total,
+        opex,
+        total_revenue,
+        depreciation,
+        tax_rate,
+        discount_rate
+    ) = (value.reshape(-1) for value in inputs)
+    yearly_shapes = [np.shape(yearly) for yearly in (yearly_opex, yearly_revenue) if yearly is not None]
+    shape = np.broadcast_shapes((len(opex), len(ANALYSIS_YEARS)), *yearly_shapes)
+
+    if shape[0] != len(opex):
+        # Scenarios differ only in their escalation; the yearly inputs set the number of scenarios
+        (
+            total_capital_investment, land_cost, working_capital_total, opex, total_revenue, depreciation, tax_rate,
+            discount_rate
+        ) = (np.broadcast_to(value, shape[:1]) for value in (
+            total_capital_investment, land_cost, working_capital_total, opex, total_revenue, depreciation, tax_rate,
+            discount_rate
+        ))
+
+    # Calculate initial investment values across specified years
+    initial_investment = np.zeros(shape)
+    initial_investment[:, 0] = 0.5 * total_capital_investment + land_cost
+    initial_investment[:, 1] = 0.5 * total_capital_investment + working_capital_total
+    initial_investment[:, -1] = -(land_cost + working_capital_total)
+
+    # Operating cost remains constant from year 2 onward unless it escalates
+    operating_cost = np.zeros(shape)
+    if yearly_opex is None:
+        operating_cost[:, 2:] = opex[:, None]
+    else:
+        operating_cost[:, 2:] = np.broadcast_to(yearly_opex, shape)[:, 2:]
+
+    # Revenue follows the production ramp: partial for year 2, full from year 3
+    if yearly_revenue is None:
+        revenue = total_revenue[:, None] * PRODUCTION_RAMP
+    else:
+        revenue = np.broadcast_to(yearly_revenue, shape) * PRODUCTION_RAMP
+
+    # Depreciation values applied from year 2 to year 16
+    depreciation_values = np.zeros(shape)
+    depreciation_values[:, 2:17] = depreciation[:, None]
+
+    # Calculate Net Profit Before Taxes for each year
+    net_profit_before_taxes = revenue - operating_cost - depreciation_values - initial_investment
+
+    # Calculate Federal Income Tax based on dynamic tax rate
+    federal_income_tax = np.zeros(shape)
+    federal_income_tax[:, 2:] = (tax_rate[:, None] / 100) * net_profit_before_taxes[:, 2:]
+
+    # Calculate Net Profit After Taxes
+    net_profit_after_taxes = net_profit_before_taxes - federal_income_tax
+
+    # Calculate Free Cash Flow (including depreciation)
+    free_cash_flow = net_profit_after_taxes + depreciation_values
+
+    # Calculate Net Present Value (NPV) for each year using the passed-in discount rate
+    net_present_value = free_cash_flow / ((1 + (discount_rate[:, None] / 100)) ** ANALYSIS_YEARS)
 
+    return {
+        'Annual Investment': initial_investment,
+        'Operating Cost': operating_cost,
+        'Revenue': revenue,
+        'Depreciation': depreciation_values,
+        'Net Profit Before Taxes': net_profit_before_taxes,
+        'Federal Income Tax': federal_income_tax,
+        'Net Profit After Taxes': net_profit_after_taxes,
+        'Free Cash Flow': free_cash_flow,
+        'Cumulative Cash Flow': np.cumsum(free_cash_flow, axis=1),
+        'Net Present Value (NPV)': net_present_value,
+        'Cumulative NPV': np.cumsum(net_present_value, axis=1),
+    }
+
+
+def _schedule_from_formulae(discount_rate, tax_rate, water_selling_price, params):
+    """Runs the cash flow and OPEX formulae and builds the cash flow schedule from their outputs."""
     # Retrieve parameters from cash_flow_calc module
     (
         land_cost,
@@ -39,7 +139,7 @@ def discounted_cash_flow_analysis(discount_rate, tax_rate, water_selling_price):
         total_revenue,
         water_revenue,
         ammonia_revenue
-    ) = cash_flow_formulae(water_selling_price)
+    ) = cash_flow_formulae(water_selling_price, params)
 
     # Retrieve the operating expense (opex) from opex_calc module
     (
@@ -52,88 +152,86 @@ def discounted_cash_flow_analysis(discount_rate, tax_rate, water_selling_price):
         laboratory_cost_total,
         working_capital_financing_cost,
         opex
-    ) = opex_formulae()
+    ) = opex_formulae(params)
 
-    # Retrieve other financial parameters from cash_flow_input module
-    (
-        _,
-        _,
-        water_cost_price,
-        water_selling_price,
-        ammonia_selling_price,
-        chemical_selling_price,
-        depreciation_time,
-        life_of_plant,
-        land,
-        treated_water_quantity
-    ) = get_cash_flow_data()
-
-    # Setting up the analysis period (0 to 20 years)
-    years = np.arange(0, 21)
+    # With escalation, cash flows are in money of the day and discounted at the nominal rate
+    yearly_opex = yearly_revenue = None
+    if has_escalation(params):
+        yearly_opex = escalated_operating_cost(params, ANALYSIS_YEARS)
+        yearly_revenue = escalated_revenue(water_revenue, ammonia_revenue, params, ANALYSIS_YEARS)
+        discount_rate = nominal_discount_rate(discount_rate, params)
 
-    # Calculate initial investment values across specified years
-    initial_investment = np.zeros(len(years))
-    initial_investment[0] = 0.5 * total_capital_investment + land_cost
-    initial_investment[1] = 0.5 * total_capital_investment + working_capital_total
-    initial_investment[-1] = -(land_cost + working_capital_total)
+    schedule = cash_flow_schedule(
+        total_capital_investment, land_cost, working_capital_total, opex, total_revenue, depreciation,
+        tax_rate, discount_rate, yearly_opex, yearly_revenue
+    )
+    return schedule, opex, total_revenue, water_revenue
 
-    # Operating cost remains constant from year 2 onward
-    operating_cost = np.zeros(len(years))
-    operating_cost[2:] = opex
 
-    # Revenue initialization, partial for year 2, full from year 3
-    revenue = np.zeros(len(years))
-    revenue[2] = (2 / 3) * total_revenue  # Two-thirds of revenue in year 2
-    revenue[3:] = total_revenue  # Full revenue from year 3 onward
+def project_cash_flow_schedule(discount_rate, tax_rate, water_selling_price, params=None):
+    """
+    Runs the formula chain and builds the yearly cash flow schedule of the unlevered project.
 
-    # Depreciation values applied from year 2 to year 16
-    depreciation_values = np.zeros(len(years))
-    depreciation_values[2:17] = depreciation
+    Parameters:
+        discount_rate, tax_rate, water_selling_price (float or np.ndarray): As for `discounted_cash_flow_batch`.
+        params (dict, optional): Parameter mapping whose values are floats or arrays with one element per
+            scenario. Defaults to the parameters stored in the database.
 
-    # Create DataFrame for cash flow calculations
-    discounted_cash_flow_values = pd.DataFrame({
-        'Year': years,
-        'Annual Investment': initial_investment,
-        'Operating Cost': operating_cost,
-        'Revenue': revenue,
-        'Depreciation': depreciation_values
-    })
+    Returns:
+        dict: The schedule of `cash_flow_schedule`, (n, years) arrays in $.
+    """
+    if params is None:
+        params = get_parameters()
+    return _schedule_from_formulae(discount_rate, tax_rate, water_selling_price, params)[0]
 
-    # Calculate Net Profit Before Taxes for each year
-    discounted_cash_flow_values['Net Profit Before Taxes'] = (
-        discounted_cash_flow_values['Revenue'] - 
-        discounted_cash_flow_values['Operating Cost'] - 
-        discounted_cash_flow_values['Depreciation'] - 
-        discounted_cash_flow_values['Annual Investment']
-    )
 
-    # Calculate Federal Income Tax based on dynamic tax rate
-    federal_income_tax = np.zeros(len(years))
-    federal_income_tax[2:] = (tax_rate / 100) * discounted_cash_flow_values['Net Profit Before Taxes'][2:]
-    discounted_cash_flow_values['Federal Income Tax'] = federal_income_tax
+def discounted_cash_flow_schedule(discount_rate, tax_rate, water_selling_price, params=None, basis='nominal',
+                                  periods='annual', **period_options):
+    """
+    Builds the unrounded yearly schedule behind `discounted_cash_flow_analysis`.
 
-    # Calculate Net Profit After Taxes
-    discounted_cash_flow_values['Net Profit After Taxes'] = (
-        discounted_cash_flow_values['Net Profit Before Taxes'] - 
-        discounted_cash_flow_values['Federal Income Tax']
-    )
+    Parameters:
+        discount_rate, tax_rate, water_selling_price, params, basis, periods, period_options: As for
+            `discounted_cash_flow_analysis`.
 
-    # Calculate Free Cash Flow (including depreciation)
-    discounted_cash_flow_values['Free Cash Flow'] = (
-        discounted_cash_flow_values['Net Profit After Taxes'] + 
-        discounted_cash_flow_values['Depreciation']
-    )
+    Returns:
+        dict: Maps each name in `SCHEDULE_COLUMNS` to a (1, years) array in $, in the requested basis.
+    """
+    if params is None:
+        params = get_parameters()
 
-    # Calculate Cumulative Cash Flow as the cumulative sum of Free Cash Flow
-    discounted_cash_flow_values['Cumulative Cash Flow'] = discounted_cash_flow_values['Free Cash Flow'].cumsum()
+    if periods == 'annual':
+        schedule, _, _, _ = _schedule_from_formulae(discount_rate, tax_rate, water_selling_price, params)
+    else:
+        from periodic_cash_flow import annual_rollup, period_cash_flow_schedule
 
-    # Calculate Net Present Value (NPV) for each year using the passed-in discount rate
-    discounted_cash_flow_values['Net Present Value (NPV)'] = (
-        discounted_cash_flow_values['Free Cash Flow'] / ((1 + (discount_rate / 100)) ** (discounted_cash_flow_values['Year']))
-    )
+        schedule = annual_rollup(period_cash_flow_schedule(
+            discount_rate, tax_rate, water_selling_price, params, periods, **period_options
+        ))
+    if basis == 'real' and has_escalation(params):
+        schedule = to_real(schedule, params, ANALYSIS_YEARS, SCHEDULE_COLUMNS[:8])
+        schedule['Cumulative Cash Flow'] = np.cumsum(schedule['Free Cash Flow'], axis=1)
+    return schedule
+
+
+def discounted_cash_flow_table(schedule):
+    """
+    Formats a schedule of `discounted_cash_flow_schedule` as the DCF table: one row per year, in $M
+    rounded to 2 decimal places.
+
+    Parameters:
+        schedule (dict): The schedule, (1, years) arrays in $.
+
+    Returns:
+        pd.DataFrame: The DCF table, with a 'Year' column.
+    """
+    # pandas is only needed for the table, so headless batch workers never import it
+    import pandas as pd
 
-    # Calculate Cumulative NPV
-    discounted_cash_flow_values['Cumulative NPV'] = discounted_cash_flow_values['Net Present Value (NPV)'].cumsum()
+    # Create DataFrame for cash flow calculations
+    discounted_cash_flow_values = pd.DataFrame({'Year': ANALYSIS_YEARS})
+    for column in SCHEDULE_COLUMNS:
+        discounted_cash_flow_values[column] = schedule[column][0]
 
     # Normalize all monetary values by dividing by 1,000,000
     discounted_cash_flow_values.iloc[:, 1:] /= 1_000_000
@@ -144,10 +242,183 @@ def discounted_cash_flow_analysis(discount_rate, tax_rate, water_selling_price):
     return discounted_cash_flow_values
 
 
+@timed()
+def discounted_cash_flow_analysis(discount_rate, tax_rate, water_selling_price, params=None, basis='nominal',
+                                  periods='annual', **period_options):
+    """
+    Performs a discounted cash flow (DCF) analysis to assess the profitability of a project
+    over its lifespan by considering revenue, costs, taxes, and discounting cash flows.
+
+    Parameters:
+        discount_rate (float): The discount rate to apply for NPV calculations. With inflation (see
+            `escalation`), this is the real rate and cash flows are discounted at the matching nominal rate.
+        tax_rate (float): The tax rate to apply for tax calculations.
+        water_selling_price (float): The price of water to be varied for sensitivity analysis.
+        params (dict, optional): Parameter mapping as returned by `get_parameters`. Defaults to the database.
+        basis (str): 'nominal' reports cash flows in money of the day, 'real' in money of year 0. The present
+            values are the same on both bases.
+        periods (str): 'annual', or 'quarterly' or 'monthly' to model the cash flows period by period (see
+            `periodic_cash_flow.period_cash_flow_schedule`, which takes `period_options`) and roll them up
+            into the yearly table.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing calculated DCF values, including NPV and cumulative NPV.
+            The values are rounded for display; derived metrics such as the IRR should be computed from
+            `discounted_cash_flow_schedule` instead.
+    """
+    return discounted_cash_flow_table(discounted_cash_flow_schedule(
+        discount_rate, tax_rate, water_selling_price, params, basis, periods, **period_options
+    ))
+
+
+@timed()
+def discounted_cash_flow_batch(discount_rate, tax_rate, water_selling_price, params=None):
+    """
+    Evaluates the DCF headline metrics for many scenarios in one vectorized pass.
+
+    Parameters:
+        discount_rate, tax_rate, water_selling_price (float or np.ndarray): As for `discounted_cash_flow_analysis`,
+            either scalars or arrays with one element per scenario.
+        params (dict, optional): Parameter mapping whose values are floats or arrays with one element per
+            scenario. Defaults to the parameters stored in the database.
+
+    Returns:
+        dict: Arrays with one element per scenario:
+            - 'npv': Final cumulative NPV ($M).
+            - 'irr': Internal rate of return of the free cash flow (%), NaN where it does not exist.
+            - 'capex', 'opex', 'total_revenue': Outputs of the formula chain ($).
+    """
+    if params is None:
+        params = get_parameters()
+
+    schedule, opex, total_revenue, _ = _schedule_from_formulae(discount_rate, tax_rate, water_selling_price, params)
+    capex = capex_formulae(params)[9]
+    n = len(schedule['Cumulative NPV'])
+
+    return {
+        'npv': schedule['Cumulative NPV'][:, -1] / 1_000_000,
+        'irr': internal_rate_of_return(schedule['Free Cash Flow']),
+        'capex': np.broadcast_to(capex, (n,)).astype(float),
+        'opex': np.broadcast_to(opex, (n,)).astype(float),
+        'total_revenue': np.broadcast_to(total_revenue, (n,)).astype(float),
+    }
+
+
+@timed()
+def levelized_cost_of_ammonia(discount_rate, water_selling_price, params=None):
+    """
+    Computes the levelized cost of ammonia (LCOA): the constant ammonia price at which the discounted
+    pre-tax cash flow of the project breaks even.
+
+        LCOA = sum_t (investment_t + operating cost_t - water revenue_t) / (1 + r)^t
+               / sum_t ammonia production_t / (1 + r)^t
+
+    Treated water is a by-product, so its revenue is credited against the costs. Investment, operating
+    cost and production follow the same yearly schedule as `cash_flow_schedule`. With escalation, costs
+    and the water credit are in money of the day, discounted at the nominal rate, so the LCOA is the
+    constant nominal price that breaks even.
+
+    Parameters:
+        discount_rate (float or np.ndarray): The discount rate r (%).
+        water_selling_price (float or np.ndarray): The price of the treated water by-product ($/Gal).
+        params (dict, optional): Parameter mapping whose values are floats or arrays with one element per
+            scenario. Defaults to the parameters stored in the database.
+
+    Returns:
+        float or np.ndarray: The LCOA in $/kg; an array with one element per scenario when there are several.
+    """
+    if params is None:
+        params = get_parameters()
+
+    net_cost, production = levelized_cost_terms(water_selling_price, params)
+    if has_escalation(params):
+        discount_rate = nominal_discount_rate(discount_rate, params)
+    discount_factors = 1 / (1 + np.reshape(discount_rate, (-1, 1)) / 100) ** ANALYSIS_YEARS
+
+    levelized_cost = (net_cost * discount_factors).sum(axis=1) / (production * discount_factors).sum(axis=1)
+    return levelized_cost if len(levelized_cost) > 1 else float(levelized_cost[0])
+
+
+def levelized_cost_terms(water_selling_price, params):
+    """
+    Returns the yearly terms of the levelized cost of ammonia, which do not depend on the discount rate.
+
+    Parameters:
+        water_selling_price (float or np.ndarray): The price of the treated water by-product ($/Gal).
+        params (dict): Parameter mapping whose values are floats or arrays with one element per scenario.
+
+    Returns:
+        tuple: (net_cost, production), (n, years) arrays: the investment and operating cost less the water
+        credit ($, in money of the day with escalation) and the ammonia production (kg). Discounting both
+        at the (nominal) rate and dividing their sums gives the LCOA.
+    """
+    schedule, _, _, water_revenue = _schedule_from_formulae(0, 0, water_selling_price, params)
+    water_credit = np.reshape(water_revenue, (-1, 1)) * PRODUCTION_RAMP
+    if has_escalation(params):
+        water_credit = water_credit * escalation_factors(category_rate(params, 'water'), ANALYSIS_YEARS)
+
+    # Annual ammonia production at full rate: kg/day over the operating hours of the day, times hours/year
+    annual_production = np.reshape(params['capacity'] / params['time'] * params['capacity_factor'], (-1, 1))
+    net_cost = schedule['Annual Investment'] + schedule['Operating Cost'] - water_credit
+    return net_cost, np.broadcast_to(annual_production * PRODUCTION_RAMP, net_cost.shape)
+
+
+def internal_rate_of_return(cash_flows, low=-99.0, high=1000.0, tolerance=1e-6, max_iterations=200):
+    """
+    Computes the internal rate of return (IRR) of yearly cash flows by bisection.
+
+    Parameters:
+        cash_flows (array-like): Cash flows indexed by year, starting at year 0. A 2-D array holds one
+            series per row and is solved for all rows at once.
+        low (float): Lower bound of the search interval (%).
+        high (float): Upper bound of the search interval (%).
+        tolerance (float): Width of the interval (%) at which the search stops.
+        max_iterations (int): Maximum number of bisection steps.
+
+    Returns:
+        float or np.ndarray: The IRR in percent (one per row for 2-D input), NaN where the NPV does not
+        change sign within the interval.
+    """
+    cash_flows = np.asarray(cash_flows, dtype=float)
+    # Year-major copy, so each step of the recurrence reads one contiguous row rather than a strided column
+    flows_by_year = np.ascontiguousarray(np.atleast_2d(cash_flows).T)
+    n = flows_by_year.shape[1]
+
+    def npv(rate):
+        # Horner's scheme in 1 / (1 + rate) avoids one power per year and scenario
+        factor = 1 / (1 + rate / 100)
+        value = np.zeros(n)
+        for flows in flows_by_year[::-1]:
+            value = value * factor + flows
+        return value
+
+    low = np.full(n, low)
+    high = np.full(n, high)
+    npv_low = npv(low)
+    solvable = np.sign(npv_low) != np.sign(npv(high))
+
+    for _ in range(max_iterations):
+        mid = (low + high) / 2
+        npv_mid = npv(mid)
+        same_sign = np.sign(npv_mid) == np.sign(npv_low)
+        low = np.where(same_sign, mid, low)
+        npv_low = np.where(same_sign, npv_mid, npv_low)
+        high = np.where(same_sign, high, mid)
+        if np.all(high - low < tolerance):
+            break
+
+    irr = np.where(solvable, (low + high) / 2, np.nan)
+    return float(irr[0]) if cash_flows.ndim == 1 else irr
+
+
 if __name__ == "__main__":
+    from profiler import capture_from_env
+
     # Example usage: Run DCF analysis with a specified discount rate, tax rate, and water selling price
     discount_rate = 5.0  # Example value
     tax_rate = 20.0  # Example value
     water_selling_price = 0.00679  # Example value for water price
-    dcf_result = discounted_cash_flow_analysis(discount_rate, tax_rate, water_selling_price)
+    # Set TEA_PROFILE=<directory> to write a profile of this run
+    with capture_from_env("discounted_cash_flow"):
+        dcf_result = discounted_cash_flow_analysis(discount_rate, tax_rate, water_selling_price)
     print(dcf_result)
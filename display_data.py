@@ -1,5 +1,21 @@
+import contextvars
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
 import streamlit as st
 
+from charts import pareto_front_figure, portfolio_figure
+from design_space import DESIGN_VARIABLES, bounds_limits, default_bounds, explore_design_space
+from input.parameters import PARAMETER_NAMES
+from input.scenarios import delete_scenario, list_scenarios, load_scenarios, save_variant, scenario_overrides
+from perf import stage
+from portfolio import ALLOCATION_KEYS, DEFAULT_START_YEAR, portfolio_analysis
+
+# Worker threads shared by all sessions for computing heavy views in the background
+_view_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="tea-view")
+
 def display_default_data(capex_data, opex_data, electrolyser_data, cash_flow_data, pretreat_data):
     """
     Displays the Default Data section in Streamlit with separate tabs for each data category.
@@ -126,3 +142,402 @@ def display_calculated_data(calc_capex_data, calc_opex_data, calc_electrolyser_d
             st.write(calc_cash_flow_data)
         except Exception as e:
             st.error(f"Error calculating Cash Flow: {e}")
+
+def display_headline_metrics(dcf_result, irr, levelized_cost):
+    """
+    Displays the headline results of the discounted cash flow analysis ahead of any heavy view.
+    
+    Parameters:
+    -----------
+    dcf_result : DataFrame
+        The discounted cash flow values returned by `discounted_cash_flow_analysis`.
+    irr : float
+        The internal rate of return (%) of the free cash flow, NaN if it does not exist.
+    levelized_cost : float
+        The levelized cost of ammonia ($/kg) returned by `levelized_cost_of_ammonia`.
+    
+    Returns:
+    --------
+    None
+        This function displays the final NPV, the IRR, the levelized cost and the DCF table within Streamlit.
+    """
+    npv_column, irr_column, cost_column = st.columns(3)
+    npv_column.metric("Final Cumulative NPV ($M)", f"{dcf_result['Cumulative NPV'].iloc[-1]:,.2f}")
+    irr_column.metric("Internal Rate of Return (%)", "n/a" if math.isnan(irr) else f"{irr:.2f}")
+    cost_column.metric("Levelized Cost of Ammonia ($/kg)", f"{levelized_cost:,.3f}")
+
+    st.subheader("Discounted Cash Flow Values ($M)")
+    st.dataframe(dcf_result.T)
+
+def display_financing(financed, financing):
+    """
+    Displays the valuation of the financed project and its yearly debt schedule.
+    
+    Parameters:
+    -----------
+    financed : dict
+        The metrics returned by `financed_cash_flow_batch` for the active case.
+    financing : dict
+        The schedule returned by `financing_schedule` for the active case, in $.
+    
+    Returns:
+    --------
+    None
+        This function displays the WACC, the NPV at the WACC, the equity NPV and IRR, and the schedule in $M.
+    """
+    st.subheader("Debt Financing")
+    wacc_column, npv_column, equity_npv_column, equity_irr_column = st.columns(4)
+    wacc_column.metric("WACC (%)", f"{financed['wacc'][0]:.2f}")
+    npv_column.metric("NPV at WACC ($M)", f"{financed['npv'][0]:,.2f}")
+    equity_npv_column.metric("Equity NPV ($M)", f"{financed['equity_npv'][0]:,.2f}")
+    equity_irr = financed['equity_irr'][0]
+    equity_irr_column.metric("Equity IRR (%)", "n/a" if math.isnan(equity_irr) else f"{equity_irr:.2f}")
+
+    table = pd.DataFrame({column: values[0] / 1_000_000 for column, values in financing.items()}).round(2)
+    st.dataframe(table.rename_axis("Year").T)
+
+def display_deferred_views(views):
+    """
+    Displays heavy views through placeholders that are filled as their background computations finish.
+    
+    Parameters:
+    -----------
+    views : list of tuple
+        Pairs of (title, build) where `build` is a callable returning a Plotly figure and a list of
+        error messages. The callables run on worker threads and must not call Streamlit themselves.
+    
+    Returns:
+    --------
+    None
+        This function renders a section per view, in order, and fills each one when its figure is ready.
+    
+    Notes:
+    ------
+    A view that raises is reported in its own section without affecting the other views.
+    """
+    placeholders = {}
+    for title, build in views:
+        st.markdown("<hr>", unsafe_allow_html=True)
+        st.subheader(title)
+        placeholder = st.empty()
+        placeholder.info(f"Computing {title}...")
+        # Run the build in a copy of this context so its stages land in the current rerun's trace
+        future = _view_executor.submit(contextvars.copy_context().run, build)
+        placeholders[future] = (title, placeholder)
+
+    for future in as_completed(placeholders):
+        title, placeholder = placeholders[future]
+        try:
+            fig, errors = future.result()
+        except Exception as e:
+            placeholder.error(f"Error computing {title}: {e}")
+            continue
+        with placeholder.container():
+            for error in errors:
+                st.error(error)
+            with stage("plotly_chart"):
+                st.plotly_chart(fig)
+
+def display_performance_panel(trace):
+    """
+    Displays the collapsible sidebar panel with the per-stage timings of the current rerun.
+    
+    Parameters:
+    -----------
+    trace : perf.Trace or None
+        The trace recorded during this rerun, or None when instrumentation is disabled.
+    
+    Returns:
+    --------
+    None
+        This function renders the instrumentation toggle, the stage table and a JSON export button.
+    
+    Notes:
+    ------
+    The toggle is read from session state at the start of the next rerun, so switching it on
+    takes effect from that rerun onwards.
+    """
+    with st.sidebar.expander("Performance"):
+        st.checkbox("Record stage timings", key="perf_enabled")
+        st.checkbox("Track memory per stage (tracemalloc)", key="perf_memory")
+        st.checkbox("Profile reruns (cProfile + stack sampling)", key="profile_enabled")
+        if trace is None:
+            st.caption("Instrumentation is disabled.")
+            return
+
+        st.caption(f"Rerun took {trace.wall_time * 1000:,.1f} ms with {trace.total_queries} database queries.")
+        st.dataframe(pd.DataFrame(trace.rows()).set_index("stage"))
+        if trace.memory:
+            st.caption("Memory per stage (KiB)")
+            memory_rows = trace.memory_rows()
+            st.dataframe(pd.DataFrame(memory_rows).drop(columns="top_sites").set_index("stage"))
+            for row in memory_rows:
+                with st.popover(f"Top allocation sites: {row['stage']}"):
+                    st.code("\n".join(row["top_sites"]) or "No allocations recorded.", language=None)
+        st.download_button(
+            "Export trace (JSON)", trace.to_json(), file_name="tea_trace.json", mime="application/json"
+        )
+
+def display_profile(profile):
+    """
+    Displays the profiler capture of the current rerun with its flamegraph exports.
+    
+    Parameters:
+    -----------
+    profile : profiler.Profile
+        The profile captured while rendering this rerun.
+    
+    Returns:
+    --------
+    None
+        This function renders the pstats summary table and download buttons for the speedscope,
+        collapsed-stack and pstats text exports.
+    """
+    st.markdown("<hr>", unsafe_allow_html=True)
+    with st.expander(f"Profile of this rerun ({profile.wall_time * 1000:,.1f} ms)"):
+        sort = st.radio("Sort by", ["cumulative", "tottime"], horizontal=True, key="profile_sort")
+        st.dataframe(pd.DataFrame(profile.stats_rows(sort=sort)).set_index("function"))
+
+        speedscope_column, collapsed_column, pstats_column = st.columns(3)
+        speedscope_column.download_button(
+            "Speedscope (JSON)", json.dumps(profile.speedscope()),
+            file_name=f"{profile.name}.speedscope.json", mime="application/json"
+        )
+        collapsed_column.download_button(
+            "Collapsed stacks", profile.collapsed_stacks(),
+            file_name=f"{profile.name}.collapsed.txt", mime="text/plain"
+        )
+        pstats_column.download_button(
+            "pstats summary", profile.stats_text(limit=100),
+            file_name=f"{profile.name}.pstats.txt", mime="text/plain"
+        )
+
+def select_scenario(db_file_path):
+    """
+    Displays the scenario picker at the top of the sidebar.
+    
+    Parameters:
+    -----------
+    db_file_path : str
+        The path to the SQLite database holding the scenarios.
+    
+    Returns:
+    --------
+    str
+        The name of the active scenario; 'base' until another one is picked.
+    """
+    names = [name for _, name, *_ in list_scenarios(db_file_path)] or ['base']
+    # A scenario saved or deleted in the previous rerun is applied before the widget is created
+    if 'scenario_pending' in st.session_state:
+        st.session_state['scenario'] = st.session_state.pop('scenario_pending')
+    if st.session_state.get('scenario') not in names:
+        st.session_state['scenario'] = 'base' if 'base' in names else names[0]
+
+    st.sidebar.header("Scenario")
+    return st.sidebar.selectbox("Active scenario", names, key="scenario")
+
+def display_scenario_manager(scenario, parameters, slider_values, db_file_path):
+    """
+    Displays the sidebar panel to save the current settings as a what-if scenario or delete one.
+    
+    Parameters:
+    -----------
+    scenario : str
+        The active scenario, which becomes the parent of a saved scenario.
+    parameters : dict
+        The resolved parameters of the active scenario.
+    slider_values : dict
+        The sidebar slider values by parameter name; the ones that differ from `parameters` are saved
+        as overrides along with the rows entered in the editor.
+    db_file_path : str
+        The path to the SQLite database holding the scenarios.
+    
+    Returns:
+    --------
+    None
+        This function saves or deletes scenarios and reruns the script to switch to the result.
+    """
+    with st.sidebar.expander("Scenario Manager"):
+        own = scenario_overrides(scenario, db_file_path)
+        if scenario != 'base':
+            st.caption(f"'{scenario}' overrides {len(own)} parameter(s) of its parent.")
+            st.dataframe(pd.DataFrame({"value": own}).rename_axis("parameter"))
+
+        with st.form("save_scenario", clear_on_submit=True):
+            name = st.text_input("Scenario name")
+            edited = st.data_editor(
+                pd.DataFrame({"parameter": pd.Series(dtype=str), "value": pd.Series(dtype=float)}),
+                num_rows="dynamic",
+                column_config={"parameter": st.column_config.SelectboxColumn(options=sorted(PARAMETER_NAMES))},
+                key="scenario_overrides",
+            )
+            submitted = st.form_submit_button(f"Save as variant of '{scenario}'")
+
+        if submitted:
+            overrides = {key: value for key, value in slider_values.items() if value != parameters[key]}
+            overrides.update(
+                (row.parameter, row.value) for row in edited.dropna().itertuples(index=False)
+            )
+            try:
+                if not name.strip():
+                    raise ValueError("Enter a scenario name.")
+                save_variant(name.strip(), overrides, parent=scenario, db_file_path=db_file_path)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.session_state['scenario_pending'] = name.strip()
+                st.rerun()
+
+        if scenario != 'base' and st.button(f"Delete '{scenario}'"):
+            try:
+                delete_scenario(scenario, db_file_path)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.session_state['scenario_pending'] = 'base'
+                st.rerun()
+
+# Slider labels of the design variables explored by `display_design_explorer`
+DESIGN_LABELS = {
+    'capacity': "Capacity (kg/day)",
+    'current_density': "Current Density (A/m2)",
+    'capacity_factor': "Capacity Factor (hours/year)",
+    'maintenance_frequency': "Maintenance Frequency (per year)",
+    'catalyst_percentage': "Catalyst Percentage (%)",
+}
+
+def display_design_explorer(scenario, parameters, discount_rate, tax_rate, water_price, db_file_path):
+    """
+    Displays the design space exploration: sampling bounds, the Pareto front chart and click-to-load.
+    
+    Parameters:
+    -----------
+    scenario : str
+        The active scenario, explored around and the parent of a loaded design.
+    parameters : dict
+        The resolved parameters of the active scenario.
+    discount_rate, tax_rate, water_price : float
+        The sidebar values the candidates are evaluated at.
+    db_file_path : str
+        The path to the SQLite database holding the scenarios.
+    
+    Returns:
+    --------
+    None
+        This function explores the design space on request and, when a point of the chart is clicked,
+        saves its design as a variant of the active scenario and switches to it.
+    
+    Notes:
+    ------
+    The last exploration is kept in the session until the scenario changes, so reruns do not resample.
+    """
+    st.markdown("<hr>", unsafe_allow_html=True)
+    st.subheader("Design Space Exploration: Pareto Front of CAPEX, OPEX and NPV")
+
+    defaults = default_bounds(parameters)
+    limits = bounds_limits(parameters)
+    with st.form("design_space"):
+        bounds = {}
+        for name in DESIGN_VARIABLES:
+            low, high = limits[name]
+            bounds[name] = st.slider(
+                DESIGN_LABELS[name], min_value=low, max_value=high,
+                value=tuple(float(bound) for bound in defaults[name]), key=f"bounds:{name}:{scenario}"
+            )
+        n_samples = st.number_input("Candidate designs", min_value=100, max_value=200_000, value=5000, step=100)
+        explore = st.form_submit_button("Explore design space")
+
+    if explore:
+        st.session_state['design_exploration'] = (
+            scenario, explore_design_space(discount_rate, tax_rate, water_price, parameters, bounds, int(n_samples))
+        )
+
+    exploration = st.session_state.get('design_exploration')
+    if exploration is None or exploration[0] != scenario:
+        return
+    designs, results, front = exploration[1]
+
+    st.caption(f"{len(front)} of {len(results['npv'])} candidates are Pareto-optimal. "
+               "Click a point to load its design as the active case.")
+    with stage("plotly_chart"):
+        event = st.plotly_chart(
+            pareto_front_figure(designs, results, front), on_select="rerun", selection_mode="points",
+            key=f"pareto_front:{scenario}"
+        )
+
+    points = event["selection"]["points"] if event else []
+    if points:
+        index = int(points[0]['customdata'][0])
+        name = f"{scenario} pareto #{index}"
+        try:
+            save_variant(name, {variable: float(designs[variable][index]) for variable in designs},
+                         parent=scenario, db_file_path=db_file_path)
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.session_state['scenario_pending'] = name
+            st.rerun()
+
+def display_portfolio(discount_rate, tax_rate, water_price, db_file_path):
+    """
+    Displays the portfolio mode: a fleet of saved scenarios, one per site, evaluated together.
+    
+    Parameters:
+    -----------
+    discount_rate, tax_rate, water_price : float
+        The sidebar values the fleet is evaluated at.
+    db_file_path : str
+        The path to the SQLite database holding the scenarios.
+    
+    Returns:
+    --------
+    None
+        This function evaluates the selected sites on request and shows the fleet's NPV and IRR, its cash
+        flow by calendar year and the value attributed to each site after its share of the shared costs.
+    """
+    st.markdown("<hr>", unsafe_allow_html=True)
+    st.subheader("Portfolio: Fleet of Sites with Shared Costs")
+
+    names = [name for _, name, *_ in list_scenarios(db_file_path)]
+    with st.form("portfolio"):
+        sites = st.multiselect("Sites (saved scenarios)", names, default=names[:2])
+        first_column, stagger_column = st.columns(2)
+        first_year = first_column.number_input(
+            "First Start Year", min_value=2000, max_value=2100, value=DEFAULT_START_YEAR, step=1
+        )
+        stagger = stagger_column.number_input("Years Between Site Starts", min_value=0, max_value=20, value=1, step=1)
+        cost_column, key_column = st.columns(2)
+        shared_cost = cost_column.number_input("Shared Overhead ($/year)", min_value=0.0, value=0.0, step=10_000.0)
+        allocation = key_column.selectbox("Allocated By", ALLOCATION_KEYS)
+        evaluate = st.form_submit_button("Evaluate portfolio")
+
+    if evaluate and sites:
+        try:
+            portfolio = portfolio_analysis(
+                discount_rate, tax_rate, water_price, load_scenarios(sites, db_file_path),
+                start_years=[first_year + stagger * position for position in range(len(sites))],
+                shared_costs={'overhead': shared_cost}, allocation={'overhead': allocation}
+            )
+        except ValueError as e:
+            st.error(str(e))
+            return
+        st.session_state['portfolio_analysis'] = (sites, portfolio)
+
+    if 'portfolio_analysis' not in st.session_state:
+        return
+    sites, portfolio = st.session_state['portfolio_analysis']
+
+    npv_column, irr_column, sites_column = st.columns(3)
+    npv_column.metric("Portfolio NPV ($M)", f"{portfolio['npv']:,.2f}")
+    irr = portfolio['irr']
+    irr_column.metric("Portfolio IRR (%)", "n/a" if math.isnan(irr) else f"{irr:.2f}")
+    sites_column.metric("Sites", len(sites))
+
+    with stage("plotly_chart"):
+        st.plotly_chart(portfolio_figure(portfolio))
+    st.dataframe(pd.DataFrame({
+        "Site": sites,
+        "Stand-alone NPV ($M)": portfolio['site_npv'],
+        "Shared Costs ($M)": portfolio['site_shared_cost'],
+        "Attributed Value ($M)": portfolio['site_value'],
+    }).round(2), hide_index=True)
@@ -1,71 +1,133 @@
 
-# Import the get_electrolyser_data function from the input.electrolyser_input module
-from input.electrolyser_input import get_electrolyser_data
-from input.opex_input import get_opex_data
+import logging
 
-def electrolyser_formulae():
+import numpy as np
+
+from calc_utils import round_values
+from input.parameters import OPTIONAL_PARAMETERS, get_parameters
+from perf import timed
+
+logger = logging.getLogger(__name__)
+
+# Fitted parameters of the polarization curve, optional rows of the electrolyser sheet
+POLARIZATION_PARAMETERS = OPTIONAL_PARAMETERS['electrolyser']
+
+
+def has_polarization_model(params):
+    """Returns True when `params` holds every parameter of the polarization curve."""
+    return all(params.get(name) is not None for name in POLARIZATION_PARAMETERS)
+
+
+def cell_voltage(current_density, params):
+    """
+    Evaluates the polarization curve: the cell voltage needed to run at a given current density.
+
+        e_cell = reversible_potential + tafel_slope * log10(j / exchange_current_density)
+                 + area_specific_resistance * j
+
+    Parameters:
+    ----------
+    current_density (float or np.ndarray): Current density j (A/m2).
+    params (dict): Parameter mapping holding `POLARIZATION_PARAMETERS`: the reversible potential (V), the
+        Tafel slope (V/decade), the exchange current density (A/m2) and the area specific resistance (ohm m2).
+        Values may be arrays that broadcast against `current_density`.
+
+    Returns:
+    -------
+    float or np.ndarray
+        The cell voltage (V). The activation term is clipped at 0 below the exchange current density.
+    """
+    current_density = np.asarray(current_density, dtype=float)
+    activation = params['tafel_slope'] * np.log10(current_density / params['exchange_current_density'])
+    voltage = (
+        params['reversible_potential'] + np.maximum(activation, 0)
+        + params['area_specific_resistance'] * current_density
+    )
+    return voltage if voltage.ndim else float(voltage)
+
+
+def fit_polarization_curve(current_densities, voltages, reversible_potential):
+    """
+    Fits the polarization curve of `cell_voltage` to measured points by linear least squares.
+
+    Parameters:
+    ----------
+    current_densities (array-like): Measured current densities (A/m2), all above the exchange current density.
+    voltages (array-like): The measured cell voltages (V).
+    reversible_potential (float): The thermodynamic cell potential (V), which is not fitted.
+
+    Returns:
+    -------
+    dict
+        The `POLARIZATION_PARAMETERS` values, ready to be added as rows of the electrolyser sheet.
+    """
+    current_densities = np.asarray(current_densities, dtype=float)
+    overpotential = np.asarray(voltages, dtype=float) - reversible_potential
+
+    # overpotential = intercept + tafel_slope * log10(j) + area_specific_resistance * j,
+    # with intercept = -tafel_slope * log10(exchange_current_density)
+    design = np.column_stack([np.ones_like(current_densities), np.log10(current_densities), current_densities])
+    (intercept, tafel_slope, area_specific_resistance), *_ = np.linalg.lstsq(design, overpotential, rcond=None)
+
+    return {
+        'reversible_potential': float(reversible_potential),
+        'tafel_slope': float(tafel_slope),
+        'exchange_current_density': float(10 ** (-intercept / tafel_slope)),
+        'area_specific_resistance': float(area_specific_resistance),
+    }
+
+
+@timed()
+def electrolyser_formulae(params=None):
     """
     This function contains all formulae for computing additional inputs to the TEA model.
     It first reads all the variables needed for additional computauion.
     Note that this computations will be done in python, rather than excel since the user will be provided with the flexibility to manipulate the values.
-    """
-    # Call the function to retrieve the data (electrolyser and opex data since we need it for calculation)
-    (
-        faradaic_constant,
-        time,
-        no_of_electrons,
-        faradaic_efficiency,
-        molar_weight,
-        capacity,
-        capacity_factor,
-        current_density,
-        reactor_cost,
-        e_cell,
-        balance_of_plant,
-        maintenance_frequency,
-        maintenance_factor,
-        catalyst_percentage,
-        catalyst_lifespan,
-        capacity_factor,
-        electrolyser_installation_cost,
-        separation_cost
-    ) = get_electrolyser_data()
-
-    (
-        base_labour_wage,
-        no_of_labourers,
-        supervision,
-        direct_overhead,
-        general_overhead,
-        insurance,
-        miscellaneous,
-        laboratory_cost,
-        working_capital_financing,
-        electricity_unit_cost,
-        raw_material,
-        pump_power,
-        chemical_cost,
-        chemical_quantity
-    ) = get_opex_data()
-
-    # Print values for debugging
-    print("Faradaic Constant:", faradaic_constant)
-    print("Time:", time)
-    print("Number of Electrons:", no_of_electrons)
-    print("Faradaic Efficiency:", faradaic_efficiency)
-    print("Molar Weight:", molar_weight)
-    print("Capacity:", capacity)
-    print("Current Density:", current_density)
-    print("Reactor Cost:", reactor_cost)
-    print("E Cell:", e_cell)
-    print("Balance of Plant:", balance_of_plant)
-    print("Maintenance Frequency:", maintenance_frequency)
-    print("Maintenance Factor:", maintenance_factor)
-    print("Catalyst Percentage:", catalyst_percentage)
-    print("Catalyst Lifespan:", catalyst_lifespan)
-    print("Capacity Factor:", capacity_factor)
-    print("Separation_cost", separation_cost)
 
+    Parameters:
+    ----------
+    params (dict, optional): Parameter mapping as returned by `get_parameters`. Values may be floats or numpy
+        arrays of equal shape, in which case every output is an array with one element per scenario.
+        Defaults to the parameters stored in the database. When it holds the polarization curve
+        (see `has_polarization_model`), e_cell follows the current density instead of the 'e_cell' row.
+    """
+    # Retrieve the data (electrolyser and opex data since we need it for calculation)
+    if params is None:
+        params = get_parameters()
+
+    faradaic_constant = params['faradaic_constant']
+    time = params['time']
+    no_of_electrons = params['no_of_electrons']
+    faradaic_efficiency = params['faradaic_efficiency']
+    molar_weight = params['molar_weight']
+    capacity = params['capacity']
+    capacity_factor = params['capacity_factor']
+    current_density = params['current_density']
+    reactor_cost = params['reactor_cost']
+    e_cell = params['e_cell']
+    balance_of_plant = params['balance_of_plant']
+    maintenance_frequency = params['maintenance_frequency']
+    maintenance_factor = params['maintenance_factor']
+    catalyst_percentage = params['catalyst_percentage']
+    catalyst_lifespan = params['catalyst_lifespan']
+    electrolyser_installation_cost = params['electrolyser_installation_cost']
+    separation_cost = params['separation_cost']
+    electricity_unit_cost = params['electricity_unit_cost']
+
+    # Higher current densities shrink the reactor but need a higher cell voltage
+    if has_polarization_model(params):
+        e_cell = cell_voltage(current_density, params)
+
+    # Log values for debugging
+    logger.debug(
+        "Electrolyser inputs: Faradaic Constant=%s, Time=%s, Number of Electrons=%s, Faradaic Efficiency=%s, "
+        "Molar Weight=%s, Capacity=%s, Current Density=%s, Reactor Cost=%s, E Cell=%s, Balance of Plant=%s, "
+        "Maintenance Frequency=%s, Maintenance Factor=%s, Catalyst Percentage=%s, Catalyst Lifespan=%s, "
+        "Capacity Factor=%s, Separation Cost=%s",
+        faradaic_constant, time, no_of_electrons, faradaic_efficiency, molar_weight, capacity, current_density,
+        reactor_cost, e_cell, balance_of_plant, maintenance_frequency, maintenance_factor, catalyst_percentage,
+        catalyst_lifespan, capacity_factor, separation_cost
+    )
 
     # Now you can use the variables as needed: Current
     current = (no_of_electrons*faradaic_constant*capacity)/(molar_weight*3600*(faradaic_efficiency/100)*time)
@@ -119,20 +181,20 @@ def electrolyser_formulae():
     electrolyer_opex = electrolyser_voc + electrolyser_foc
 
     return (
-        round(current, 2),
-        round(kg_per_year, 2),
-        round(energy_consumed_kWh_kg, 2),
-        round(power_consumed_kW, 2),
-        round(total_reactor_cost, 2),
-        round(b_o_p, 2),
-        round(cat_cost, 2),
-        round(total_electrolyer_capital_cost, 2),
-        round(electrolyser_pec, 2),
-        round(total_electrolyer_capital_cost, 2),
-        round(total_electricity_cost, 2),
-        round(electrolyer_opex, 2),
-        round(electrolyser_foc, 2),
-        round(electrolyser_voc, 2)
+        round_values(current, 2),
+        round_values(kg_per_year, 2),
+        round_values(energy_consumed_kWh_kg, 2),
+        round_values(power_consumed_kW, 2),
+        round_values(total_reactor_cost, 2),
+        round_values(b_o_p, 2),
+        round_values(cat_cost, 2),
+        round_values(total_electrolyer_capital_cost, 2),
+        round_values(electrolyser_pec, 2),
+        round_values(total_electrolyer_capital_cost, 2),
+        round_values(total_electricity_cost, 2),
+        round_values(electrolyer_opex, 2),
+        round_values(electrolyser_foc, 2),
+        round_values(electrolyser_voc, 2)
     )
 
 
@@ -0,0 +1,164 @@
+import numpy as np
+
+from electrolyser_calc import electrolyser_formulae
+from opex_calc import opex_formulae
+
+# Escalated cost and price categories and the optional cash_flow parameter holding each yearly rate (%).
+# A category's rate is its total nominal escalation, inflation included; a category without a rate of
+# its own follows the general inflation (see `category_rate`), so it keeps its value in real terms.
+ESCALATION_RATES = {
+    'electricity': 'electricity_escalation',
+    'labour': 'labour_escalation',
+    'water': 'water_escalation',
+    'ammonia_price': 'ammonia_price_escalation',
+    'maintenance': 'maintenance_escalation',
+}
+
+# General inflation (%/year); costs and prices without their own rate follow it
+INFLATION_RATE = 'inflation_rate'
+
+# Cash flows are reported in money of the day ('nominal') or in money of year 0 ('real')
+BASES = ('nominal', 'real')
+
+
+def has_escalation(params):
+    """Returns True when `params` sets any escalation or inflation rate other than 0."""
+    return any(np.any(params.get(name, 0)) for name in (*ESCALATION_RATES.values(), INFLATION_RATE))
+
+
+def category_rate(params, category):
+    """
+    Returns the yearly escalation (%) of a category of `ESCALATION_RATES`: its own rate where `params` sets
+    one, otherwise the general inflation (0 when that is not set either).
+
+    Parameters:
+        params (dict): Parameter mapping. A rate may be missing, or NaN for the scenarios of a batch that
+            do not set it.
+        category (str): A key of `ESCALATION_RATES`.
+
+    Returns:
+        float or np.ndarray: The rate, one per scenario when any input is an array.
+    """
+    inflation = params.get(INFLATION_RATE, 0)
+    rate = params.get(ESCALATION_RATES[category])
+    if rate is None:
+        return inflation
+    rate = np.asarray(rate, dtype=float)
+    return np.where(np.isnan(rate), inflation, rate) if np.isnan(rate).any() else rate
+
+
+def escalation_factors(rate, years):
+    """
+    Precomputes the factor matrix (1 + rate) ** year of a yearly escalation rate.
+
+    Parameters:
+        rate (float or np.ndarray): Yearly escalation (%), a scalar or one rate per scenario.
+        years (np.ndarray): The analysis years, counted from year 0 when prices are quoted.
+
+    Returns:
+        np.ndarray: (n, years) multipliers, with n = 1 for a scalar rate.
+    """
+    return (1 + np.reshape(np.asarray(rate, dtype=float), (-1, 1)) / 100) ** years
+
+
+def opex_by_category(params):
+    """
+    Splits the yearly operating cost of `opex_formulae` into the escalated categories.
+
+    Parameters:
+        params (dict): Parameter mapping with float or numpy array values.
+
+    Returns:
+        dict: Yearly cost ($) of 'electricity' (electrolyser and separation unit), 'labour' (supervision,
+        overheads and laboratory), 'water' (raw water), 'maintenance' (electrolyser) and
+        'other' (everything else), which sum to the OPEX.
+    """
+    (
+        labour_cost,
+        supervision_cost,
+        direct_overhead_cost,
+        general_overhead_cost,
+        insurance_cost,
+        miscellaneous_cost,
+        laboratory_cost_total,
+        working_capital_financing_cost,
+        opex
+    ) = opex_formulae(params)
+    electrolyser = electrolyser_formulae(params)
+    total_electrolyer_capital_cost, total_electricity_cost = electrolyser[7], electrolyser[10]
+
+    categories = {
+        'electricity': total_electricity_cost
+        + params['electricity_unit_cost'] * params['pump_power'] * params['capacity_factor'],
+        'labour': supervision_cost + direct_overhead_cost + general_overhead_cost + laboratory_cost_total,
+        'water': params['raw_material'] * params['water_cost_price'],
+        'maintenance': params['maintenance_frequency'] * params['maintenance_factor']
+        * total_electrolyer_capital_cost / 100,
+    }
+    categories['other'] = opex - sum(categories.values())
+    return categories
+
+
+def escalated_operating_cost(params, years):
+    """
+    Builds the yearly operating cost with each category escalated at its own rate.
+
+    Parameters:
+        params (dict): Parameter mapping; 'other' costs and categories without a rate follow inflation.
+        years (np.ndarray): The analysis years.
+
+    Returns:
+        np.ndarray: (n, years) operating cost in money of the day ($), before the operating period is applied.
+    """
+    categories = opex_by_category(params)
+    inflation = escalation_factors(params.get(INFLATION_RATE, 0), years)
+    total = np.reshape(categories.pop('other'), (-1, 1)) * inflation
+    for category, cost in categories.items():
+        factors = escalation_factors(category_rate(params, category), years)
+        total = total + np.reshape(cost, (-1, 1)) * factors
+    return total
+
+
+def escalated_revenue(water_revenue, ammonia_revenue, params, years):
+    """
+    Builds the yearly revenue with the water and ammonia prices escalated at their own rates.
+
+    Parameters:
+        water_revenue, ammonia_revenue (float or np.ndarray): Yearly revenue at year-0 prices ($).
+        params (dict): Parameter mapping holding the optional rates; prices without a rate follow inflation.
+        years (np.ndarray): The analysis years.
+
+    Returns:
+        np.ndarray: (n, years) revenue in money of the day ($), before the production ramp is applied.
+    """
+    return (
+        np.reshape(water_revenue, (-1, 1)) * escalation_factors(category_rate(params, 'water'), years)
+        + np.reshape(ammonia_revenue, (-1, 1)) * escalation_factors(category_rate(params, 'ammonia_price'), years)
+    )
+
+
+def nominal_discount_rate(discount_rate, params):
+    """Converts the real discount rate (%) into the nominal rate of the inflation in `params` (Fisher)."""
+    inflation = np.asarray(params.get(INFLATION_RATE, 0), dtype=float) / 100
+    return ((1 + np.asarray(discount_rate, dtype=float) / 100) * (1 + inflation) - 1) * 100
+
+
+def to_real(schedule, params, years, columns):
+    """
+    Restates the money columns of a nominal schedule in money of year 0.
+
+    Parameters:
+        schedule (dict): (n, years) arrays in money of the day.
+        params (dict): Parameter mapping holding the optional inflation rate.
+        years (np.ndarray): The analysis years.
+        columns (iterable): The columns to deflate. Present values need no restating: discounting the real
+            cash flows at the real rate gives the same values as the nominal ones at the nominal rate.
+
+    Returns:
+        dict: A copy of `schedule` with `columns` deflated.
+    """
+    deflator = escalation_factors(params.get(INFLATION_RATE, 0), years)
+    real = dict(schedule)
+    for column in columns:
+        real[column] = schedule[column] / deflator
+    return real
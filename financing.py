@@ -0,0 +1,193 @@
+import numpy as np
+
+from discounted_cash_flow import ANALYSIS_YEARS, internal_rate_of_return, project_cash_flow_schedule
+from escalation import INFLATION_RATE, escalation_factors, nominal_discount_rate
+from input.parameters import get_parameters
+from perf import timed
+
+# How the loan principal is paid back over the tenor
+REPAYMENT_TYPES = ('annuity', 'linear', 'bullet')
+
+# First year of operation, after the two construction years of `cash_flow_schedule`
+FIRST_OPERATING_YEAR = 2
+
+# Columns of the financing schedule, in the order of the financing table
+FINANCING_COLUMNS = (
+    'Debt Drawdown', 'Interest', 'Principal', 'Debt Service', 'Debt Balance', 'Tax Shield', 'Equity Cash Flow'
+)
+
+
+def _per_scenario(value):
+    """Shapes a scenario value as an (n, 1) column that broadcasts against the (n, years) schedule."""
+    return np.asarray(value, dtype=float).reshape(-1, 1)
+
+
+def weighted_average_cost_of_capital(debt_fraction, interest_rate, cost_of_equity, tax_rate):
+    """
+    Computes the after-tax weighted average cost of capital.
+
+        WACC = (1 - D) * cost of equity + D * interest rate * (1 - tax rate)
+
+    Parameters:
+        debt_fraction (float or np.ndarray): Share D of the capital investment financed by debt (%).
+        interest_rate (float or np.ndarray): Interest rate of the debt (%).
+        cost_of_equity (float or np.ndarray): Return required by the equity holders (%).
+        tax_rate (float or np.ndarray): The tax rate (%), against which interest is deductible.
+
+    Returns:
+        float or np.ndarray: The WACC (%).
+    """
+    debt_fraction = np.asarray(debt_fraction, dtype=float) / 100
+    return (1 - debt_fraction) * cost_of_equity + debt_fraction * interest_rate * (1 - np.asarray(tax_rate) / 100)
+
+
+def financing_schedule(schedule, tax_rate, debt_fraction, interest_rate, tenor, grace_period=0,
+                       repayment_type='annuity'):
+    """
+    Builds the yearly debt schedule and the cash flows to equity for one or many scenarios at once.
+
+    Debt finances `debt_fraction` of the capital invested in the construction years and is drawn as it is
+    invested. Interest on the outstanding balance is paid every year. Repayment starts in the first
+    operating year after the grace period and runs for `tenor` years; whatever is still outstanding at the
+    end of the analysis period is repaid in its last year.
+
+    Parameters:
+        schedule (dict): The unlevered schedule of `cash_flow_schedule`, (n, years) arrays in $.
+        tax_rate (float or np.ndarray): The tax rate (%). Interest paid in operating years shields taxes.
+        debt_fraction (float or np.ndarray): Share of the capital investment financed by debt (%).
+        interest_rate (float or np.ndarray): Interest rate of the debt (%).
+        tenor (int or np.ndarray): Years over which the principal is repaid, after the grace period.
+        grace_period (int or np.ndarray): Interest-only years between the start of operation and repayment.
+        repayment_type (str): One of `REPAYMENT_TYPES`: 'annuity' pays a constant debt service, 'linear'
+            equal principal installments, 'bullet' the whole principal in the last year of the tenor.
+        All array inputs have one element per scenario and broadcast against the schedule rows.
+
+    Returns:
+        dict: Maps each name in `FINANCING_COLUMNS` to an (n, years) array in $. 'Debt Balance' is the
+        balance at the end of each year; 'Equity Cash Flow' is the free cash flow plus drawdowns, minus
+        debt service, plus the tax shield.
+
+    Raises:
+        ValueError: If `repayment_type` is not one of `REPAYMENT_TYPES`.
+    """
+    if repayment_type not in REPAYMENT_TYPES:
+        raise ValueError(f"Unknown repayment type {repayment_type!r}; expected one of {', '.join(REPAYMENT_TYPES)}")
+
+    investment = schedule['Annual Investment']
+    shape = np.broadcast_shapes(investment.shape, np.shape(_per_scenario(debt_fraction)),
+                                np.shape(_per_scenario(interest_rate)), np.shape(_per_scenario(tenor)),
+                                np.shape(_per_scenario(grace_period)), np.shape(_per_scenario(tax_rate)))
+    rate = np.broadcast_to(_per_scenario(interest_rate) / 100, shape)
+    tenor = np.broadcast_to(np.maximum(np.rint(_per_scenario(tenor)), 1), shape)
+    start = np.broadcast_to(FIRST_OPERATING_YEAR + np.maximum(np.rint(_per_scenario(grace_period)), 0), shape)
+
+    # Debt is drawn as capital is invested, before operation starts
+    drawdown = np.zeros(shape)
+    construction = slice(0, FIRST_OPERATING_YEAR)
+    drawdown[:, construction] = _per_scenario(debt_fraction) / 100 * np.maximum(investment[:, construction], 0)
+    principal_amount = drawdown.sum(axis=1, keepdims=True)
+
+    # Years since the start of repayment; the tenor is the window 0 <= k < tenor
+    k = ANALYSIS_YEARS - start
+    in_tenor = (k >= 0) & (k < tenor)
+
+    if repayment_type == 'linear':
+        principal = np.where(in_tenor, principal_amount / tenor, 0.0)
+    elif repayment_type == 'bullet':
+        principal = np.where(k == tenor - 1, principal_amount, 0.0)
+    else:
+        # Constant payment A = P r / (1 - (1 + r)^-tenor); its principal part grows as (A - r P) (1 + r)^k
+        with np.errstate(divide='ignore', invalid='ignore'):
+            growth = (1 + rate) ** np.where(in_tenor, k, 0)
+            annuity_principal = principal_amount * rate / ((1 + rate) ** tenor - 1) * growth
+        principal = np.where(in_tenor, np.where(rate > 0, annuity_principal, principal_amount / tenor), 0.0)
+
+    # Anything still outstanding at the end of the analysis period is repaid in its last year
+    principal[:, -1] += principal_amount[:, 0] - principal.sum(axis=1)
+
+    balance = np.cumsum(drawdown - principal, axis=1)
+    interest = np.zeros(shape)
+    interest[:, 1:] = rate[:, 1:] * balance[:, :-1]
+
+    # Interest is deductible in the years the schedule is taxed
+    tax_shield = np.zeros(shape)
+    tax_shield[:, FIRST_OPERATING_YEAR:] = (
+        np.broadcast_to(_per_scenario(tax_rate), shape)[:, FIRST_OPERATING_YEAR:] / 100
+        * interest[:, FIRST_OPERATING_YEAR:]
+    )
+
+    debt_service = interest + principal
+    return {
+        'Debt Drawdown': drawdown,
+        'Interest': interest,
+        'Principal': principal,
+        'Debt Service': debt_service,
+        'Debt Balance': balance,
+        'Tax Shield': tax_shield,
+        'Equity Cash Flow': schedule['Free Cash Flow'] + drawdown - debt_service + tax_shield,
+    }
+
+
+def _discounted_sum(cash_flows, rate):
+    return (cash_flows / (1 + _per_scenario(rate) / 100) ** ANALYSIS_YEARS).sum(axis=1)
+
+
+@timed()
+def financed_cash_flow_batch(tax_rate, water_selling_price, params=None, debt_fraction=None, interest_rate=None,
+                             tenor=None, grace_period=None, repayment_type='annuity', cost_of_equity=None,
+                             basis='nominal'):
+    """
+    Evaluates the financed project for many scenarios in one vectorized pass.
+
+    Parameters:
+        tax_rate, water_selling_price (float or np.ndarray): As for `discounted_cash_flow_batch`.
+        params (dict, optional): Parameter mapping whose values are floats or arrays with one element per
+            scenario. Defaults to the parameters stored in the database.
+        debt_fraction, interest_rate, tenor, grace_period (float or np.ndarray, optional): See
+            `financing_schedule`. Each defaults to the optional cash_flow parameter of the same name
+            ('loan_tenor' for the tenor); without it the project is equity funded, the interest rate and
+            grace period are 0, and the tenor is 10 years.
+        repayment_type (str): See `financing_schedule`.
+        cost_of_equity (float or np.ndarray, optional): Real return required by the equity holders (%).
+            Defaults to the 'cost_of_equity' parameter, then to the scenario's discount rate, so an equity
+            funded project has the NPV of `discounted_cash_flow_batch`. The equity cash flows are in money
+            of the day and are discounted at the matching nominal rate, like the project's.
+        basis (str): One of `escalation.BASES`, the basis of the equity IRR: 'real' deflates the equity cash
+            flows by the general inflation first, as `discounted_cash_flow_schedule` does for the project.
+
+    Returns:
+        dict: Arrays with one element per scenario:
+            - 'wacc': The weighted average cost of capital (%).
+            - 'npv': Final cumulative NPV of the free cash flow discounted at the WACC ($M).
+            - 'equity_npv': NPV of the equity cash flows at the nominal cost of equity ($M).
+            - 'equity_irr': IRR of the equity cash flows in `basis` (%), NaN where it does not exist.
+    """
+    if params is None:
+        params = get_parameters()
+
+    def parameter(value, name, default):
+        return params.get(name, default) if value is None else value
+
+    debt_fraction = parameter(debt_fraction, 'debt_fraction', 0.0)
+    interest_rate = parameter(interest_rate, 'interest_rate', 0.0)
+    tenor = parameter(tenor, 'loan_tenor', 10)
+    grace_period = parameter(grace_period, 'grace_period', 0)
+    cost_of_equity = parameter(cost_of_equity, 'cost_of_equity', params['discount_rate'])
+
+    wacc = weighted_average_cost_of_capital(debt_fraction, interest_rate, cost_of_equity, tax_rate)
+    schedule = project_cash_flow_schedule(wacc, tax_rate, water_selling_price, params)
+    financing = financing_schedule(
+        schedule, tax_rate, debt_fraction, interest_rate, tenor, grace_period, repayment_type
+    )
+    equity_cash_flow = financing['Equity Cash Flow']
+    n = len(equity_cash_flow)
+    equity_npv = _discounted_sum(equity_cash_flow, nominal_discount_rate(cost_of_equity, params)) / 1_000_000
+    if basis == 'real':
+        equity_cash_flow = equity_cash_flow / escalation_factors(params.get(INFLATION_RATE, 0), ANALYSIS_YEARS)
+
+    return {
+        'wacc': np.broadcast_to(wacc, (n,)).astype(float),
+        'npv': schedule['Cumulative NPV'][:, -1] / 1_000_000,
+        'equity_npv': equity_npv,
+        'equity_irr': internal_rate_of_return(equity_cash_flow),
+    }
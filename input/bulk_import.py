@@ -0,0 +1,157 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from input.connection import transaction, write_connection
+from input.parameters import PARAMETER_TABLES, get_parameters
+from input.schema import migrate, parameter_rows, save_scenario
+from perf import timed
+
+logger = logging.getLogger(__name__)
+
+# Workbooks parsed per worker task and written per transaction
+DEFAULT_BATCH_SIZE = 50
+
+
+def find_workbooks(directory):
+    """
+    Lists the site workbooks below a directory.
+
+    Parameters:
+    ----------
+    directory : str
+        The directory to scan recursively for '.xlsx' files. Excel lock files ('~$...') are skipped.
+
+    Returns:
+    -------
+    list
+        (site, path) pairs sorted by site. The site is the workbook's path relative to `directory`
+        without the extension, or the directory holding it when the workbook is named 'input.xlsx'
+        (e.g. 'plant_a/input.xlsx' -> 'plant_a').
+    """
+    workbooks = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith('.xlsx') or name.startswith('~$'):
+                continue
+            path = os.path.join(root, name)
+            site = os.path.relpath(path, directory)[:-len('.xlsx')]
+            if name == 'input.xlsx' and os.path.dirname(site):
+                site = os.path.dirname(site)
+            workbooks.append((site.replace(os.sep, '/'), path))
+    return sorted(workbooks)
+
+
+def parse_workbook(path):
+    """
+    Reads the parameter rows of one workbook without pandas.
+
+    Parameters:
+    ----------
+    path : str
+        The path to a workbook laid out like 'data/input.xlsx'.
+
+    Returns:
+    -------
+    list
+        (table_name, category, value, units) rows, as returned by `input.schema.parameter_rows`.
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    rows = []
+    try:
+        for table in PARAMETER_TABLES:
+            if table not in workbook.sheetnames:
+                logger.warning("Sheet '%s' not found in %s.", table, path)
+                continue
+            sheet_rows = workbook[table].iter_rows(values_only=True)
+            rows.extend(parameter_rows(table, next(sheet_rows, ()), sheet_rows))
+    finally:
+        workbook.close()
+    return rows
+
+
+def _parse_batch(workbooks):
+    return [(site, parse_workbook(path)) for site, path in workbooks]
+
+
+@timed('bulk_import')
+def import_workbook_directory(directory, db_path, workers=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Imports every site workbook below a directory into one SQLite database, one scenario per site.
+
+    Parameters:
+    ----------
+    directory : str
+        The directory holding one workbook per site (see `find_workbooks`).
+    db_path : str
+        The SQLite database to write, migrated to the schema of `input.schema` first. Sites imported
+        before keep their scenario_id; their version is incremented when their values changed.
+    workers : int, optional
+        Worker processes parsing the workbooks. Defaults to the CPU count; 0 or 1 parses in this process.
+    batch_size : int, optional
+        Workbooks per worker task; each parsed batch is written in one transaction.
+
+    Returns:
+    -------
+    dict
+        Maps each imported site to its scenario_id.
+
+    Logging:
+    -------
+    - Logs at INFO level the number of workbooks and rows imported.
+    """
+    workbooks = find_workbooks(directory)
+    batches = [workbooks[start:start + batch_size] for start in range(0, len(workbooks), batch_size)]
+    workers = os.cpu_count() if workers is None else workers
+
+    scenario_ids = {}
+    n_rows = 0
+    with write_connection(db_path) as conn:
+        migrate(conn)
+
+        if workers > 1 and len(batches) > 1:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            parsed_batches = executor.map(_parse_batch, batches)
+        else:
+            executor = None
+            parsed_batches = map(_parse_batch, batches)
+
+        try:
+            for parsed in parsed_batches:
+                with transaction(conn):
+                    for site, rows in parsed:
+                        scenario_ids[site] = save_scenario(conn, site, rows)
+                n_rows += sum(len(rows) for _, rows in parsed)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    logger.info("Imported %d workbooks (%d rows) from %s into %s", len(workbooks), n_rows, directory, db_path)
+    return scenario_ids
+
+
+def get_site_parameters(db_path, scenario_id):
+    """
+    Fetches the parameters of one imported site.
+
+    Parameters:
+    ----------
+    db_path : str
+        A database written by `import_workbook_directory`.
+    scenario_id : int
+        The site's scenario_id, as returned by `import_workbook_directory`.
+
+    Returns:
+    -------
+    dict
+        The same flat mapping as `get_parameters`, which this reads through: each site is a scenario of
+        the `input.schema` store, so this is one primary-key range query.
+
+    Raises:
+    ------
+    ValueError
+        If no site has this scenario_id.
+    """
+    return get_parameters(db_path, scenario_id)
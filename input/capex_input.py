@@ -1,6 +1,12 @@
-import sqlite3
+import logging
 import pandas as pd
 
+from input.connection import read_connection
+from perf import timed, count_query
+
+logger = logging.getLogger(__name__)
+
+@timed('db.capex_factors')
 def get_capex_data():
     """
     Fetches CAPEX data from the SQLite database and returns key CAPEX variables for computation.
@@ -23,28 +29,28 @@ def get_capex_data():
     
     Database Connection:
     -------------------
-    - Connects to the SQLite database located at 'data/database.db' and retrieves the 'capex_factors' table.
+    - Reads the 'capex_factors' table through this thread's pooled read-only connection to the configured
+      database (see `input.connection.database_path`).
     
-    Debugging:
-    ---------
-    - Prints the DataFrame fetched from the database for verification.
-    - Prints the keys of the dictionary after converting the DataFrame to ensure proper formatting.
-    - If a key is not found when attempting to retrieve a value, a warning message is printed, and a default value is used.
+    Logging:
+    -------
+    - Logs the DataFrame fetched from the database at DEBUG level for verification.
+    - Logs the keys of the dictionary after converting the DataFrame at DEBUG level to ensure proper formatting.
+    - If a key is not found when attempting to retrieve a value, a warning is logged, and a default value is used.
     """
-    db_file_path = 'data/database.db'
     query = "SELECT * FROM capex_factors"
     
-    with sqlite3.connect(db_file_path) as conn:
-        capex_data = pd.read_sql_query(query, conn)
+    capex_data = pd.read_sql_query(query, read_connection())
+    count_query()
     
-    # Print the data to debug if the key exists
-    print(capex_data)
+    # Log the data to debug if the key exists
+    logger.debug("Fetched 'capex_factors' table:\n%s", capex_data)
 
     # Convert the DataFrame to a dictionary, normalizing the keys to lowercase and stripping all spaces
     capex_factors_data_dict = capex_data.set_index(capex_data['Category'].str.replace(' ', '').str.lower())['Value'].to_dict()
     
-    # Print dictionary keys for debugging
-    print(capex_factors_data_dict.keys())
+    # Log dictionary keys for debugging
+    logger.debug("Normalized 'capex_factors' keys: %s", capex_factors_data_dict.keys())
     
     def get_value(key, default=None):
         """
@@ -66,7 +72,7 @@ def get_capex_data():
         try:
             return capex_factors_data_dict[key.replace(' ', '').strip().lower()]  # Normalize key access
         except KeyError:
-            print(f"Warning: '{key}' not found in the data. Using default value: {default}")
+            logger.warning("'%s' not found in the data. Using default value: %s", key, default)
             return default
 
     # Retrieve variables with safe access
@@ -1,6 +1,12 @@
-import sqlite3
+import logging
 import pandas as pd
 
+from input.connection import read_connection
+from perf import timed, count_query
+
+logger = logging.getLogger(__name__)
+
+@timed('db.cash_flow')
 def get_cash_flow_data():
     """
     Fetches Cash Flow data from the SQLite database and returns key cash flow variables for computation.
@@ -25,28 +31,28 @@ def get_cash_flow_data():
     
     Database Connection:
     -------------------
-    - Connects to the SQLite database located at 'data/database.db' and retrieves the 'cash_flow' table.
+    - Reads the 'cash_flow' table through this thread's pooled read-only connection to the configured
+      database (see `input.connection.database_path`).
     
-    Debugging:
-    ---------
-    - Prints the DataFrame fetched from the database for verification.
-    - Prints the keys of the dictionary after converting the DataFrame to ensure proper formatting.
-    - If a key is not found when attempting to retrieve a value, a warning message is printed, and a default value is used.
+    Logging:
+    -------
+    - Logs the DataFrame fetched from the database at DEBUG level for verification.
+    - Logs the keys of the dictionary after converting the DataFrame at DEBUG level to ensure proper formatting.
+    - If a key is not found when attempting to retrieve a value, a warning is logged, and a default value is used.
     """
-    db_file_path = 'data/database.db'
     query = "SELECT * FROM cash_flow"
     
-    with sqlite3.connect(db_file_path) as conn:
-        cash_flow_data = pd.read_sql_query(query, conn)
+    cash_flow_data = pd.read_sql_query(query, read_connection())
+    count_query()
     
-    # Print the data to debug if the key exists
-    print(cash_flow_data)
+    # Log the data to debug if the key exists
+    logger.debug("Fetched 'cash_flow' table:\n%s", cash_flow_data)
 
     # Convert the DataFrame to a dictionary, normalizing the keys to lowercase and stripping all spaces
     cash_flow_data_dict = cash_flow_data.set_index(cash_flow_data['Category'].str.replace(' ', '').str.lower())['Value'].to_dict()
     
-    # Print dictionary keys for debugging
-    print(cash_flow_data_dict.keys())
+    # Log dictionary keys for debugging
+    logger.debug("Normalized 'cash_flow' keys: %s", cash_flow_data_dict.keys())
     
     def get_value(key, default=None):
         """
@@ -68,7 +74,7 @@ def get_cash_flow_data():
         try:
             return cash_flow_data_dict[key.replace(' ', '').strip().lower()]  # Normalize key access
         except KeyError:
-            print(f"Warning: '{key}' not found in the data. Using default value: {default}")
+            logger.warning("'%s' not found in the data. Using default value: %s", key, default)
             return default
 
     # Retrieve variables with safe access
@@ -0,0 +1,168 @@
+import logging
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Database used when neither a path nor TEA_DB_PATH is given; independent of the working directory
+DEFAULT_DB_PATH = os.path.join(REPO_ROOT, 'data', 'database.db')
+
+# Bytes of the database file readers map into memory instead of copying pages through read() calls
+MMAP_SIZE = 256 * 1024 * 1024
+
+# Seconds a writer waits for another writer before giving up with "database is locked"
+BUSY_TIMEOUT = 30.0
+
+# Idle read connections kept per database for the next thread that reads it; surplus ones are closed
+MAX_IDLE_READERS = 8
+
+# A thread leases one read-only connection per database for as long as it runs. Streamlit runs every
+# rerun on a new script thread, so connections return to the idle pool when their thread ends and the
+# next rerun reuses them instead of opening new ones.
+_readers = threading.local()
+_idle_readers = {}
+_idle_lock = threading.Lock()
+
+
+class _Lease:
+    """The read connections of one thread, handed back to the idle pool when the thread ends."""
+
+    def __init__(self):
+        self.connections = {}
+        # The thread's locals are released when it ends, which runs the finalizer
+        weakref.finalize(self, _release, self.connections)
+
+
+def _release(connections):
+    for path, conn in connections.items():
+        if conn.in_transaction:
+            conn.execute('ROLLBACK')
+        with _idle_lock:
+            idle = _idle_readers.setdefault(path, [])
+            if len(idle) < MAX_IDLE_READERS:
+                idle.append(conn)
+                continue
+        conn.close()
+    connections.clear()
+
+
+def database_path(db_file_path=None):
+    """
+    Resolves the database location.
+
+    Parameters:
+    ----------
+    db_file_path : str, optional
+        An explicit path. Defaults to the TEA_DB_PATH environment variable, then to data/database.db in
+        the repository.
+
+    Returns:
+    -------
+    str
+        The absolute path of the database file.
+    """
+    return os.path.abspath(db_file_path or os.environ.get('TEA_DB_PATH') or DEFAULT_DB_PATH)
+
+
+def read_connection(db_file_path=None):
+    """
+    Returns this thread's pooled read-only connection to the database.
+
+    The connection is leased to the calling thread until it ends, then reused by a later thread (see
+    `MAX_IDLE_READERS`), so a new Streamlit rerun thread normally gets an open connection.
+
+    Parameters:
+    ----------
+    db_file_path : str, optional
+        The database to read, resolved with `database_path`.
+
+    Returns:
+    -------
+    sqlite3.Connection
+        An autocommit connection with `query_only` and `mmap_size` set. It must not be shared with other
+        threads or closed by the caller. Each statement reads the last committed state; use
+        `read_transaction` to read several statements from one snapshot.
+    """
+    path = database_path(db_file_path)
+    lease = getattr(_readers, 'lease', None)
+    if lease is None:
+        lease = _readers.lease = _Lease()
+    conn = lease.connections.get(path)
+    if conn is None:
+        with _idle_lock:
+            idle = _idle_readers.get(path)
+            conn = idle.pop() if idle else None
+        if conn is None:
+            # Not bound to this thread, as it moves to another one once this thread ends
+            conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, isolation_level=None, check_same_thread=False)
+            conn.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+            conn.execute('PRAGMA query_only = ON')
+            logger.debug("Opened read connection to %s on thread %s", path, threading.current_thread().name)
+        lease.connections[path] = conn
+    return conn
+
+
+@contextmanager
+def read_transaction(db_file_path=None):
+    """
+    Yields this thread's read connection inside a read transaction, so that every statement sees the
+    same committed snapshot even while a writer swaps in new data.
+    """
+    conn = read_connection(db_file_path)
+    conn.execute('BEGIN')
+    try:
+        yield conn
+    finally:
+        conn.execute('COMMIT')
+
+
+def close_read_connections():
+    """Closes the read connections leased by the calling thread, and the idle ones."""
+    lease = getattr(_readers, 'lease', None)
+    connections = list(lease.connections.values()) if lease is not None else []
+    if lease is not None:
+        lease.connections.clear()
+    with _idle_lock:
+        for idle in _idle_readers.values():
+            connections.extend(idle)
+        _idle_readers.clear()
+    for conn in connections:
+        conn.close()
+
+
+@contextmanager
+def write_connection(db_file_path=None):
+    """
+    Yields a new autocommit connection for writing, with the database switched to WAL journal mode.
+
+    In WAL mode readers keep reading the last committed snapshot while a write transaction is open,
+    so they never block on a writer and never see its partial changes. Group the writes with
+    `transaction`. The connection is closed on exit.
+    """
+    conn = sqlite3.connect(database_path(db_file_path), timeout=BUSY_TIMEOUT, isolation_level=None)
+    try:
+        conn.execute('PRAGMA journal_mode = WAL')
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def transaction(conn):
+    """
+    Runs the enclosed statements in one write transaction on a `write_connection`: committed together
+    on success, rolled back on error. BEGIN IMMEDIATE takes the write lock up front, so concurrent
+    writers queue up for `BUSY_TIMEOUT` instead of failing halfway through.
+    """
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
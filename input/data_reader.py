@@ -1,5 +1,10 @@
+import logging
 import pandas as pd
-import sqlite3
+
+from input.connection import transaction, write_connection
+from perf import timed, count_query
+
+logger = logging.getLogger(__name__)
 
 def read_excel_data(file_path):
     """
@@ -15,11 +20,11 @@ def read_excel_data(file_path):
     dict
         A dictionary where the keys are the sheet names (as specified in the function) and the values are 
         pandas DataFrames containing the data from each corresponding sheet. If a sheet is not found in 
-        the Excel file, it is skipped, and a message is printed for debugging purposes.
+        the Excel file, it is skipped, and a warning is logged.
     
-    Debugging:
-    ---------
-    - Prints messages indicating whether each specified sheet is successfully loaded or not.
+    Logging:
+    -------
+    - Logs at DEBUG level each sheet that is loaded, and a warning for each sheet that is missing.
     """
     sheet_names = ['capex_factors', 'opex_factors', 'electrolyser', 'cash_flow', 'pretreat_equipment_cost'] # These are the sheets holding the data.
     data_dict = {}
@@ -28,14 +33,40 @@ def read_excel_data(file_path):
     for sheet in sheet_names:
         if sheet in excel_file.sheet_names:
             data_dict[sheet] = pd.read_excel(file_path, sheet_name=sheet)
-            # For debugging purposes.
-            print(f"Loaded data from sheet '{sheet}' into the dictionary.")
+            logger.debug("Loaded data from sheet '%s' into the dictionary.", sheet)
         else:
-            # For debugging purposes.
-            print(f"Sheet '{sheet}' not found in the Excel file.")
+            logger.warning("Sheet '%s' not found in the Excel file.", sheet)
     
     return data_dict
 
+# Sheets of optional models, written to a table of the same name when the workbook has them
+OPTIONAL_SHEETS = ('learning_curves',)
+
+def read_optional_sheets(file_path):
+    """
+    Reads the optional sheets of an Excel file.
+    
+    Parameters:
+    ----------
+    file_path : str
+        The path to the Excel file (e.g., 'data/input.xlsx').
+    
+    Returns:
+    -------
+    dict
+        Maps each name in `OPTIONAL_SHEETS` found in the workbook to its DataFrame. Missing sheets are
+        left out without a warning.
+    """
+    excel_file = pd.ExcelFile(file_path)
+    return {
+        sheet: pd.read_excel(excel_file, sheet_name=sheet)
+        for sheet in OPTIONAL_SHEETS if sheet in excel_file.sheet_names
+    }
+
+def _sql_type(series):
+    """Maps a DataFrame column to the SQLite column type pandas' `to_sql` would use."""
+    return {'i': 'INTEGER', 'u': 'INTEGER', 'b': 'INTEGER', 'f': 'REAL'}.get(series.dtype.kind, 'TEXT')
+
 def create_table_from_df(df, table_name, conn):
     """
     Creates a table in the SQLite database from a DataFrame.
@@ -49,17 +80,25 @@ def create_table_from_df(df, table_name, conn):
         The name of the table to create or replace in the SQLite database.
         
     conn : sqlite3.Connection
-        The SQLite database connection object.
+        The SQLite database connection object. The table is replaced within the caller's transaction,
+        so readers see either the old or the new table, never a half-written one.
     
-    Debugging:
-    ---------
-    - Prints a message indicating that the table has been created or replaced in the database.
+    Logging:
+    -------
+    - Logs at DEBUG level that the table has been created or replaced in the database.
     """
-    df.to_sql(table_name, conn, if_exists='replace', index=False)
-    # For debugging purposes.
-    print(f"Table '{table_name}' created in the SQLite database.")
+    columns = ', '.join(f'"{column}" {_sql_type(df[column])}' for column in df.columns)
+    placeholders = ', '.join('?' * len(df.columns))
+    rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+    conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+    conn.execute(f'CREATE TABLE "{table_name}" ({columns})')
+    conn.executemany(f'INSERT INTO "{table_name}" VALUES ({placeholders})', rows)
+    count_query(3)
+    logger.debug("Table '%s' created in the SQLite database.", table_name)
 
-def populate_db_from_excel(file_path, db_path):
+@timed('excel_import')
+def populate_db_from_excel(file_path, db_path=None):
     """
     Reads data from an Excel file and populates an SQLite database with tables based on the data.
     
@@ -68,17 +107,149 @@ def populate_db_from_excel(file_path, db_path):
     file_path : str
         The path to the Excel file (e.g., 'data/input.xlsx') from which data is read.
     
-    db_path : str
-        The path to the SQLite database file (e.g., 'data/database.db') where the data will be stored.
+    db_path : str, optional
+        The path to the SQLite database file where the data will be stored. Defaults to the configured
+        database (see `input.connection.database_path`).
+    
+    Database Layout:
+    ---------------
+    - Each sheet is written as-is to a table of the same name, read by the `get_*_data` readers.
+      The tables of `OPTIONAL_SHEETS` missing from the workbook are dropped.
+    - The parameters are stored as the 'base' scenario of the typed schema in `input.schema`, which
+      `get_parameters` reads. The database is migrated first when needed; an unchanged workbook leaves
+      the scenario and its version untouched.
+    - When the pretreatment sheet itemizes its equipment, the 'itemized_pretreatment' variant of the base
+      scenario sets 'pretreat_pec' to 0, so that the items rather than the lump sum are costed in it.
+    - Everything is written in one WAL transaction, so sessions reading concurrently switch from the
+      old data to the new data at once.
     
-    Debugging:
-    ---------
-    - Prints messages indicating the progress of loading each sheet and writing it to the database.
+    Logging:
+    -------
+    - Logs at DEBUG level the progress of loading each sheet and writing it to the database.
     """
+    from input.parameters import PARAMETER_NAMES, read_pretreat_items
+    from input.schema import BASE_SCENARIO, ITEMIZED_PRETREAT_SCENARIO, migrate, parameter_rows, save_scenario
+
     data_dict = read_excel_data(file_path)
+    rows = [
+        row for sheet, df in data_dict.items()
+        for row in parameter_rows(sheet, df.columns, df.itertuples(index=False, name=None))
+    ]
     
-    with sqlite3.connect(db_path) as conn:
+    with write_connection(db_path) as conn, transaction(conn):
         for sheet, df in data_dict.items():
             create_table_from_df(df, sheet, conn)
-            # For debugging purposes.
-            print(f"Data from sheet '{sheet}' written to database.")
+            logger.debug("Data from sheet '%s' written to database.", sheet)
+
+        optional_sheets = read_optional_sheets(file_path)
+        for sheet in OPTIONAL_SHEETS:
+            if sheet in optional_sheets:
+                create_table_from_df(optional_sheets[sheet], sheet, conn)
+            else:
+                conn.execute(f'DROP TABLE IF EXISTS "{sheet}"')
+                count_query()
+
+        migrate(conn)
+        base_id = save_scenario(conn, BASE_SCENARIO, rows)
+        if read_pretreat_items(conn) is not None:
+            save_scenario(
+                conn, ITEMIZED_PRETREAT_SCENARIO,
+                [(PARAMETER_NAMES['pretreat_pec'], 'pretreat_pec', 0.0, None)], parent_id=base_id
+            )
+
+def scenario_columns(df):
+    """
+    Returns the value columns of a `Category`/`Value` sheet, one per scenario.
+    
+    Parameters:
+    ----------
+    df : pandas.DataFrame
+        A factor sheet as returned by `read_excel_data`.
+    
+    Returns:
+    -------
+    list
+        'Value' (the base case) followed by every named column to its right whose filled cells are all
+        numbers, e.g. ['Value', 'Site_A', 'Site_B']. Unnamed columns and text columns such as units or
+        definitions are not scenarios.
+    """
+    columns = list(df.columns)
+    scenarios = ['Value']
+    for column in columns[columns.index('Value') + 1:]:
+        if str(column).startswith('Unnamed:'):
+            continue
+        filled = df[column].dropna()
+        if len(filled) and pd.to_numeric(filled, errors='coerce').notna().all():
+            scenarios.append(column)
+    return scenarios
+
+@timed('excel_parameter_matrix')
+def read_parameter_matrix(file_path):
+    """
+    Reads every parameter of every scenario in a wide-format workbook into one dense matrix.
+    
+    Parameters:
+    ----------
+    file_path : str
+        The path to the Excel file (e.g., 'data/input.xlsx'). Each factor sheet may carry extra value
+        columns next to 'Value', one per scenario (see `scenario_columns`).
+    
+    Returns:
+    -------
+    tuple
+        (matrix, categories, scenarios):
+        - matrix : numpy.ndarray of float, shape (len(categories), len(scenarios)).
+        - categories : list of the parameter names indexing the rows, every name of `PARAMETER_TABLES`
+          followed by those of `OPTIONAL_PARAMETERS`.
+        - scenarios : list of the scenario names indexing the columns, 'Value' (the base case) first.
+        A scenario without a column in some sheet, or with an empty cell, takes the 'Value' of that row.
+        Optional parameters stay NaN (unset) where neither has a value. The pretreatment sheet is itemized
+        rather than per scenario, so 'pretreat_pec' is the same for all.
+    
+    Logging:
+    -------
+    - Logs a warning for each required parameter missing from the workbook; its row is filled with 0.
+    """
+    import numpy as np
+
+    from input.parameters import OPTIONAL_PARAMETERS, PARAMETER_TABLES, normalize_key
+
+    data_dict = read_excel_data(file_path)
+
+    scenarios = []
+    for sheet, df in data_dict.items():
+        if sheet != 'pretreat_equipment_cost':
+            scenarios.extend(column for column in scenario_columns(df) if column not in scenarios)
+    scenarios = scenarios or ['Value']
+
+    required = [name for names in PARAMETER_TABLES.values() for name in names]
+    categories = required + [name for names in OPTIONAL_PARAMETERS.values() for name in names]
+    row_of = {name: row for row, name in enumerate(categories)}
+    matrix = np.full((len(categories), len(scenarios)), np.nan)
+
+    for sheet, df in data_dict.items():
+        if sheet == 'pretreat_equipment_cost':
+            rows = df[df['Equipment'].isin(list(row_of))]
+            for equipment, value in zip(rows['Equipment'], rows['Base year']):
+                matrix[row_of[equipment], :] = value
+            continue
+
+        rows = df[df['Category'].notna()]
+        keys = [normalize_key(category) for category in rows['Category']]
+        selected = [row for row, key in enumerate(keys) if key in row_of]
+        indices = [row_of[keys[row]] for row in selected]
+        base = pd.to_numeric(rows['Value'], errors='coerce').to_numpy(dtype=float)[selected]
+        for column, scenario in enumerate(scenarios):
+            if scenario in rows.columns:
+                values = pd.to_numeric(rows[scenario], errors='coerce').to_numpy(dtype=float)[selected]
+                values = np.where(np.isnan(values), base, values)
+            else:
+                values = base
+            matrix[indices, column] = values
+
+    for row in np.flatnonzero(np.isnan(matrix[:len(required)]).all(axis=1)):
+        logger.warning("'%s' not found in the data. Using default value: %s", categories[row], 0)
+    matrix[:len(required)] = np.nan_to_num(matrix[:len(required)], nan=0.0)
+
+    logger.debug("Loaded %d parameters x %d scenarios: %s", len(categories), len(scenarios), scenarios)
+    return matrix, categories, scenarios
@@ -1,6 +1,12 @@
-import sqlite3
+import logging
 import pandas as pd
 
+from input.connection import read_connection
+from perf import timed, count_query
+
+logger = logging.getLogger(__name__)
+
+@timed('db.electrolyser')
 def get_electrolyser_data():
     """
     Fetches Electrolyser data from the SQLite database and returns key electrolyser variables for computation.
@@ -33,28 +39,28 @@ def get_electrolyser_data():
     
     Database Connection:
     -------------------
-    - Connects to the SQLite database located at 'data/database.db' and retrieves the 'electrolyser' table.
+    - Reads the 'electrolyser' table through this thread's pooled read-only connection to the configured
+      database (see `input.connection.database_path`).
     
-    Debugging:
-    ---------
-    - Prints the DataFrame fetched from the database for verification.
-    - Prints the keys of the dictionary after converting the DataFrame to ensure proper formatting.
-    - If a key is not found when attempting to retrieve a value, a warning message is printed, and a default value is used.
+    Logging:
+    -------
+    - Logs the DataFrame fetched from the database at DEBUG level for verification.
+    - Logs the keys of the dictionary after converting the DataFrame at DEBUG level to ensure proper formatting.
+    - If a key is not found when attempting to retrieve a value, a warning is logged, and a default value is used.
     """
-    db_file_path = 'data/database.db'
     query = "SELECT * FROM electrolyser"
     
-    with sqlite3.connect(db_file_path) as conn:
-        electrolyser_data = pd.read_sql_query(query, conn)
+    electrolyser_data = pd.read_sql_query(query, read_connection())
+    count_query()
     
-    # Print the data to debug if the key exists
-    print(electrolyser_data)
+    # Log the data to debug if the key exists
+    logger.debug("Fetched 'electrolyser' table:\n%s", electrolyser_data)
 
     # Convert the DataFrame to a dictionary, normalizing the keys to lowercase and stripping whitespace
     electrolyser_data_dict = electrolyser_data.set_index(electrolyser_data['Category'].str.replace(' ', '').str.lower())['Value'].to_dict()
     
-    # Print dictionary keys for debugging
-    print(electrolyser_data_dict.keys())
+    # Log dictionary keys for debugging
+    logger.debug("Normalized 'electrolyser' keys: %s", electrolyser_data_dict.keys())
     
     def get_value(key, default=None):
         """
@@ -76,7 +82,7 @@ def get_electrolyser_data():
         try:
             return electrolyser_data_dict[key.replace(' ', '').strip().lower()]  # Normalize key access
         except KeyError:
-            print(f"Warning: '{key}' not found in the data. Using default value: {default}")
+            logger.warning("'%s' not found in the data. Using default value: %s", key, default)
             return default
 
     # Retrieve variables with safe access
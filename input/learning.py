@@ -0,0 +1,94 @@
+import logging
+import pandas as pd
+
+from input.connection import read_connection
+from input.parameters import PARAMETER_NAMES, normalize_key
+from perf import timed, count_query
+
+logger = logging.getLogger(__name__)
+
+# Row of the learning curve sheet holding the cumulative installed capacity of the technology per year
+DEPLOYMENT = 'installed_capacity'
+
+# Column holding the learning rate: the cost reduction (%) per doubling of the installed capacity
+LEARNING_RATE_COLUMN = 'Learning rate (%)'
+
+def learning_curves(df):
+    """
+    Extracts the learning rates and trajectories of the learning curve table.
+
+    Parameters:
+    ----------
+    df : DataFrame
+        The 'learning_curves' sheet or table: a 'Parameter' column, an optional `LEARNING_RATE_COLUMN`,
+        and one column per year (e.g. 2025, 2030, 2050). Parameter names are normalized like categories.
+
+    Returns:
+    -------
+    dict
+        'years' : numpy array of the year columns, ascending.
+        'learning_rates' : {parameter: learning rate (%)} of the rows with a rate.
+        'trajectories' : {parameter: numpy array aligned with 'years'} of the rows with yearly values,
+            the value of the parameter when installed that year. Empty years are NaN.
+        'installed_capacity' : the yearly values of the `DEPLOYMENT` row, or None without it.
+
+    Logging:
+    -------
+    - Logs a warning for each row whose parameter is not a model parameter; the row is skipped.
+    """
+    year_columns = sorted((column for column in df.columns if str(column).strip().isdigit()), key=lambda c: int(c))
+    years = pd.Series([int(column) for column in year_columns], dtype=float).to_numpy()
+    rates = (
+        pd.to_numeric(df[LEARNING_RATE_COLUMN], errors='coerce') if LEARNING_RATE_COLUMN in df
+        else pd.Series(float('nan'), index=df.index)
+    )
+    values = df[year_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+    curves = {'years': years, 'learning_rates': {}, 'trajectories': {}, 'installed_capacity': None}
+    for row, (name, rate) in enumerate(zip(df['Parameter'], rates)):
+        if not isinstance(name, str):
+            continue
+        key = normalize_key(name)
+        if key == DEPLOYMENT:
+            curves['installed_capacity'] = values[row]
+            continue
+        if key not in PARAMETER_NAMES:
+            logger.warning("'%s' in the learning curve table is not a model parameter; skipping it.", name)
+            continue
+        if not pd.isna(rate):
+            curves['learning_rates'][key] = float(rate)
+        if len(years) and not pd.isna(values[row]).all():
+            curves['trajectories'][key] = values[row]
+    return curves
+
+@timed('db.learning_curves')
+def get_learning_curves(db_file_path=None):
+    """
+    Fetches the learning curves of the technology from the SQLite database.
+
+    Parameters:
+    ----------
+    db_file_path : str, optional
+        The path to the SQLite database file. Defaults to the configured database.
+
+    Returns:
+    -------
+    dict or None
+        The learning curves as returned by `learning_curves`, or None when the workbook has no
+        'learning_curves' sheet.
+
+    Database Connection:
+    -------------------
+    - Reads the 'learning_curves' table through this thread's pooled read-only connection.
+    """
+    conn = read_connection(db_file_path)
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'learning_curves'").fetchone():
+        count_query()
+        return None
+    df = pd.read_sql_query("SELECT * FROM learning_curves", conn)
+    count_query(2)
+
+    curves = learning_curves(df)
+    logger.debug("Fetched learning curves: rates %s, trajectories %s", curves['learning_rates'],
+                 list(curves['trajectories']))
+    return curves
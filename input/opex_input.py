@@ -1,6 +1,12 @@
-import sqlite3
+import logging
 import pandas as pd
 
+from input.connection import read_connection
+from perf import timed, count_query
+
+logger = logging.getLogger(__name__)
+
+@timed('db.opex_factors')
 def get_opex_data():
     """
     Fetches OPEX (Operating Expenditure) data from the SQLite database and returns key OPEX variables for computation.
@@ -28,28 +34,28 @@ def get_opex_data():
     
     Database Connection:
     -------------------
-    - Connects to the SQLite database located at 'data/database.db' and retrieves the 'opex_factors' table.
+    - Reads the 'opex_factors' table through this thread's pooled read-only connection to the configured
+      database (see `input.connection.database_path`).
     
-    Debugging:
-    ---------
-    - Prints the DataFrame fetched from the database for verification.
-    - Prints the keys of the dictionary after converting the DataFrame to ensure proper formatting.
-    - If a key is not found when attempting to retrieve a value, a warning message is printed, and a default value is used.
+    Logging:
+    -------
+    - Logs the DataFrame fetched from the database at DEBUG level for verification.
+    - Logs the keys of the dictionary after converting the DataFrame at DEBUG level to ensure proper formatting.
+    - If a key is not found when attempting to retrieve a value, a warning is logged, and a default value is used.
     """
-    db_file_path = 'data/database.db'
     query = "SELECT * FROM opex_factors"
     
-    with sqlite3.connect(db_file_path) as conn:
-        opex_data = pd.read_sql_query(query, conn)
+    opex_data = pd.read_sql_query(query, read_connection())
+    count_query()
 
-    # Print the data to debug if the key exists
-    print(opex_data)
+    # Log the data to debug if the key exists
+    logger.debug("Fetched 'opex_factors' table:\n%s", opex_data)
 
     # Convert the DataFrame to a dictionary, normalizing the keys to lowercase and stripping all spaces
     opex_factors_data_dict = opex_data.set_index(opex_data['Category'].str.replace(' ', '').str.lower())['Value'].to_dict()
     
-    # Print dictionary keys for debugging
-    print(opex_factors_data_dict.keys())
+    # Log dictionary keys for debugging
+    logger.debug("Normalized 'opex_factors' keys: %s", opex_factors_data_dict.keys())
     
     def get_value(key, default=None):
         """
@@ -71,7 +77,7 @@ def get_opex_data():
         try:
             return opex_factors_data_dict[key.replace(' ', '').strip().lower()]  # Normalize key access
         except KeyError:
-            print(f"Warning: '{key}' not found in the data. Using default value: {default}")
+            logger.warning("'%s' not found in the data. Using default value: %s", key, default)
             return default
 
     # Retrieve variables with safe access
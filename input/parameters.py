@@ -0,0 +1,305 @@
+import logging
+import math
+import numbers
+
+import numpy as np
+
+from input.connection import database_path, read_transaction
+from perf import timed, count_query
+
+logger = logging.getLogger(__name__)
+
+# Normalized parameter names read from each table, as used by the formula modules
+PARAMETER_TABLES = {
+    'capex_factors': (
+        'installation', 'controls_and_instrumentation', 'piping_and_electricals', 'building_and_services',
+        'indirect_cost', 'startup_cost', 'working_capital'
+    ),
+    'opex_factors': (
+        'base_labour_wage', 'no_of_labourers', 'supervision', 'direct_overhead', 'general_overhead', 'insurance',
+        'miscellaneous', 'laboratory_cost', 'working_capital_financing', 'electricity_unit_cost', 'raw_material',
+        'pump_power', 'chemical_cost', 'chemical_quantity'
+    ),
+    'electrolyser': (
+        'faradaic_constant', 'time', 'no_of_electrons', 'faradaic_efficiency', 'molar_weight', 'capacity',
+        'current_density', 'reactor_cost', 'e_cell', 'balance_of_plant', 'maintenance_frequency',
+        'maintenance_factor', 'catalyst_percentage', 'catalyst_lifespan', 'capacity_factor',
+        'electrolyser_installation_cost', 'separation_cost'
+    ),
+    'cash_flow': (
+        'tax_rate', 'discount_rate', 'water_selling_price', 'ammonia_selling_price', 'chemical_selling_price',
+        'water_cost_price', 'depreciation_time', 'life_of_plant', 'land', 'treated_water_quantity'
+    ),
+    'pretreat_equipment_cost': ('pretreat_pec',),
+}
+
+# Parameters of optional models, read when the table has them and otherwise left out of the mapping
+OPTIONAL_PARAMETERS = {
+    # Polarization curve of the cell, see `electrolyser_calc.cell_voltage`
+    'electrolyser': (
+        'reversible_potential', 'tafel_slope', 'exchange_current_density', 'area_specific_resistance'
+    ),
+    'cash_flow': (
+        # Escalation of itemized pretreatment equipment costs, see `pretreat_calc.equipment_costs`
+        'project_year', 'cost_escalation_rate',
+        # Debt financing, see `financing.financed_cash_flow_batch`
+        'debt_fraction', 'interest_rate', 'loan_tenor', 'grace_period', 'cost_of_equity',
+        # Yearly escalation (%) of costs and prices, see `escalation`
+        'inflation_rate', 'electricity_escalation', 'labour_escalation', 'water_escalation',
+        'ammonia_price_escalation', 'maintenance_escalation',
+        # Months to full production in the monthly and quarterly schedules, see `periodic_cash_flow`
+        'ramp_up_months',
+    ),
+}
+
+# Columns of an itemized pretreatment equipment row and the keys they are returned under by
+# `pretreat_items_from_rows`
+ITEM_COLUMNS = {
+    'Cost ($)': 'cost',
+    'Base capacity': 'base_capacity',
+    'New capacity': 'capacity',
+    'Scaling factor': 'exponent',
+    'Base year': 'base_year',
+}
+
+# Every parameter name, mapped to the table that holds it
+PARAMETER_NAMES = {
+    name: table
+    for tables in (PARAMETER_TABLES, OPTIONAL_PARAMETERS)
+    for table, names in tables.items()
+    for name in names
+}
+
+
+def normalize_key(key):
+    """Normalizes a category name the way the readers do: spaces removed and lowercase."""
+    return key.replace(' ', '').strip().lower()
+
+
+def parameters_from_tables(tables):
+    """
+    Builds the flat parameter mapping from raw (category, value) rows per table.
+
+    Parameters:
+    ----------
+    tables : dict
+        Maps each table name to an iterable of (category, value) rows. Categories of the factor tables
+        are normalized; pretreatment equipment names are used as-is, like `get_pretreat_equipment_cost_data`.
+
+    Returns:
+    -------
+    dict
+        Maps every name in `PARAMETER_TABLES` to its value. Missing names default to 0 with a warning.
+        Names in `OPTIONAL_PARAMETERS` are only included when the table has them.
+    """
+    parameters = {}
+    for table, names in PARAMETER_TABLES.items():
+        if table == 'pretreat_equipment_cost':
+            values = {category: value for category, value in tables.get(table, ()) if category is not None}
+        else:
+            values = {normalize_key(category): value for category, value in tables.get(table, ()) if category is not None}
+        for name in names:
+            try:
+                parameters[name] = values[name]
+            except KeyError:
+                logger.warning("'%s' not found in the data. Using default value: %s", name, 0)
+                parameters[name] = 0
+        for name in OPTIONAL_PARAMETERS.get(table, ()):
+            if name in values:
+                parameters[name] = values[name]
+    return parameters
+
+
+def _number(value):
+    """Converts a cell to float like `pd.to_numeric(errors='coerce')`: NaN when missing or not numeric."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def pretreat_items_from_rows(header, rows):
+    """
+    Extracts the itemized equipment of the pretreatment equipment cost table as column arrays.
+
+    Parameters:
+    ----------
+    header : list
+        The column names of the table or sheet.
+    rows : iterable
+        Its rows as tuples. Rows with an 'Equipment' name and a numeric 'Cost ($)' are items; the
+        'pretreat_pec' summary row and rows without a cost are skipped.
+
+    Returns:
+    -------
+    dict
+        'equipment' : list of the item names.
+        'cost', 'base_capacity', 'capacity', 'exponent', 'base_year' : numpy arrays of float with one element
+        per item, read from the columns in `ITEM_COLUMNS`. Missing or non-numeric cells are NaN.
+    """
+    header = list(header)
+    name_index = header.index('Equipment')
+    indices = {key: header.index(column) if column in header else None for column, key in ITEM_COLUMNS.items()}
+    items = {'equipment': [], **{key: [] for key in indices}}
+    for row in rows:
+        name = row[name_index]
+        values = {key: math.nan if index is None else _number(row[index]) for key, index in indices.items()}
+        if name is None or name != name or name == 'pretreat_pec' or math.isnan(values['cost']):
+            continue
+        items['equipment'].append(name)
+        for key, value in values.items():
+            items[key].append(value)
+    for key in indices:
+        items[key] = np.array(items[key], dtype=float)
+    return items
+
+
+def read_pretreat_items(conn):
+    """
+    Reads the itemized pretreatment equipment through an open connection.
+
+    The items are attached to every scenario but only costed where 'pretreat_pec' is 0: the workbook's
+    lump sum takes precedence wherever it is set (see `pretreat_calc.pretreat_capital_cost`).
+
+    Returns:
+    -------
+    dict or None
+        The items as returned by `pretreat_items_from_rows`, or None when the database has no
+        'pretreat_equipment_cost' table or the table has no items.
+    """
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'pretreat_equipment_cost'").fetchone():
+        count_query()
+        return None
+    cursor = conn.execute('SELECT * FROM pretreat_equipment_cost')
+    count_query(2)
+    items = pretreat_items_from_rows([column[0] for column in cursor.description], cursor)
+    return items if items['equipment'] else None
+
+
+@timed('db.parameters')
+def get_parameters(db_file_path=None, scenario=None):
+    """
+    Fetches every parameter the formula chain needs from the SQLite database in a single pass.
+
+    Parameters:
+    ----------
+    db_file_path : str, optional
+        The path to the SQLite database file. Defaults to the configured database
+        (see `input.connection.database_path`).
+    scenario : str or int, optional
+        The scenario name or scenario_id to read. Defaults to the 'base' scenario of data/input.xlsx.
+        An unknown scenario raises a ValueError.
+
+    Returns:
+    -------
+    dict
+        A flat mapping from normalized parameter name (e.g. 'capacity', 'installation', 'pretreat_pec')
+        to its value. The values match those returned by the individual `get_*_data` readers. When the
+        database itemizes the pretreatment equipment, the items are included under 'pretreat_items' (see
+        `pretreat_calc.pretreat_capital_cost`, which costs them where 'pretreat_pec' is 0).
+
+    Database Connection:
+    -------------------
+    - Reads one snapshot through this thread's pooled read-only connection.
+    - On a migrated database (see `input.schema`) this is one indexed query on `parameters`, which also
+      overlays the overrides of a derived scenario onto its ancestors.
+    - A database still in the original layout is read from its per-sheet tables, without a scenario.
+    """
+    from input.schema import BASE_SCENARIO, SCENARIO_STORE_VERSION, schema_version
+
+    tables = {table: [] for table in PARAMETER_TABLES}
+    with read_transaction(db_file_path) as conn:
+        if schema_version(conn) >= SCENARIO_STORE_VERSION:
+            # numbers.Integral also covers numpy ids, e.g. from a scenario_id column read with pandas
+            if isinstance(scenario, numbers.Integral):
+                column, key = 'scenario_id', int(scenario)
+            else:
+                column, key = 'name', scenario or BASE_SCENARIO
+            # Walk up the parent chain; the scenario's own rows come last and override its ancestors'
+            rows = conn.execute(f'''
+                WITH RECURSIVE chain (scenario_id, depth) AS (
+                    SELECT scenario_id, 0 FROM scenarios WHERE {column} = ?
+                    UNION ALL
+                    SELECT scenarios.parent_id, chain.depth + 1 FROM scenarios JOIN chain USING (scenario_id)
+                    WHERE scenarios.parent_id IS NOT NULL
+                )
+                SELECT table_name, category, value FROM parameters JOIN chain USING (scenario_id)
+                ORDER BY depth DESC
+            ''', (key,))
+            count_query()
+            for table, category, value in rows:
+                if table in tables:
+                    tables[table].append((category, value))
+            if scenario is not None and not any(tables.values()):
+                raise ValueError(f"Scenario {scenario!r} not found in {database_path(db_file_path)}")
+        else:
+            for table in PARAMETER_TABLES:
+                if table == 'pretreat_equipment_cost':
+                    query = 'SELECT "Equipment", "Base year" FROM pretreat_equipment_cost'
+                else:
+                    query = f'SELECT "Category", "Value" FROM {table}'
+                tables[table] = conn.execute(query).fetchall()
+                count_query()
+        items = read_pretreat_items(conn)
+
+    parameters = parameters_from_tables(tables)
+    if items is not None:
+        parameters['pretreat_items'] = items
+    return parameters
+
+
+@timed('excel_parameters')
+def parameters_from_excel(file_path):
+    """
+    Reads every parameter the formula chain needs directly from the Excel workbook, bypassing the database.
+
+    Parameters:
+    ----------
+    file_path : str
+        The path to the Excel file (e.g., 'data/input.xlsx').
+
+    Returns:
+    -------
+    dict
+        The same flat mapping as `get_parameters`.
+    """
+    from input.data_reader import read_excel_data
+
+    tables = {}
+    items = None
+    for sheet, df in read_excel_data(file_path).items():
+        if sheet == 'pretreat_equipment_cost':
+            items = pretreat_items_from_rows(df.columns, df.astype(object).itertuples(index=False, name=None))
+            columns = ['Equipment', 'Base year']
+        else:
+            columns = ['Category', 'Value']
+        df = df[columns].astype(object).where(df[columns].notna(), None)
+        tables[sheet] = list(df.itertuples(index=False, name=None))
+
+    parameters = parameters_from_tables(tables)
+    if items is not None and items['equipment']:
+        parameters['pretreat_items'] = items
+    return parameters
+
+
+def parameters_from_matrix(matrix, categories):
+    """
+    Turns a (parameters x scenarios) matrix into the parameter mapping of a vectorized evaluation.
+
+    Parameters:
+    ----------
+    matrix : numpy.ndarray
+        Parameter values, one row per name in `categories` and one column per scenario, as returned by
+        `input.data_reader.read_parameter_matrix`.
+    categories : list
+        The parameter name of each row.
+
+    Returns:
+    -------
+    dict
+        Maps each name to its array of per-scenario values, ready for the formulae and
+        `discounted_cash_flow_batch`. Optional parameters that no scenario sets are left out; those set
+        by only some scenarios are NaN for the others, so evaluate the mapping group by group with
+        `input.scenarios.parameter_groups`.
+    """
+    return {name: matrix[row] for row, name in enumerate(categories) if not np.isnan(matrix[row]).all()}
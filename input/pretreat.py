@@ -1,6 +1,13 @@
-import sqlite3
+import logging
 import pandas as pd
 
+from input.connection import read_connection
+from input.parameters import pretreat_items_from_rows
+from perf import timed, count_query
+
+logger = logging.getLogger(__name__)
+
+@timed('db.pretreat_equipment_cost')
 def get_pretreat_equipment_cost_data():
     """
     Fetches pretreatment equipment cost data from the SQLite database and retrieves the value for specific equipment.
@@ -17,23 +24,23 @@ def get_pretreat_equipment_cost_data():
     
     Database Connection:
     -------------------
-    - Connects to the SQLite database located at 'data/database.db' and retrieves the 'pretreat_equipment_cost' table.
+    - Reads the 'pretreat_equipment_cost' table through this thread's pooled read-only connection to the configured
+      database (see `input.connection.database_path`).
     
     Additional Computations:
     -----------------------
     - Converts the DataFrame to a dictionary where the keys are equipment names from the 'Equipment' column,
       and the values are from the 'Base year' column for quick lookups.
     
-    Debugging:
-    ---------
-    - If a key ('pretreat_pec') is not found when attempting to retrieve a value, a warning message is printed,
+    Logging:
+    -------
+    - If a key ('pretreat_pec') is not found when attempting to retrieve a value, a warning is logged,
       and a default value of 0 is used.
     """
-    db_file_path = 'data/database.db'
     query = "SELECT * FROM pretreat_equipment_cost"
     
-    with sqlite3.connect(db_file_path) as conn:
-        pretreat_equipment_cost_data = pd.read_sql_query(query, conn)
+    pretreat_equipment_cost_data = pd.read_sql_query(query, read_connection())
+    count_query()
     
     # Convert the DataFrame to a dictionary for fast lookups
     pretreat_data_dict = pretreat_equipment_cost_data.set_index('Equipment')['Base year'].to_dict()
@@ -58,7 +65,7 @@ def get_pretreat_equipment_cost_data():
         try:
             return pretreat_data_dict[key]
         except KeyError:
-            print(f"Warning: '{key}' not found in the data. Using default value: {default}")
+            logger.warning("'%s' not found in the data. Using default value: %s", key, default)
             return default
 
     # Retrieve 'pretreat_pec' value with safe access
@@ -67,6 +74,52 @@ def get_pretreat_equipment_cost_data():
     # Return the pretreat_pec value
     return pretreat_pec
 
+def equipment_items(df):
+    """
+    Extracts the itemized equipment rows of the pretreatment equipment cost table as column arrays.
+    
+    Parameters:
+    ----------
+    df : DataFrame
+        The 'pretreat_equipment_cost' table or sheet.
+    
+    Returns:
+    -------
+    dict
+        The items as returned by `input.parameters.pretreat_items_from_rows`, read from the columns in
+        `input.parameters.ITEM_COLUMNS`.
+    """
+    return pretreat_items_from_rows(df.columns, df.astype(object).itertuples(index=False, name=None))
+
+@timed('db.pretreat_equipment_items')
+def get_pretreat_equipment_items(db_file_path=None):
+    """
+    Fetches the itemized pretreatment equipment from the SQLite database.
+    
+    The items are only costed in scenarios whose 'pretreat_pec' is 0, e.g. the 'itemized_pretreatment'
+    variant; elsewhere the 'pretreat_pec' lump sum is used (see `pretreat_calc.pretreat_capital_cost`).
+    
+    Parameters:
+    ----------
+    db_file_path : str, optional
+        The path to the SQLite database file. Defaults to the configured database.
+    
+    Returns:
+    -------
+    dict
+        The equipment items as returned by `equipment_items`, ready for `pretreat_calc.equipment_costs`.
+    
+    Database Connection:
+    -------------------
+    - Reads the 'pretreat_equipment_cost' table through this thread's pooled read-only connection.
+    """
+    df = pd.read_sql_query("SELECT * FROM pretreat_equipment_cost", read_connection(db_file_path))
+    count_query()
+    
+    items = equipment_items(df)
+    logger.debug("Fetched %d itemized pretreatment equipment rows: %s", len(items['equipment']), items['equipment'])
+    return items
+
 # Example usage
 if __name__ == "__main__":
     pretreat_pec_value = get_pretreat_equipment_cost_data()
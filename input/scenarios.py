@@ -0,0 +1,370 @@
+import logging
+import threading
+
+from input.connection import database_path, read_transaction, transaction, write_connection
+from input.parameters import PARAMETER_NAMES, get_parameters, read_pretreat_items
+from input.schema import BASE_SCENARIO, migrate, save_scenario
+from perf import timed, count_query
+
+logger = logging.getLogger(__name__)
+
+# Resolved parameters of root scenarios and overrides of derived ones, keyed by (database, scenario_id)
+# and holding (version, parameters). A stored scenario is only re-read when its version changed.
+_root_cache = {}
+_override_cache = {}
+_cache_lock = threading.Lock()
+
+CHAIN_QUERY = '''
+    WITH RECURSIVE chain (scenario_id, depth) AS (
+        SELECT scenario_id, 0 FROM scenarios WHERE name = ?
+        UNION ALL
+        SELECT scenarios.parent_id, chain.depth + 1 FROM scenarios JOIN chain USING (scenario_id)
+        WHERE scenarios.parent_id IS NOT NULL
+    )
+    SELECT scenario_id, scenarios.version FROM chain JOIN scenarios USING (scenario_id) ORDER BY depth
+'''
+
+
+def _cached(cache, key, version):
+    with _cache_lock:
+        entry = cache.get(key)
+    return entry[1] if entry is not None and entry[0] == version else None
+
+
+def _store(cache, key, version, value):
+    with _cache_lock:
+        cache[key] = (version, value)
+
+
+def _overrides_by_scenario(conn, scenario_ids):
+    placeholders = ', '.join('?' * len(scenario_ids))
+    overrides = {scenario_id: {} for scenario_id in scenario_ids}
+    rows = conn.execute(
+        f'SELECT scenario_id, table_name, category, value FROM parameters WHERE scenario_id IN ({placeholders})',
+        scenario_ids
+    )
+    count_query()
+    for scenario_id, table, category, value in rows:
+        if PARAMETER_NAMES.get(category) == table:
+            overrides[scenario_id][category] = value
+    return overrides
+
+
+@timed('db.load_scenario')
+def load_scenario(scenario=BASE_SCENARIO, db_file_path=None):
+    """
+    Resolves the full parameter set of a scenario by overlaying its overrides onto its ancestors.
+
+    Parameters:
+    ----------
+    scenario : str, optional
+        The scenario name. Defaults to the 'base' scenario of data/input.xlsx.
+    db_file_path : str, optional
+        The path to the SQLite database file. Defaults to the configured database.
+
+    Returns:
+    -------
+    dict
+        The same flat mapping as `get_parameters`, as a new dict the caller may modify.
+
+    Caching:
+    -------
+    - The root scenario's parameters and each ancestor's overrides are cached per scenario version, so
+      switching between saved scenarios costs one indexed query for the parent chain and a dict overlay.
+
+    Raises:
+    ------
+    ValueError
+        If the scenario does not exist.
+    """
+    db_file_path = database_path(db_file_path)
+    with read_transaction(db_file_path) as conn:
+        chain = conn.execute(CHAIN_QUERY, (scenario,)).fetchall()
+        count_query()
+        if not chain:
+            raise ValueError(f"Scenario {scenario!r} not found in {db_file_path}")
+        # Read on every call: the items table is rewritten on import without bumping scenario versions
+        items = read_pretreat_items(conn)
+
+        *derived, (root_id, root_version) = chain
+        missing = [scenario_id for scenario_id, version in derived
+                   if _cached(_override_cache, (db_file_path, scenario_id), version) is None]
+        if missing:
+            versions = dict(derived)
+            for scenario_id, overrides in _overrides_by_scenario(conn, missing).items():
+                _store(_override_cache, (db_file_path, scenario_id), versions[scenario_id], overrides)
+
+    parameters = _cached(_root_cache, (db_file_path, root_id), root_version)
+    if parameters is None:
+        parameters = get_parameters(db_file_path, root_id)
+        _store(_root_cache, (db_file_path, root_id), root_version, parameters)
+
+    resolved = dict(parameters)
+    for scenario_id, version in reversed(derived):
+        resolved.update(_cached(_override_cache, (db_file_path, scenario_id), version) or {})
+    resolved.pop('pretreat_items', None)
+    if items is not None:
+        resolved['pretreat_items'] = items
+    return resolved
+
+
+def load_scenarios(scenarios, db_file_path=None):
+    """
+    Resolves several scenarios into one parameter mapping for a vectorized evaluation.
+
+    Parameters:
+    ----------
+    scenarios : list
+        The scenario names, e.g. the sites of a portfolio.
+    db_file_path : str, optional
+        The path to the SQLite database file. Defaults to the configured database.
+
+    Returns:
+    -------
+    dict
+        Maps each parameter to a numpy array with one value per scenario, in the order of `scenarios`.
+        Optional parameters set by only some of the scenarios are NaN for the others; evaluate such a
+        mapping group by group with `parameter_groups`. The itemized pretreatment equipment, which is the
+        same for every scenario, is included as-is under 'pretreat_items'.
+
+    Raises:
+    ------
+    ValueError
+        If a scenario does not exist.
+    """
+    import numpy as np
+
+    resolved = [load_scenario(scenario, db_file_path) for scenario in scenarios]
+    items = resolved[0].get('pretreat_items')
+    resolved = [{name: value for name, value in parameters.items() if name != 'pretreat_items'}
+                for parameters in resolved]
+    names = list(dict.fromkeys(name for parameters in resolved for name in parameters))
+    stacked = {
+        name: np.array([parameters.get(name, np.nan) for parameters in resolved], dtype=float) for name in names
+    }
+    if items is not None:
+        stacked['pretreat_items'] = items
+    return stacked
+
+
+def parameter_groups(params):
+    """
+    Splits stacked scenario parameters into groups of scenarios that set the same optional parameters.
+
+    A batch evaluates an optional model for all of its scenarios or for none, so scenarios that set
+    different optional parameters must be evaluated apart for each to get the results it gets on its own.
+
+    Parameters:
+    ----------
+    params : dict
+        Stacked parameters as returned by `load_scenarios`, where NaN marks a parameter a scenario does not
+        set. Values that are not one-dimensional arrays, like 'pretreat_items', are shared by every group.
+
+    Returns:
+    -------
+    list of tuple
+        (rows, subset) per group, in the order of each group's first scenario:
+        - rows : numpy.ndarray of the group's positions in the stacked arrays.
+        - subset : dict of the group's parameters, holding only those that its scenarios set.
+    """
+    import numpy as np
+
+    stacked = {
+        name: values for name, values in params.items() if isinstance(values, np.ndarray) and values.ndim == 1
+    }
+    shared = {name: value for name, value in params.items() if name not in stacked}
+    if not stacked:
+        # A mapping of plain values is a single scenario
+        return [(np.arange(1), shared)]
+    present = np.column_stack([~np.isnan(values) for values in stacked.values()])
+    if present.all():
+        return [(np.arange(len(present)), dict(params))]
+    keys, first, group_of = np.unique(present, axis=0, return_index=True, return_inverse=True)
+    groups = []
+    for group in np.argsort(first):
+        rows = np.flatnonzero(group_of.ravel() == group)
+        subset = {name: values[rows] for (name, values), is_set in zip(stacked.items(), keys[group]) if is_set}
+        groups.append((rows, dict(subset, **shared)))
+    return groups
+
+
+@timed('db.scenario_matrix')
+def scenario_matrix(db_file_path=None):
+    """
+    Resolves every stored scenario at once into one dense (scenarios x parameters) matrix.
+
+    Parameters:
+    ----------
+    db_file_path : str, optional
+        The path to the SQLite database file. Defaults to the configured database.
+
+    Returns:
+    -------
+    tuple
+        (matrix, scenario_ids, names, categories):
+        - matrix : numpy.ndarray of float, shape (len(scenario_ids), len(categories)).
+        - scenario_ids, names : numpy array of the scenario ids and list of the names indexing the rows,
+          ordered by scenario_id.
+        - categories : list of every name in `PARAMETER_NAMES`, indexing the columns.
+        Each derived scenario inherits what it does not override from its ancestors. Required parameters
+        missing from a whole chain are 0, like `get_parameters`; optional ones are NaN.
+
+    Database Connection:
+    -------------------
+    - Reads one snapshot with two queries: the scenarios, and every stored value already mapped to its
+      column by SQLite, streamed into numpy without building per-row Python objects.
+    """
+    import numpy as np
+
+    from input.parameters import OPTIONAL_PARAMETERS
+
+    categories = list(PARAMETER_NAMES)
+    names_table = ', '.join(['(?, ?, ?)'] * len(categories))
+    bindings = [
+        value for position, name in enumerate(categories) for value in (PARAMETER_NAMES[name], name, position)
+    ]
+
+    with read_transaction(db_file_path) as conn:
+        scenarios = conn.execute('SELECT scenario_id, name, parent_id FROM scenarios ORDER BY scenario_id').fetchall()
+        values = np.fromiter(
+            conn.execute(f'''
+                WITH names (table_name, category, position) AS (VALUES {names_table})
+                SELECT parameters.scenario_id, names.position, parameters.value
+                FROM parameters JOIN names USING (table_name, category)
+            ''', bindings),
+            dtype=[('scenario_id', 'i8'), ('position', 'i8'), ('value', 'f8')]
+        )
+        count_query(2)
+
+    scenario_ids = np.array([row[0] for row in scenarios], dtype=np.int64)
+    row_of = {scenario_id: row for row, scenario_id in enumerate(scenario_ids.tolist())}
+    stored = np.full((len(scenarios), len(categories)), np.nan)
+    stored[np.searchsorted(scenario_ids, values['scenario_id']), values['position']] = values['value']
+
+    # Walk up all parent chains together: each pass fills what is still missing from the next ancestor,
+    # so the closest ancestor's value wins
+    parents = np.array([row_of.get(row[2], -1) for row in scenarios], dtype=np.int64)
+    matrix = stored.copy()
+    ancestors = parents.copy()
+    rows = np.flatnonzero(ancestors >= 0)
+    while len(rows):
+        matrix[rows] = np.where(np.isnan(matrix[rows]), stored[ancestors[rows]], matrix[rows])
+        ancestors[rows] = parents[ancestors[rows]]
+        rows = rows[ancestors[rows] >= 0]
+
+    optional = {name for names in OPTIONAL_PARAMETERS.values() for name in names}
+    required = [position for position, name in enumerate(categories) if name not in optional]
+    matrix[:, required] = np.nan_to_num(matrix[:, required], nan=0.0)
+    return matrix, scenario_ids, [row[1] for row in scenarios], categories
+
+
+def save_variant(name, overrides, parent=BASE_SCENARIO, db_file_path=None):
+    """
+    Saves a what-if variant that stores only the parameters it overrides relative to its parent.
+
+    Parameters:
+    ----------
+    name : str
+        The variant name. Saving an existing variant again replaces its overrides and bumps its version.
+    overrides : dict
+        Maps parameter names (e.g. 'capacity', 'discount_rate') to their values in this variant.
+    parent : str, optional
+        The scenario the variant derives from. Defaults to the 'base' scenario.
+    db_file_path : str, optional
+        The path to the SQLite database file. Defaults to the configured database.
+
+    Returns:
+    -------
+    int
+        The variant's scenario_id.
+
+    Raises:
+    ------
+    ValueError
+        If a parameter name is unknown, the parent does not exist, or the parent derives from the variant.
+    """
+    unknown = sorted(set(overrides) - set(PARAMETER_NAMES))
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(unknown)}")
+    rows = [(PARAMETER_NAMES[key], key, float(value), None) for key, value in overrides.items()]
+
+    db_file_path = database_path(db_file_path)
+    with write_connection(db_file_path) as conn, transaction(conn):
+        migrate(conn)
+        ancestors = conn.execute(CHAIN_QUERY, (parent,)).fetchall()
+        count_query()
+        if not ancestors:
+            raise ValueError(f"Parent scenario {parent!r} not found in {db_file_path}")
+        existing = conn.execute('SELECT scenario_id FROM scenarios WHERE name = ?', (name,)).fetchone()
+        count_query()
+        if existing is not None and existing[0] in {scenario_id for scenario_id, _ in ancestors}:
+            raise ValueError(f"Scenario {name!r} cannot derive from itself or its descendant {parent!r}")
+        scenario_id = save_scenario(conn, name, rows, parent_id=ancestors[0][0])
+
+    logger.info("Saved scenario '%s' (parent '%s') with %d overrides", name, parent, len(rows))
+    return scenario_id
+
+
+def scenario_overrides(scenario, db_file_path=None):
+    """
+    Returns {parameter name: value} of what a scenario stores itself; for a root scenario, its full set.
+    """
+    db_file_path = database_path(db_file_path)
+    with read_transaction(db_file_path) as conn:
+        row = conn.execute('SELECT scenario_id FROM scenarios WHERE name = ?', (scenario,)).fetchone()
+        count_query()
+        if row is None:
+            raise ValueError(f"Scenario {scenario!r} not found in {db_file_path}")
+        return _overrides_by_scenario(conn, [row[0]])[row[0]]
+
+
+def list_scenarios(db_file_path=None):
+    """
+    Lists the saved scenarios.
+
+    Returns:
+    -------
+    list
+        (scenario_id, name, parent name, version, number of stored parameters) tuples, ordered by name.
+        The parent name is None for root scenarios such as 'base'. A database that has not been migrated
+        has no scenarios.
+    """
+    with read_transaction(db_file_path) as conn:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'scenarios'").fetchone():
+            return []
+        rows = conn.execute('''
+            SELECT scenarios.scenario_id, scenarios.name, parents.name, scenarios.version,
+                   (SELECT COUNT(*) FROM parameters WHERE parameters.scenario_id = scenarios.scenario_id)
+            FROM scenarios LEFT JOIN scenarios AS parents ON parents.scenario_id = scenarios.parent_id
+            ORDER BY scenarios.name
+        ''').fetchall()
+        count_query(2)
+    return rows
+
+
+def delete_scenario(name, db_file_path=None):
+    """
+    Deletes a derived scenario and its overrides.
+
+    Raises:
+    ------
+    ValueError
+        If the scenario does not exist, is a root scenario such as 'base', or other scenarios derive from it.
+    """
+    db_file_path = database_path(db_file_path)
+    with write_connection(db_file_path) as conn, transaction(conn):
+        row = conn.execute('SELECT scenario_id, parent_id FROM scenarios WHERE name = ?', (name,)).fetchone()
+        count_query()
+        if row is None:
+            raise ValueError(f"Scenario {name!r} not found in {db_file_path}")
+        scenario_id, parent_id = row
+        if parent_id is None:
+            raise ValueError(f"Scenario {name!r} is a root scenario and cannot be deleted")
+        children = conn.execute('SELECT name FROM scenarios WHERE parent_id = ?', (scenario_id,)).fetchall()
+        count_query()
+        if children:
+            raise ValueError(f"Scenario {name!r} has derived scenarios: {', '.join(child for child, in children)}")
+        conn.execute('DELETE FROM parameters WHERE scenario_id = ?', (scenario_id,))
+        conn.execute('DELETE FROM scenarios WHERE scenario_id = ?', (scenario_id,))
+        count_query(2)
+    logger.info("Deleted scenario '%s'", name)
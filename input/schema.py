@@ -0,0 +1,258 @@
+import logging
+import math
+import numbers
+
+from input.connection import transaction
+from input.parameters import PARAMETER_TABLES, normalize_key
+from perf import count_query
+
+logger = logging.getLogger(__name__)
+
+# PRAGMA user_version of a database with the current schema. Version 0 is the original layout: one
+# untyped table per sheet, replaced wholesale on import, plus the un-keyed `parameters` table of the
+# first bulk importer. Version 1 introduced the scenario store; version 2 keys scenarios with
+# AUTOINCREMENT, so that the ids of deleted scenarios are never reused.
+SCHEMA_VERSION = 2
+
+# First version with the `scenarios` and `parameters` tables; readers use them from this version on
+SCENARIO_STORE_VERSION = 1
+
+# Scenario holding the parameters of data/input.xlsx
+BASE_SCENARIO = 'base'
+
+# Variant of the base scenario that costs the pretreatment equipment item by item: it sets 'pretreat_pec'
+# to 0, which switches the items on (see `pretreat_calc.pretreat_capital_cost`)
+ITEMIZED_PRETREAT_SCENARIO = 'itemized_pretreatment'
+
+SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS scenarios (
+        scenario_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        parent_id INTEGER REFERENCES scenarios (scenario_id),
+        version INTEGER NOT NULL DEFAULT 1,
+        updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS parameters (
+        scenario_id INTEGER NOT NULL REFERENCES scenarios (scenario_id),
+        table_name TEXT NOT NULL,
+        category TEXT NOT NULL,
+        value REAL NOT NULL,
+        units TEXT,
+        PRIMARY KEY (scenario_id, table_name, category)
+    ) WITHOUT ROWID
+    ''',
+)
+
+
+def parameter_rows(table, header, rows):
+    """
+    Extracts the typed parameter rows of one sheet or legacy table.
+
+    Parameters:
+    ----------
+    table : str
+        The sheet name, e.g. 'capex_factors'.
+    header : list
+        The column names.
+    rows : iterable
+        The data rows, as sequences aligned with `header`.
+
+    Returns:
+    -------
+    list
+        (table, category, value, units) rows for every row with a category and a numeric value.
+        Factor categories are normalized; pretreatment rows keep the equipment name and its 'Base year'
+        column. The units of a factor are the first text cell to the right of its value, if any.
+    """
+    header = list(header)
+    key_column, value_column = ('Equipment', 'Base year') if table == 'pretreat_equipment_cost' else ('Category', 'Value')
+    if key_column not in header or value_column not in header:
+        logger.warning("Table '%s' has no '%s'/'%s' columns.", table, key_column, value_column)
+        return []
+    key_index, value_index = header.index(key_column), header.index(value_column)
+
+    parameters = []
+    for row in rows:
+        row = tuple(row)
+        if len(row) <= max(key_index, value_index):
+            continue
+        key, value = row[key_index], row[value_index]
+        if not isinstance(key, str) or isinstance(value, bool) or not isinstance(value, numbers.Real):
+            continue
+        if math.isnan(value):
+            continue
+        units = None
+        if table != 'pretreat_equipment_cost':
+            key = normalize_key(key)
+            units = next((cell for cell in row[value_index + 1:] if isinstance(cell, str) and cell.strip()), None)
+        parameters.append((table, key, float(value), units))
+    return parameters
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def _table_columns(conn, table):
+    return [column[1] for column in conn.execute(f'PRAGMA table_info("{table}")')]
+
+
+def _legacy_rows(conn):
+    """Reads the parameter rows of the original one-table-per-sheet layout."""
+    rows = []
+    for table in PARAMETER_TABLES:
+        if not _table_columns(conn, table):
+            continue
+        cursor = conn.execute(f'SELECT * FROM "{table}"')
+        count_query()
+        rows.extend(parameter_rows(table, [column[0] for column in cursor.description], cursor))
+    return rows
+
+
+def migrate(conn):
+    """
+    Brings a database up to `SCHEMA_VERSION`.
+
+    Parameters:
+    ----------
+    conn : sqlite3.Connection
+        A write connection. The migration joins the caller's open transaction, or runs in its own.
+
+    Returns:
+    -------
+    int
+        The schema version after migration.
+
+    Migration from version 0:
+    -------------------------
+    - Sites of the un-keyed `parameters` table written by the first bulk importer become scenarios
+      with the same scenario_id.
+    - The values of the per-sheet tables become the 'base' scenario. The per-sheet tables are kept
+      for the dashboard's table readers.
+
+    Migration from version 1:
+    -------------------------
+    - `scenarios` is rebuilt with an AUTOINCREMENT key, keeping every scenario_id. Ids freed before
+      the migration may still be reused once; none freed after it are.
+    """
+    if schema_version(conn) >= SCHEMA_VERSION:
+        return SCHEMA_VERSION
+
+    if conn.in_transaction:
+        _migrate(conn)
+    else:
+        with transaction(conn):
+            _migrate(conn)
+    return SCHEMA_VERSION
+
+
+def _migrate(conn):
+    # Checked again under the write lock, in case another writer migrated in the meantime
+    version = schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return
+
+    if version < SCENARIO_STORE_VERSION:
+        # Creates the current schema directly, so no later step applies
+        _migrate_from_v0(conn)
+    else:
+        _rebuild_scenarios(conn)
+
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    count_query()
+    logger.info("Migrated database from schema version %d to %d", version, SCHEMA_VERSION)
+
+
+def _migrate_from_v0(conn):
+    legacy_parameters = 'site' in _table_columns(conn, 'parameters')
+    if legacy_parameters:
+        conn.execute('ALTER TABLE parameters RENAME TO parameters_v0')
+    for statement in SCHEMA:
+        conn.execute(statement)
+    count_query(len(SCHEMA))
+
+    if legacy_parameters:
+        conn.execute('''
+            INSERT INTO scenarios (scenario_id, name)
+            SELECT scenario_id, MIN(site) FROM parameters_v0 GROUP BY scenario_id
+        ''')
+        conn.execute('''
+            INSERT OR REPLACE INTO parameters (scenario_id, table_name, category, value)
+            SELECT scenario_id, table_name, category, value FROM parameters_v0 WHERE value IS NOT NULL
+        ''')
+        conn.execute('DROP TABLE parameters_v0')
+        count_query(3)
+
+    legacy_rows = _legacy_rows(conn)
+    if legacy_rows:
+        save_scenario(conn, BASE_SCENARIO, legacy_rows)
+
+
+def _rebuild_scenarios(conn):
+    """Recreates `scenarios` from the current DDL, keeping its rows (SQLite cannot alter a primary key)."""
+    # Create, copy, drop, rename: the references of `parameters` name 'scenarios' and are left untouched
+    conn.execute(SCHEMA[0].replace('scenarios', 'scenarios_new'))
+    conn.execute('''
+        INSERT INTO scenarios_new (scenario_id, name, parent_id, version, updated_at)
+        SELECT scenario_id, name, parent_id, version, updated_at FROM scenarios
+    ''')
+    conn.execute('DROP TABLE scenarios')
+    conn.execute('ALTER TABLE scenarios_new RENAME TO scenarios')
+    count_query(4)
+
+
+def save_scenario(conn, name, rows, parent_id=None):
+    """
+    Stores the parameter rows of a scenario, creating the scenario when needed.
+
+    Parameters:
+    ----------
+    conn : sqlite3.Connection
+        A connection to a migrated database. The caller owns the transaction.
+    name : str
+        The scenario name, e.g. 'base' or a site name.
+    rows : iterable
+        (table_name, category, value, units) rows, as returned by `parameter_rows`. A scenario without a
+        parent stores its full parameter set; a scenario with a parent stores only what it overrides.
+    parent_id : int, optional
+        The scenario this one derives from.
+
+    Returns:
+    -------
+    int
+        The scenario_id. When the rows or the parent differ from the stored ones they are replaced and
+        the scenario's version is incremented; an unchanged scenario is left untouched.
+    """
+    rows = sorted({(table, category): (table, category, value, units) for table, category, value, units in rows}.values())
+    existing = conn.execute('SELECT scenario_id, parent_id FROM scenarios WHERE name = ?', (name,)).fetchone()
+    count_query()
+
+    if existing is None:
+        scenario_id = conn.execute('INSERT INTO scenarios (name, parent_id) VALUES (?, ?)', (name, parent_id)).lastrowid
+        count_query()
+    else:
+        scenario_id, stored_parent_id = existing
+        stored = conn.execute(
+            'SELECT table_name, category, value, units FROM parameters WHERE scenario_id = ? ORDER BY table_name, category',
+            (scenario_id,)
+        ).fetchall()
+        count_query()
+        if stored == rows and stored_parent_id == parent_id:
+            return scenario_id
+        conn.execute('DELETE FROM parameters WHERE scenario_id = ?', (scenario_id,))
+        conn.execute(
+            'UPDATE scenarios SET parent_id = ?, version = version + 1, updated_at = CURRENT_TIMESTAMP '
+            'WHERE scenario_id = ?',
+            (parent_id, scenario_id)
+        )
+        count_query(2)
+
+    conn.executemany(
+        'INSERT INTO parameters (scenario_id, table_name, category, value, units) VALUES (?, ?, ?, ?, ?)',
+        [(scenario_id, *row) for row in rows]
+    )
+    count_query()
+    return scenario_id
@@ -0,0 +1,185 @@
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two checks of the watched files
+DEFAULT_INTERVAL = float(os.environ.get('TEA_WATCH_INTERVAL', 1.0))
+
+# Seconds between two checks of a dashboard session for newly ingested data. Each check reruns only the
+# session's refresh fragment, a version comparison costing one browser round trip, so it is kept
+# slower than the file checks: an idle session costs one such round trip per interval.
+REFRESH_INTERVAL = float(os.environ.get('TEA_REFRESH_INTERVAL', 5.0))
+
+# Seconds a changed file must stay unchanged before it is ingested
+SETTLE_TIME = 0.5
+
+# Longest wait (s) before retrying a failed ingest of unchanged files; the wait doubles from `interval`
+MAX_RETRY_DELAY = 60.0
+
+# The process-wide watcher shared by all sessions
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def _signature(path):
+    """Returns what identifies a file's current content cheaply: (mtime_ns, size), or None when missing."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class InputWatcher(threading.Thread):
+    """
+    Background thread that re-ingests input files when they change and counts the ingested versions.
+
+    The thread checks the files every `interval` seconds. When the optional `watchdog` package is
+    installed, file system events (inotify on Linux) wake it up early, so changes are picked up
+    almost immediately; without it, polling alone still picks them up within one interval.
+
+    A change is ingested once the files have stopped changing for `SETTLE_TIME`, so a workbook that is
+    still being saved is not read half-written. A failed ingest is logged and kept in `error`. It is
+    retried as soon as the files change again, and otherwise after a delay that doubles with every
+    failure up to `MAX_RETRY_DELAY`, so a transient failure recovers without a broken workbook being
+    re-imported every second.
+    """
+
+    def __init__(self, paths, ingest, interval=DEFAULT_INTERVAL):
+        super().__init__(name='tea-input-watcher', daemon=True)
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.ingest = ingest
+        self.interval = interval
+        self.version = 0
+        self.error = None
+        self._ingested = {}
+        self._failed = None
+        self._retry_delay = interval
+        self._retry_at = 0.0
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._observer = None
+
+    def ingest_now(self):
+        """Ingests the current files on the calling thread and bumps the version."""
+        signatures = self._signatures()
+        try:
+            self.ingest()
+        except Exception as e:
+            self.error = e
+            self._failed = signatures
+            self._retry_at = time.monotonic() + self._retry_delay
+            self._retry_delay = min(2 * self._retry_delay, MAX_RETRY_DELAY)
+            raise
+        self.error = None
+        self._failed = None
+        self._retry_delay = self.interval
+        self._ingested = signatures
+        self.version += 1
+        logger.info("Ingested input files (data version %d)", self.version)
+
+    def start(self):
+        self._start_observer()
+        super().start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._observer is not None:
+            self._observer.stop()
+
+    def run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            signatures = self._signatures()
+            if signatures == self._ingested:
+                continue
+            if signatures == self._failed and time.monotonic() < self._retry_at:
+                continue
+
+            # Wait until the files stop changing, so a workbook still being saved is not read
+            while not self._stopped.wait(SETTLE_TIME):
+                settled = self._signatures()
+                if settled == signatures:
+                    break
+                signatures = settled
+            if self._stopped.is_set():
+                break
+
+            try:
+                self.ingest_now()
+            except Exception:
+                logger.exception("Re-ingesting changed input files failed; retrying on the next check")
+
+    def _signatures(self):
+        return {path: _signature(path) for path in self.paths}
+
+    def _start_observer(self):
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError:
+            logger.debug("watchdog is not installed; polling every %.1f s", self.interval)
+            return
+
+        paths = set(self.paths)
+        wake = self._wake
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if paths & {os.fsdecode(event.src_path), os.fsdecode(getattr(event, 'dest_path', '') or '')}:
+                    wake.set()
+
+        observer = Observer()
+        for directory in {os.path.dirname(path) for path in self.paths}:
+            observer.schedule(_Handler(), directory, recursive=False)
+        observer.daemon = True
+        try:
+            observer.start()
+        except OSError:
+            logger.warning("File system events are unavailable; polling every %.1f s", self.interval, exc_info=True)
+            return
+        self._observer = observer
+
+
+def start_watcher(paths, ingest, interval=DEFAULT_INTERVAL):
+    """
+    Starts the process-wide input watcher once; later calls return the running watcher.
+
+    Parameters:
+    ----------
+    paths : list
+        The input files to watch, e.g. ['data/input.xlsx'].
+    ingest : callable
+        Called without arguments to re-ingest the inputs, e.g. into the database. The first call
+        happens synchronously here, so the data is ready when this returns. If it fails, the error is
+        logged and kept in the watcher's `error`, and the watcher is started all the same: its checks
+        retry the ingest, so later sessions do not each repeat a failing import.
+    interval : float, optional
+        Seconds between two checks of the files. Defaults to TEA_WATCH_INTERVAL or 1 second.
+
+    Returns:
+    -------
+    InputWatcher
+        The running watcher; its `version` is the data version caches should key on.
+    """
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            watcher = InputWatcher(paths, ingest, interval)
+            try:
+                watcher.ingest_now()
+            except Exception:
+                logger.exception("Ingesting the input files failed; retrying on the next check")
+            watcher.start()
+            _watcher = watcher
+    return _watcher
+
+
+def data_version():
+    """Returns the number of ingests done by the process-wide watcher; 0 before it started."""
+    return _watcher.version if _watcher is not None else 0
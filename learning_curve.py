@@ -0,0 +1,169 @@
+import numpy as np
+
+from discounted_cash_flow import discounted_cash_flow_batch, levelized_cost_of_ammonia
+from input.parameters import get_parameters
+from perf import timed
+
+# Technology parameters that improve as the technology is deployed, and their default learning rates:
+# the reduction (%) per doubling of the cumulative installed capacity
+DEFAULT_LEARNING_RATES = {
+    'reactor_cost': 15.0,
+    'balance_of_plant': 5.0,
+    'catalyst_percentage': 10.0,
+    'e_cell': 2.0,
+}
+
+# Parameters given as a percentage of the reactor cost, which learns at its own rate. Their learning rate
+# applies to the resulting cost, so the percentage learns at the ratio of the two factors.
+PERCENT_OF_REACTOR_COST = ('balance_of_plant', 'catalyst_percentage')
+
+# Years the plant may be installed in; the scenario's parameters are those of the first one
+INSTALLATION_YEARS = np.arange(2025, 2051)
+
+# Yearly growth (%) of the cumulative installed capacity when the learning curve table has no deployment row
+DEFAULT_DEPLOYMENT_GROWTH = 20.0
+
+
+def deployment_trajectory(installation_years, curves=None, deployment_growth=DEFAULT_DEPLOYMENT_GROWTH):
+    """
+    Returns the cumulative installed capacity in each installation year, relative to the first one.
+
+    Parameters:
+        installation_years (np.ndarray): The installation years.
+        curves (dict, optional): Learning curves as returned by `input.learning.get_learning_curves`. Their
+            'installed_capacity' row is interpolated log-linearly between its years and held flat outside them.
+        deployment_growth (float): Yearly growth (%) of the installed capacity, used without that row.
+
+    Returns:
+        np.ndarray: One multiple of the first year's installed capacity per installation year.
+    """
+    installation_years = np.asarray(installation_years, dtype=float)
+    if curves is not None and curves.get('installed_capacity') is not None:
+        known = ~np.isnan(curves['installed_capacity'])
+        capacity = np.exp(np.interp(
+            installation_years, curves['years'][known], np.log(curves['installed_capacity'][known])
+        ))
+        return capacity / capacity[0]
+    return (1 + deployment_growth / 100) ** (installation_years - installation_years[0])
+
+
+def experience_factors(learning_rate, installed_capacity):
+    """
+    Evaluates the experience curve (Wright's law): every doubling of the installed capacity cuts the value
+    by the learning rate.
+
+        factor = installed_capacity ** log2(1 - learning_rate)
+
+    Parameters:
+        learning_rate (float or np.ndarray): Learning rate (%), a scalar or one rate per scenario.
+        installed_capacity (np.ndarray): Installed capacity per installation year, relative to the first one.
+
+    Returns:
+        np.ndarray: (years, n) multipliers of the first year's value, with n = 1 for a scalar rate.
+    """
+    exponent = np.log2(1 - np.reshape(np.asarray(learning_rate, dtype=float), (1, -1)) / 100)
+    return np.reshape(installed_capacity, (-1, 1)) ** exponent
+
+
+def project_parameters(params, installation_years=INSTALLATION_YEARS, learning_rates=None, curves=None,
+                       deployment_growth=DEFAULT_DEPLOYMENT_GROWTH):
+    """
+    Builds the (installation year x scenario) parameter batch of a plant installed in later years.
+
+    Parameters:
+        params (dict): Parameter mapping of the plant installed in the first year. Values may be floats or
+            arrays with one element per scenario.
+        installation_years (array-like): The installation years.
+        learning_rates (dict, optional): Learning rate (%) per parameter, a float or one rate per scenario.
+            Defaults to the rates of `curves`, then to `DEFAULT_LEARNING_RATES`. The rates of
+            `PERCENT_OF_REACTOR_COST` are those of the costs, not of the percentages. The 'e_cell' rate has
+            no effect when `params` holds a polarization curve, which then sets the cell voltage.
+        curves (dict, optional): Learning curves of the workbook. A parameter with a trajectory takes its
+            value in each installation year, interpolated between the table years, instead of learning.
+        deployment_growth (float): See `deployment_trajectory`.
+
+    Returns:
+        tuple: (projected, shape):
+            - projected: A new parameter mapping whose scenario arrays and learned parameters are flat
+              arrays of years x scenarios elements, ready for the vectorized formulae.
+            - shape: (years, scenarios), to reshape the flat results.
+    """
+    installation_years = np.asarray(installation_years, dtype=float)
+    if learning_rates is None:
+        learning_rates = dict(DEFAULT_LEARNING_RATES)
+        if curves is not None:
+            learning_rates.update(curves['learning_rates'])
+    trajectories = {} if curves is None else curves['trajectories']
+
+    scenario_arrays = [value for value in params.values() if isinstance(value, np.ndarray) and value.ndim == 1]
+    n = len(scenario_arrays[0]) if scenario_arrays else 1
+    shape = (len(installation_years), n)
+
+    projected = {
+        name: np.broadcast_to(value, shape).ravel() if isinstance(value, np.ndarray) and value.shape == (n,)
+        else value
+        for name, value in params.items()
+    }
+    installed_capacity = deployment_trajectory(installation_years, curves, deployment_growth)
+    factors = {
+        name: experience_factors(rate, installed_capacity) for name, rate in learning_rates.items()
+        if name in params and name not in trajectories
+    }
+    for name, factor in factors.items():
+        projected[name] = (np.broadcast_to(params[name], (1, n)) * factor).ravel()
+    for name, trajectory in trajectories.items():
+        known = ~np.isnan(trajectory)
+        value = np.interp(installation_years, curves['years'][known], trajectory[known])
+        projected[name] = np.broadcast_to(value[:, None], shape).ravel()
+    # A learned percentage of the reactor cost is divided by the reactor cost's own change, so that the
+    # cost it stands for learns at its stated rate instead of compounding with the reactor's
+    percentages = [name for name in PERCENT_OF_REACTOR_COST if name in factors]
+    if percentages and 'reactor_cost' in params:
+        reactor_cost = np.broadcast_to(params['reactor_cost'], (1, n))
+        reactor_factor = np.divide(
+            np.reshape(projected['reactor_cost'], shape), reactor_cost, out=np.ones(shape), where=reactor_cost != 0
+        )
+        for name in percentages:
+            projected[name] = (np.reshape(projected[name], shape) / reactor_factor).ravel()
+    return projected, shape
+
+
+@timed()
+def learning_curve_batch(discount_rate, tax_rate, water_selling_price, params=None,
+                         installation_years=INSTALLATION_YEARS, learning_rates=None, curves=None,
+                         deployment_growth=DEFAULT_DEPLOYMENT_GROWTH):
+    """
+    Evaluates levelized cost and NPV of every installation year and scenario in one vectorized call.
+
+    Parameters:
+        discount_rate (float): The discount rate (%).
+        tax_rate (float): The tax rate (%).
+        water_selling_price (float): The water selling price ($/Gal).
+        params (dict, optional): Parameter mapping of the plant installed in the first year. Defaults to
+            the database.
+        installation_years, learning_rates, curves, deployment_growth: See `project_parameters`.
+
+    Returns:
+        dict:
+            - 'installation_year': The installation years.
+            - 'npv': (years, scenarios) final cumulative NPV ($M).
+            - 'capex': (years, scenarios) total capital expenditure ($).
+            - 'levelized_cost': (years, scenarios) levelized cost of ammonia ($/kg).
+    """
+    if params is None:
+        params = get_parameters()
+
+    projected, shape = project_parameters(
+        params, installation_years, learning_rates, curves, deployment_growth
+    )
+    results = discounted_cash_flow_batch(discount_rate, tax_rate, water_selling_price, projected)
+    size = shape[0] * shape[1]
+
+    return {
+        'installation_year': np.asarray(installation_years),
+        'npv': np.broadcast_to(results['npv'], (size,)).reshape(shape),
+        'capex': np.broadcast_to(results['capex'], (size,)).reshape(shape),
+        'levelized_cost': np.broadcast_to(
+            levelized_cost_of_ammonia(discount_rate, water_selling_price, projected), (size,)
+        ).reshape(shape),
+    }
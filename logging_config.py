@@ -0,0 +1,44 @@
+import logging
+import os
+import pkgutil
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Directory holding the TEA modules and packages
+REPOSITORY_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def tea_loggers():
+    """
+    Lists the top-level loggers of the TEA modules: one per module and package of the repository (whose
+    children, e.g. 'input.scenarios', inherit its level) and '__main__'. Third-party libraries keep their
+    own levels, and new modules are picked up without being registered here.
+
+    Returns:
+        list: The logger names.
+    """
+    return ['__main__', *(module.name for module in pkgutil.iter_modules([REPOSITORY_ROOT]))]
+
+
+def configure_logging(level=None):
+    """
+    Configures logging for the TEA modules.
+
+    Parameters:
+        level (str or int, optional): Log level to apply. Defaults to the TEA_LOG_LEVEL environment
+            variable, or WARNING when it is not set, so debug output costs nothing in production runs.
+
+    Returns:
+        int: The numeric log level that was applied.
+    """
+    if level is None:
+        level = os.environ.get('TEA_LOG_LEVEL', 'WARNING')
+    if isinstance(level, str):
+        level = logging.getLevelName(level.strip().upper())
+        if not isinstance(level, int):
+            level = logging.WARNING
+
+    logging.basicConfig(format=LOG_FORMAT)
+    for name in tea_loggers():
+        logging.getLogger(name).setLevel(level)
+    return level
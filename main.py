@@ -1,20 +1,44 @@
-import os
-import streamlit as st
+from functools import partial
 import numpy as np
-import pandas as pd
-import plotly.graph_objs as go
+import streamlit as st
 from input.capex_input import get_capex_data
 from input.opex_input import get_opex_data
 from input.electrolyser_input import get_electrolyser_data
 from input.pretreat import get_pretreat_equipment_cost_data
+from input.learning import get_learning_curves
 from input.cash_flow_input import get_cash_flow_data
+from input.connection import database_path
 from input.data_reader import populate_db_from_excel
-from electrolyser_calc import electrolyser_formulae
+from input.scenarios import load_scenario
+from input.watcher import REFRESH_INTERVAL, data_version, start_watcher
+from electrolyser_calc import electrolyser_formulae, has_polarization_model
 from capex_calc import capex_formulae
 from opex_calc import opex_formulae
 from cash_flow_calc import cash_flow_formulae
-from discounted_cash_flow import discounted_cash_flow_analysis
-from display_data import display_default_data, display_calculated_data
+from discounted_cash_flow import (
+    discounted_cash_flow_schedule, discounted_cash_flow_table, internal_rate_of_return, levelized_cost_of_ammonia,
+    project_cash_flow_schedule
+)
+from financing import REPAYMENT_TYPES, financed_cash_flow_batch, financing_schedule
+from escalation import BASES, ESCALATION_RATES, INFLATION_RATE
+from display_data import (
+    display_default_data, display_calculated_data, display_headline_metrics, display_deferred_views,
+    display_performance_panel, display_profile, select_scenario, display_scenario_manager, display_design_explorer,
+    display_financing, display_portfolio
+)
+from charts import (
+    capacity_sweep_figure, current_density_figure, discount_rate_sensitivity_figure, learning_curve_figure,
+    water_price_sensitivity_figure
+)
+from capacity_sweep import DEFAULT_SCALING_EXPONENTS
+from learning_curve import DEFAULT_DEPLOYMENT_GROWTH, DEFAULT_LEARNING_RATES
+from periodic_cash_flow import PERIODS_PER_YEAR, seasonal_profile
+from perf import enabled_by_default, memory_tracking_by_default, memory_stage, trace_run
+from profiler import capture, profile_directory
+from logging_config import configure_logging
+
+# Apply the log level from TEA_LOG_LEVEL (WARNING by default)
+configure_logging()
 
 # Set Streamlit page configuration to wide layout
 st.set_page_config(
@@ -35,15 +59,25 @@ load_css(css_path)
 
 # Define paths
 excel_file_path = 'data/input.xlsx'
-db_file_path = 'data/database.db'
-
-def get_file_last_modified_time(filepath):
-    """Get the last modified time of the file to track changes."""
-    return os.path.getmtime(filepath)
-
-def populate_database(last_modified):
-    """Populate the database from the Excel file."""
-    populate_db_from_excel(excel_file_path, db_file_path)
+db_file_path = database_path()  # data/database.db unless TEA_DB_PATH is set
+
+def start_input_watcher():
+    """Imports the Excel file once per process and re-imports it in the background whenever it changes."""
+    return start_watcher([excel_file_path], partial(populate_db_from_excel, excel_file_path, db_file_path))
+
+@st.cache_data(max_entries=1)
+def load_default_data(version):
+    """Reads the default data tables once per data version instead of on every rerun."""
+    return (
+        get_capex_data(), get_opex_data(), get_electrolyser_data(), get_cash_flow_data(),
+        get_pretreat_equipment_cost_data(), get_learning_curves()
+    )
+
+@st.fragment(run_every=REFRESH_INTERVAL)
+def refresh_on_new_data():
+    """Reruns the whole app when the watcher has ingested new data since this session last rendered."""
+    if st.session_state.get('data_version', data_version()) != data_version():
+        st.rerun()
 
 def main():
     """
@@ -52,30 +86,61 @@ def main():
     # Main Title
     st.title("Techno-Economic Assessment Dashboard")
 
-    # Get the last modified time of the Excel file
-    excel_last_modified = get_file_last_modified_time(excel_file_path)
-
-    # Check if there's a previous last modified time stored in session state
-    if 'last_modified' not in st.session_state:
-        st.session_state['last_modified'] = 0  # Initialize if not present
-
-    # If the Excel file has been modified, show a notification
-    if st.session_state['last_modified'] != excel_last_modified:
-        st.session_state['last_modified'] = excel_last_modified
-
-    # Populate the database, using the file's last modified time to track changes
-    populate_database(excel_last_modified)
-
-    # Get data from the database
-    capex_data = get_capex_data()
-    opex_data = get_opex_data()
-    electrolyser_data = get_electrolyser_data()
-    cash_flow_data = get_cash_flow_data()
-    pretreat_data = get_pretreat_equipment_cost_data()
+    # Record per-stage timings of this rerun when instrumentation is switched on
+    if 'perf_enabled' not in st.session_state:
+        st.session_state['perf_enabled'] = enabled_by_default()
+
+    if 'perf_memory' not in st.session_state:
+        st.session_state['perf_memory'] = memory_tracking_by_default()
+
+    # Profile this rerun when requested from the Performance panel or through TEA_PROFILE
+    if 'profile_enabled' not in st.session_state:
+        st.session_state['profile_enabled'] = profile_directory() is not None
+
+    profile = None
+    with trace_run(
+        "rerun", enabled=st.session_state['perf_enabled'], track_memory=st.session_state['perf_memory']
+    ) as trace:
+        if st.session_state['profile_enabled']:
+            with capture("rerun") as profiling:
+                render_dashboard()
+            profile = profiling.profile
+            if profile_directory() is not None:
+                profile.write(profile_directory())
+        else:
+            render_dashboard()
+
+    display_performance_panel(trace)
+    if profile is not None:
+        display_profile(profile)
+
+    # Pick up input files changed by another session or on disk without waiting for user input
+    refresh_on_new_data()
+
+def render_dashboard():
+    """
+    Renders the dashboard sections, from the database refresh down to the sensitivity charts.
+    """
+    with memory_stage("data_loading"):
+        # The first session imports the Excel file; afterwards the watcher re-imports it when it changes
+        watcher = start_input_watcher()
+        if watcher.error is not None:
+            st.warning(f"Importing {excel_file_path} failed ({watcher.error}); showing the last imported data.")
+        st.session_state['data_version'] = data_version()
+
+        # Get data from the database, cached until the next import
+        (
+            capex_data, opex_data, electrolyser_data, cash_flow_data, pretreat_data, learning_curves
+        ) = load_default_data(st.session_state['data_version'])
+
+        # Resolve the active scenario's overrides onto the cached base parameters
+        scenario = select_scenario(db_file_path)
+        params = load_scenario(scenario, db_file_path)
     
-    # Retrieve initial values for dynamic adjustments
-    _, initial_discount_rate, _, water_selling_price, *_ = cash_flow_data
-    tax_rate = cash_flow_data[0]  # Assuming tax_rate is the first item in cash_flow_data
+    # Retrieve initial values for dynamic adjustments from the active scenario
+    initial_discount_rate = params['discount_rate']
+    water_selling_price = params['water_selling_price']
+    tax_rate = params['tax_rate']
 
     # Sidebar header for Parameter Sensitivity
     st.sidebar.header("Parameter Sensitivity")
@@ -85,12 +150,24 @@ def main():
     with st.sidebar.expander("Cash Flow Rate Changes"):
         # Discount rate slider for dynamic updates
         discount_rate = st.slider(
-            "Discount Rate (%)", min_value=0.0, max_value=20.0, value=initial_discount_rate, step=0.1
+            "Discount Rate (%)", min_value=0.0, max_value=20.0, value=float(initial_discount_rate), step=0.1,
+            key=f"discount_rate:{scenario}"
         )
 
         # Tax rate slider for dynamic updates
         tax_rate = st.slider(
-            "Tax Rate (%)", min_value=0.0, max_value=50.0, value=tax_rate, step=0.5
+            "Tax Rate (%)", min_value=0.0, max_value=50.0, value=float(tax_rate), step=0.5,
+            key=f"tax_rate:{scenario}"
+        )
+
+        # Monthly and quarterly schedules model construction draws, ramp-up and seasons, rolled up by year
+        periods = st.radio(
+            "Cash Flow Periods", tuple(PERIODS_PER_YEAR), format_func=str.capitalize, horizontal=True,
+            key=f"periods:{scenario}"
+        )
+        seasonal_swing = st.slider(
+            "Seasonal Production Swing (%)", min_value=0.0, max_value=50.0, value=0.0, step=1.0,
+            key=f"seasonal_swing:{scenario}", disabled=periods == 'annual'
         )
     st.sidebar.markdown('<div class="sidebar-divider"></div>', unsafe_allow_html=True)  # Add horizontal line after expander
 
@@ -103,16 +180,135 @@ def main():
             max_value=round(water_selling_price * 1.3, 5),  # Set precise maximum
             value=round(water_selling_price, 5),  # Set precise initial value
             step=0.0001,
-            format="%.5f"  # Display up to 5 decimal places
+            format="%.5f",  # Display up to 5 decimal places
+            key=f"water_selling_price:{scenario}"
+        )
+
+        # Plant sizes and six-tenths-rule exponents of the capacity sweep
+        scale_range = st.slider(
+            "Plant Size Range (x capacity)", min_value=0.1, max_value=10.0, value=(0.1, 10.0), step=0.1,
+            key=f"scale_range:{scenario}"
+        )
+        scaling_exponents = dict(DEFAULT_SCALING_EXPONENTS)
+        scaling_exponents['pretreat_pec'] = st.number_input(
+            "Pretreatment Cost Exponent", min_value=0.0, max_value=1.5,
+            value=DEFAULT_SCALING_EXPONENTS['pretreat_pec'], step=0.05, key=f"pretreat_exponent:{scenario}"
+        )
+        scaling_exponents['balance_of_plant'] = st.number_input(
+            "Balance of Plant Cost Exponent", min_value=0.0, max_value=1.5,
+            value=DEFAULT_SCALING_EXPONENTS['balance_of_plant'], step=0.05, key=f"bop_exponent:{scenario}"
         )
     st.sidebar.markdown('<div class="sidebar-divider"></div>', unsafe_allow_html=True)  # Add horizontal line after expander
 
-    calc_capex_data = capex_formulae()
-    calc_opex_data = opex_formulae()
-    calc_electrolyser_data = electrolyser_formulae()
+    # Grouped inputs for the technology learning curves; the workbook's rates are the defaults. A
+    # polarization curve sets the cell voltage, so the cell voltage does not learn with one.
+    with st.sidebar.expander("Learning Curves"):
+        workbook_rates = {} if learning_curves is None else learning_curves['learning_rates']
+        learning_rates = dict(workbook_rates)
+        voltage_from_curve = has_polarization_model(params)
+        learning_rates.update({
+            name: st.slider(
+                label, min_value=0.0, max_value=40.0,
+                value=float(workbook_rates.get(name, DEFAULT_LEARNING_RATES[name])), step=0.5,
+                key=f"learning_rate_{name}:{scenario}", disabled=name == 'e_cell' and voltage_from_curve,
+                help="Not applied: the polarization curve sets the cell voltage."
+                if name == 'e_cell' and voltage_from_curve else None
+            )
+            for name, label in (
+                ('reactor_cost', "Reactor Cost Learning Rate (%)"),
+                ('balance_of_plant', "Balance of Plant Learning Rate (%)"),
+                ('catalyst_percentage', "Catalyst Cost Learning Rate (%)"),
+                ('e_cell', "Cell Voltage Learning Rate (%)"),
+            )
+        })
+        # The workbook's deployment row, when present, replaces the constant growth
+        deployment_growth = st.slider(
+            "Installed Capacity Growth (%/year)", min_value=0.0, max_value=50.0, value=DEFAULT_DEPLOYMENT_GROWTH,
+            step=1.0, key=f"deployment_growth:{scenario}",
+            disabled=learning_curves is not None and learning_curves['installed_capacity'] is not None
+        )
+    st.sidebar.markdown('<div class="sidebar-divider"></div>', unsafe_allow_html=True)  # Add horizontal line after expander
 
-    # Calculate cash flow data with dynamic water price
-    calc_cash_flow_data = cash_flow_formulae(water_price)
+    # Grouped inputs for Cost Escalation; all rates at 0 keep costs and prices constant. Category rates
+    # are total nominal escalation; without them every cost and price follows the general inflation.
+    with st.sidebar.expander("Cost Escalation"):
+        basis = st.radio(
+            "Cash Flows", BASES, format_func=lambda basis: f"{basis.capitalize()} $", horizontal=True,
+            key=f"escalation_basis:{scenario}",
+            help="Nominal: money of the day. Real: money of year 0, deflated by the general inflation."
+        )
+        inflation = st.slider(
+            "General Inflation (%/year)", min_value=-5.0, max_value=15.0,
+            value=float(params.get(INFLATION_RATE, 0.0)), step=0.1, key=f"{INFLATION_RATE}:{scenario}"
+        )
+        escalation_rates = {INFLATION_RATE: inflation}
+        if st.checkbox(
+            "Set Category Rates", value=any(name in params for name in ESCALATION_RATES.values()),
+            key=f"category_rates:{scenario}",
+            help="Nominal escalation of each category, inflation included. Unset, they follow the inflation."
+        ):
+            escalation_rates.update(
+                (name, st.slider(
+                    label, min_value=-5.0, max_value=15.0, value=float(params.get(name, inflation)), step=0.1,
+                    key=f"{name}:{scenario}"
+                ))
+                for name, label in (
+                    (ESCALATION_RATES['electricity'], "Electricity Price (%/year)"),
+                    (ESCALATION_RATES['labour'], "Labour Cost (%/year)"),
+                    (ESCALATION_RATES['water'], "Water Price (%/year)"),
+                    (ESCALATION_RATES['ammonia_price'], "Ammonia Price (%/year)"),
+                    (ESCALATION_RATES['maintenance'], "Maintenance Cost (%/year)"),
+                )
+            )
+    st.sidebar.markdown('<div class="sidebar-divider"></div>', unsafe_allow_html=True)  # Add horizontal line after expander
+    # Every view below evaluates the escalated cash flows; unset category rates follow the inflation
+    params = {name: value for name, value in params.items() if name not in ESCALATION_RATES.values()}
+    params.update(escalation_rates)
+
+    # Grouped inputs for Debt Financing; the project is equity funded at a debt fraction of 0
+    with st.sidebar.expander("Financing"):
+        financing_terms = {
+            'debt_fraction': st.slider(
+                "Debt Fraction (%)", min_value=0.0, max_value=90.0,
+                value=float(params.get('debt_fraction', 0.0)), step=1.0, key=f"debt_fraction:{scenario}"
+            ),
+            'interest_rate': st.slider(
+                "Interest Rate (%)", min_value=0.0, max_value=20.0,
+                value=float(params.get('interest_rate', initial_discount_rate)), step=0.1,
+                key=f"interest_rate:{scenario}"
+            ),
+            'tenor': st.slider(
+                "Loan Tenor (years)", min_value=1, max_value=18, value=int(params.get('loan_tenor', 10)),
+                key=f"loan_tenor:{scenario}"
+            ),
+            'grace_period': st.slider(
+                "Grace Period (years)", min_value=0, max_value=5, value=int(params.get('grace_period', 0)),
+                key=f"grace_period:{scenario}"
+            ),
+            'repayment_type': st.selectbox(
+                "Repayment", REPAYMENT_TYPES, key=f"repayment_type:{scenario}"
+            ),
+            'cost_of_equity': st.slider(
+                "Cost of Equity (%)", min_value=0.0, max_value=30.0,
+                value=float(params.get('cost_of_equity', initial_discount_rate)), step=0.1,
+                key=f"cost_of_equity:{scenario}"
+            ),
+        }
+    st.sidebar.markdown('<div class="sidebar-divider"></div>', unsafe_allow_html=True)  # Add horizontal line after expander
+
+    display_scenario_manager(
+        scenario, params,
+        {'discount_rate': discount_rate, 'tax_rate': tax_rate, 'water_selling_price': water_price},
+        db_file_path
+    )
+
+    with memory_stage("formula_chain"):
+        calc_capex_data = capex_formulae(params)
+        calc_opex_data = opex_formulae(params)
+        calc_electrolyser_data = electrolyser_formulae(params)
+
+        # Calculate cash flow data with dynamic water price
+        calc_cash_flow_data = cash_flow_formulae(water_price, params)
 
     # Display Default Data
     display_default_data(capex_data, opex_data, electrolyser_data, cash_flow_data, pretreat_data)
@@ -120,105 +316,73 @@ def main():
     # Display Calculated Data
     display_calculated_data(calc_capex_data, calc_opex_data, calc_electrolyser_data, calc_cash_flow_data)
 
-    # Add a horizontal line before the Discounted Cash Flow section
-    st.markdown("<hr>", unsafe_allow_html=True)
-    st.header("Discounted Cash Flow Analysis")
-
-    # Run the discounted cash flow analysis with dynamic discount, tax rates, and water price
-    try:
-        dcf_result = discounted_cash_flow_analysis(discount_rate, tax_rate, water_price)
-        st.subheader("Discounted Cash Flow Values ($M)")
-        st.dataframe(dcf_result.T)
-
-        # Plot the Cumulative NPV for various discount rates using Plotly
+    with memory_stage("dcf_assembly"):
+        # Add a horizontal line before the Discounted Cash Flow section
         st.markdown("<hr>", unsafe_allow_html=True)
-        st.subheader("Cumulative Net Present Value (NPV) Over Time at Varying Discount Rates")
-
-        # Generate a range of discount rates from -30% to +30% of the slider value in 10% increments
-        discount_rates = [discount_rate + (discount_rate * i * 0.1) for i in range(-3, 4)]
-        cumulative_npvs = {}
-        for rate in discount_rates:
-            try:
-                dcf_result = discounted_cash_flow_analysis(rate, tax_rate, water_price)  # Pass water_price for dynamic updates
-                cumulative_npvs[f"{rate:.2f}%"] = dcf_result['Cumulative NPV']
-            except Exception as e:
-                st.error(f"Error calculating DCF at {rate:.2f}% discount rate: {e}")
-                continue
-
-        # Prepare data for Plotly
-        fig = go.Figure()
-        years = dcf_result['Year']
-        for rate_label, npv in cumulative_npvs.items():
-            line_width = 4 if rate_label == f"{discount_rate:.2f}%" else 2
-            fig.add_trace(go.Scatter(
-                x=years, y=npv, mode='lines',
-                name=f"<b>{rate_label} (Current)</b>" if line_width == 4 else rate_label,
-                line=dict(width=line_width)
+        st.header("Discounted Cash Flow Analysis")
+
+        # Run the discounted cash flow analysis with dynamic discount, tax rates, and water price
+        try:
+            period_options = {} if periods == 'annual' else {'profile': seasonal_profile(seasonal_swing)}
+            schedule = discounted_cash_flow_schedule(
+                discount_rate, tax_rate, water_price, params, basis, periods, **period_options
+            )
+            dcf_result = discounted_cash_flow_table(schedule)
+            # From the unrounded flows: the table's are in $M rounded to 2 decimals
+            irr = internal_rate_of_return(schedule['Free Cash Flow'][0])
+            levelized_cost = levelized_cost_of_ammonia(discount_rate, water_price, params)
+        except Exception as e:
+            st.error(f"Error calculating Discounted Cash Flow Analysis: {e}")
+            return
+
+        # Show the headline numbers first, then stream in the sensitivity charts as they are computed
+        display_headline_metrics(dcf_result, irr, levelized_cost)
+
+        # With debt, show the WACC-based valuation and the debt schedule of the active case
+        if financing_terms['debt_fraction'] > 0:
+            financed = financed_cash_flow_batch(tax_rate, water_price, params, basis=basis, **financing_terms)
+            financing = financing_schedule(
+                project_cash_flow_schedule(financed['wacc'], tax_rate, water_price, params), tax_rate,
+                *(financing_terms[key] for key in (
+                    'debt_fraction', 'interest_rate', 'tenor', 'grace_period', 'repayment_type'
+                ))
+            )
+            display_financing(financed, financing)
+        views = [
+            (
+                "Cumulative Net Present Value (NPV) Over Time at Varying Discount Rates",
+                partial(discount_rate_sensitivity_figure, discount_rate, tax_rate, water_price, params)
+            ),
+            (
+                "Sensitivity Analysis: Cumulative NPV vs. Water Price",
+                partial(water_price_sensitivity_figure, discount_rate, tax_rate, water_price, params)
+            ),
+        ]
+        views.append((
+            "Economy of Scale: Cost Curve by Plant Capacity",
+            partial(
+                capacity_sweep_figure, discount_rate, tax_rate, water_price, params,
+                np.geomspace(*scale_range, 300), scaling_exponents
+            )
+        ))
+        views.append((
+            "Technology Learning: Cost Decline by Installation Year",
+            partial(
+                learning_curve_figure, discount_rate, tax_rate, water_price, params, learning_rates,
+                learning_curves, deployment_growth
+            )
+        ))
+        # Scenarios with a polarization curve can trade electrolyser area against cell voltage
+        if has_polarization_model(params):
+            views.append((
+                "Current Density Optimization: Levelized Cost of Ammonia",
+                partial(current_density_figure, discount_rate, water_price, params)
             ))
+        display_deferred_views(views)
 
-        # Update layout for bold yellow horizontal line at y=0
-        fig.update_layout(
-            title="Cumulative NPV over Time at Different Discount Rates",
-            xaxis_title="Years",
-            yaxis_title="Cumulative NPV ($M)",
-            legend_title="Discount Rates",
-            template="plotly_white",
-            shapes=[
-                dict(
-                    type="line",
-                    x0=years.min(),
-                    x1=years.max(),
-                    y0=0,
-                    y1=0,
-                    line=dict(color="yellow", width=3)
-                )
-            ]
-        )
-        st.plotly_chart(fig)
-
-        # Water price sensitivity plot
-        st.markdown("<hr>", unsafe_allow_html=True)
-        st.subheader("Sensitivity Analysis: Cumulative NPV vs. Water Price")
-
-        # Vary water price from -30% to +30%
-        water_prices = [water_price * (1 + i * 0.1) for i in range(-3, 4)]
-        npv_last_values = []
-
-        for price in water_prices:
-            try:
-                dcf_result = discounted_cash_flow_analysis(discount_rate, tax_rate, price)
-                npv_last_values.append(dcf_result['Cumulative NPV'].iloc[-1])  # Last year cumulative NPV
-            except Exception as e:
-                st.error(f"Error calculating DCF at water price {price}: {e}")
-                continue
-
-        # Plot NPV last values vs. Water Price
-        fig_water_price = go.Figure(data=go.Scatter(
-            x=water_prices,
-            y=npv_last_values,
-            mode='lines+markers'
-        ))
-        fig_water_price.update_layout(
-            title="Sensitivity of NPV to Water Selling Price",
-            xaxis_title="Water Selling Price ($/Gal)",
-            yaxis_title="Cumulative NPV ($M)",
-            template="plotly_white",
-            shapes=[
-                dict(
-                    type="line",
-                    xref="paper",  # Make the line span the entire plot width
-                    x0=0,  # Start at the left edge of the plot
-                    x1=1,  # End at the right edge of the plot
-                    y0=0,
-                    y1=0,
-                    line=dict(color="yellow", width=3)
-                )
-            ]
-        )
-        st.plotly_chart(fig_water_price)
+    display_design_explorer(scenario, params, discount_rate, tax_rate, water_price, db_file_path)
 
-    except Exception as e:
-        st.error(f"Error calculating Discounted Cash Flow Analysis: {e}")
+    display_portfolio(discount_rate, tax_rate, water_price, db_file_path)
 
 if __name__ == "__main__":
     main()
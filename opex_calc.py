@@ -1,40 +1,24 @@
-import sqlite3
-import pandas as pd
-
 # Import necessary functions from other modules
-from input.opex_input import get_opex_data
-from input.capex_input import get_capex_data
-from input.cash_flow_input import get_cash_flow_data
-from input.pretreat import get_pretreat_equipment_cost_data
-from input.electrolyser_input import get_electrolyser_data
+from calc_utils import round_values
+from input.parameters import get_parameters
 from capex_calc import capex_formulae
 from electrolyser_calc import electrolyser_formulae
+from perf import timed
 
-def opex_formulae():
+@timed()
+def opex_formulae(params=None):
     """
     This function computes the operational expenditures (OPEX) by reading relevant variables and applying the necessary formulae.
+
+    Parameters:
+    ----------
+    params (dict, optional): Parameter mapping as returned by `get_parameters`, with float or numpy array values.
+        Defaults to the parameters stored in the database.
     """
+    if params is None:
+        params = get_parameters()
 
-    (
-        faradaic_constant,
-        time,
-        no_of_electrons,
-        faradaic_efficiency,
-        molar_weight,
-        capacity,
-        capacity_factor,
-        current_density,
-        reactor_cost,
-        e_cell,
-        balance_of_plant,
-        maintenance_frequency,
-        maintenance_factor,
-        catalyst_percentage,
-        catalyst_lifespan,
-        capacity_factor,
-        electrolyser_installation_cost,
-        separation_cost
-    ) = get_electrolyser_data()
+    capacity_factor = params['capacity_factor']
 
     (
         current,
@@ -51,28 +35,24 @@ def opex_formulae():
         electrolyer_opex,
         electrolyser_foc,
         electrolyser_voc
-    ) = electrolyser_formulae()
-
-    (
-        base_labour_wage,
-        no_of_labourers,
-        supervision,
-        direct_overhead,
-        general_overhead,
-        insurance,
-        miscellaneous,
-        laboratory_cost,
-        working_capital_financing,
-        electricity_unit_cost,
-        raw_material,
-        pump_power,
-        chemical_cost,
-        chemical_quantity
-    ) = get_opex_data()
-
+    ) = electrolyser_formulae(params)
+
+    base_labour_wage = params['base_labour_wage']
+    no_of_labourers = params['no_of_labourers']
+    supervision = params['supervision']
+    direct_overhead = params['direct_overhead']
+    general_overhead = params['general_overhead']
+    insurance = params['insurance']
+    miscellaneous = params['miscellaneous']
+    laboratory_cost = params['laboratory_cost']
+    working_capital_financing = params['working_capital_financing']
+    electricity_unit_cost = params['electricity_unit_cost']
+    raw_material = params['raw_material']
+    pump_power = params['pump_power']
+    chemical_cost = params['chemical_cost']
+    chemical_quantity = params['chemical_quantity']
 
     # Call function to retrieve additional data needed
-    
     (
         install_cost_total,
         controls_and_instrumentation_total,
@@ -85,21 +65,9 @@ def opex_formulae():
         working_capital_total,
         capex,
         total_capital_cost
-    ) = capex_formulae()
-
-    (
-        tax_rate,
-        discount_rate,
-        water_cost_price,
-        water_selling_price,
-        ammonia_selling_price,
-        chemical_selling_price,
-        depreciation_time,
-        life_of_plant,
-        land,
-        treated_water_quantity
-    ) = get_cash_flow_data()
+    ) = capex_formulae(params)
 
+    water_cost_price = params['water_cost_price']
 
     # Labour cost
     labour_cost = base_labour_wage * no_of_labourers
@@ -145,15 +113,15 @@ def opex_formulae():
 
     # Return all computed values
     return (
-        round(labour_cost, 2),
-        round(supervision_cost, 2),
-        round(direct_overhead_cost, 2),
-        round(general_overhead_cost, 2),
-        round(insurance_cost, 2),
-        round(miscellaneous_cost, 2),
-        round(laboratory_cost_total, 2),
-        round(working_capital_financing_cost, 2),
-        round(opex, 2)
+        round_values(labour_cost, 2),
+        round_values(supervision_cost, 2),
+        round_values(direct_overhead_cost, 2),
+        round_values(general_overhead_cost, 2),
+        round_values(insurance_cost, 2),
+        round_values(miscellaneous_cost, 2),
+        round_values(laboratory_cost_total, 2),
+        round_values(working_capital_financing_cost, 2),
+        round_values(opex, 2)
     )
 
 # Example usage
@@ -0,0 +1,288 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# Trace of the current rerun (None when instrumentation is disabled) and the innermost open stage
+_current_trace = contextvars.ContextVar('tea_perf_trace', default=None)
+_current_stage = contextvars.ContextVar('tea_perf_stage', default=None)
+
+# tracemalloc is process-wide: concurrent sessions share it, so it is started by the first memory-tracking
+# trace and stopped when the last one exits, and its peak is only reset when no other memory stage is open
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+_open_memory_stages = 0
+
+
+def _env_flag(name):
+    return os.environ.get(name, '').strip().lower() not in ('', '0', 'false', 'no', 'off')
+
+
+def enabled_by_default():
+    """Returns True when the TEA_PERF environment variable switches instrumentation on."""
+    return _env_flag('TEA_PERF')
+
+
+def memory_tracking_by_default():
+    """Returns True when the TEA_PERF_MEMORY environment variable switches memory tracking on."""
+    return _env_flag('TEA_PERF_MEMORY')
+
+
+class StageStats:
+    """Accumulated wall time, call count and database query count of one stage."""
+
+    __slots__ = ('calls', 'wall_time', 'queries')
+
+    def __init__(self):
+        self.calls = 0
+        self.wall_time = 0.0
+        self.queries = 0
+
+
+class MemoryStats:
+    """Allocations of one memory-tracked stage, measured with tracemalloc."""
+
+    __slots__ = ('net_bytes', 'peak_bytes', 'top_sites')
+
+    def __init__(self, net_bytes, peak_bytes, top_sites):
+        self.net_bytes = net_bytes
+        self.peak_bytes = peak_bytes
+        self.top_sites = top_sites
+
+
+class Trace:
+    """
+    Per-stage timings collected during one rerun or batch job.
+
+    Stage times are inclusive: a formula stage includes the database reads it triggers.
+    Database queries are attributed to the innermost open stage only.
+    """
+
+    def __init__(self, name='rerun', track_memory=False):
+        self.name = name
+        self.track_memory = track_memory
+        self.started_at = time.time()
+        self.wall_time = 0.0
+        self.stages = {}
+        self.memory = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, stage_name):
+        stats = self.stages.get(stage_name)
+        if stats is None:
+            stats = self.stages[stage_name] = StageStats()
+        return stats
+
+    def record(self, stage_name, elapsed):
+        with self._lock:
+            stats = self._stats(stage_name)
+            stats.calls += 1
+            stats.wall_time += elapsed
+
+    def add_queries(self, stage_name, count):
+        with self._lock:
+            self._stats(stage_name).queries += count
+
+    @property
+    def total_queries(self):
+        return sum(stats.queries for stats in self.stages.values())
+
+    def rows(self):
+        """Returns one dictionary per stage, slowest stage first."""
+        rows = [
+            {
+                'stage': stage_name,
+                'calls': stats.calls,
+                'total_ms': round(stats.wall_time * 1000, 3),
+                'mean_ms': round(stats.wall_time * 1000 / stats.calls, 3) if stats.calls else 0.0,
+                'db_queries': stats.queries,
+            }
+            for stage_name, stats in self.stages.items()
+        ]
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+    def memory_rows(self):
+        """Returns one dictionary per memory-tracked stage, in execution order."""
+        return [
+            {
+                'stage': stage_name,
+                'net_kib': round(stats.net_bytes / 1024, 1),
+                'peak_kib': round(stats.peak_bytes / 1024, 1),
+                'top_sites': stats.top_sites,
+            }
+            for stage_name, stats in self.memory.items()
+        ]
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'started_at': self.started_at,
+            'wall_ms': round(self.wall_time * 1000, 3),
+            'db_queries': self.total_queries,
+            'stages': self.rows(),
+            'memory': self.memory_rows(),
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent)
+
+
+@contextmanager
+def trace_run(name='rerun', enabled=None, track_memory=None):
+    """
+    Collects stage timings for everything executed inside the block.
+
+    Parameters:
+        name (str): Name recorded in the exported trace.
+        enabled (bool, optional): Whether to record anything. Defaults to the TEA_PERF environment variable.
+        track_memory (bool, optional): Whether `memory_stage` blocks take tracemalloc snapshots.
+            Defaults to the TEA_PERF_MEMORY environment variable. Implies `enabled`.
+
+    Yields:
+        Trace or None: The trace being recorded, or None when instrumentation is disabled.
+    """
+    if enabled is None:
+        enabled = enabled_by_default()
+    if track_memory is None:
+        track_memory = memory_tracking_by_default()
+    if not (enabled or track_memory):
+        yield None
+        return
+
+    trace = Trace(name, track_memory=track_memory)
+    token = _current_trace.set(trace)
+    if track_memory:
+        _acquire_tracemalloc()
+    start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.wall_time = time.perf_counter() - start
+        if track_memory:
+            _release_tracemalloc()
+        _current_trace.reset(token)
+
+
+def _acquire_tracemalloc():
+    """Starts tracemalloc for the first memory-tracking trace, unless it is already tracing."""
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+
+
+def _release_tracemalloc():
+    """Stops tracemalloc when the last memory-tracking trace exits, if a trace started it."""
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+
+@contextmanager
+def stage(name):
+    """Times the enclosed block as `name` in the active trace, if any."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    token = _current_stage.set(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.record(name, time.perf_counter() - start)
+        _current_stage.reset(token)
+
+
+@contextmanager
+def memory_stage(name, top=10):
+    """
+    Records the net and peak allocations of the enclosed block and its top allocation sites.
+
+    Does nothing unless the active trace tracks memory. Allocations made by other threads in the
+    meantime are included, as tracemalloc is process-wide. For the same reason the peak is shared:
+    it is only reset when no other memory stage is open, in this session or a concurrent one, so
+    the peak of an overlapping or nested stage is an upper bound that may include the others'.
+
+    Parameters:
+        name (str): Stage name, e.g. 'data_loading', 'formula_chain' or 'dcf_assembly'.
+        top (int): Number of allocation sites to keep, largest net growth first.
+    """
+    trace = _current_trace.get()
+    if trace is None or not trace.track_memory:
+        yield
+        return
+
+    global _open_memory_stages
+    before = tracemalloc.take_snapshot()
+    with _tracemalloc_lock:
+        current_before, _ = tracemalloc.get_traced_memory()
+        if _open_memory_stages == 0:
+            tracemalloc.reset_peak()
+        _open_memory_stages += 1
+    try:
+        with stage(name):
+            yield
+    finally:
+        with _tracemalloc_lock:
+            _open_memory_stages -= 1
+            current_after, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+        top_sites = [
+            f"{difference.traceback[0].filename}:{difference.traceback[0].lineno} "
+            f"{difference.size_diff / 1024:+.1f} KiB ({difference.count_diff:+d} blocks)"
+            for difference in after.compare_to(before, 'lineno')[:top]
+        ]
+        trace.memory[name] = MemoryStats(current_after - current_before, peak - current_before, top_sites)
+
+
+def log_memory_report(trace, log=None):
+    """Logs the per-stage memory statistics of `trace` at INFO level, e.g. at the end of a batch run."""
+    log = log or logging.getLogger(__name__)
+    if trace is None:
+        return
+    for row in trace.memory_rows():
+        log.info("Memory stage %s: net %+.1f KiB, peak %.1f KiB", row['stage'], row['net_kib'], row['peak_kib'])
+        for site in row['top_sites']:
+            log.info("    %s", site)
+
+
+def timed(name=None):
+    """
+    Decorator that times every call of the wrapped function as a stage of the active trace.
+
+    Parameters:
+        name (str, optional): Stage name. Defaults to the function name.
+    """
+    def decorator(fn):
+        stage_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return fn(*args, **kwargs)
+            with stage(stage_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count_query(count=1):
+    """Records `count` database queries against the innermost open stage of the active trace."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_queries(_current_stage.get() or '(untracked)', count)
@@ -0,0 +1,292 @@
+import numpy as np
+
+from cash_flow_calc import cash_flow_formulae
+from capex_calc import capex_formulae
+from discounted_cash_flow import ANALYSIS_YEARS, SCHEDULE_COLUMNS, internal_rate_of_return
+from escalation import INFLATION_RATE, category_rate, escalation_factors, nominal_discount_rate, opex_by_category
+from input.parameters import get_parameters
+from perf import timed
+
+# Periods per year of each resolution of the cash flow schedule
+PERIODS_PER_YEAR = {'annual': 1, 'quarterly': 4, 'monthly': 12}
+
+# Construction years before operation starts, as in `cash_flow_schedule`
+CONSTRUCTION_YEARS = 2
+
+# Last year in which the plant is depreciated, as in `cash_flow_schedule`
+LAST_DEPRECIATION_YEAR = 16
+
+# Months over which production ramps up linearly to full rate. Eight months average two-thirds of the
+# full rate over the first operating year, the factor of the annual schedule.
+DEFAULT_RAMP_UP_MONTHS = 8
+
+# When a cash flow is discounted: 'mid' at the middle of its period, 'start' at the beginning of its period,
+# and 'year' at the beginning of its year like the annual schedule. Only 'year' gives the NPV of the annual
+# schedule from the same yearly cash flows; the others also discount each period within its year.
+DISCOUNT_TIMINGS = ('mid', 'start', 'year')
+
+# Operating cost categories of `escalation.opex_by_category` that follow the production rate of the season
+VARIABLE_COST_CATEGORIES = ('electricity', 'water')
+
+
+def seasonal_profile(amplitude=0.0, peak_month=6):
+    """
+    Builds monthly capacity factors that swing around the annual average.
+
+    Parameters:
+        amplitude (float): Swing of production above and below the average (%).
+        peak_month (int): Month of the highest production, 1 to 12.
+
+    Returns:
+        np.ndarray: 12 monthly multipliers of the average production rate, averaging 1.
+    """
+    months = np.arange(1, 13)
+    return 1 + amplitude / 100 * np.cos(2 * np.pi * (months - peak_month) / 12)
+
+
+def _period_average(cumulative, periods_per_year, n_periods):
+    """Averages a rate over each period from its integral `cumulative(month)` since the start of operation."""
+    months_per_period = 12 / periods_per_year
+    bounds = np.arange(n_periods + 1) * months_per_period
+    return np.diff(cumulative(bounds)) / months_per_period
+
+
+def ramp_up_factors(periods_per_year, ramp_up_months=DEFAULT_RAMP_UP_MONTHS):
+    """
+    Returns the share of full production in each period of the schedule.
+
+    Production is 0 during construction, then rises linearly to the full rate over `ramp_up_months`.
+    Each period gets the average of the ramp over its months, so the annual factors are exactly
+    0, 0, 2/3, 1, ... for the default ramp of 8 months.
+    """
+    n_periods = len(ANALYSIS_YEARS) * periods_per_year
+    construction = CONSTRUCTION_YEARS * periods_per_year
+    ramp = max(float(ramp_up_months), 1e-9)
+
+    def cumulative(month):
+        return np.where(month <= ramp, month ** 2 / (2 * ramp), ramp / 2 + (month - ramp))
+
+    factors = np.zeros(n_periods)
+    factors[construction:] = _period_average(cumulative, periods_per_year, n_periods - construction)
+    return factors
+
+
+def seasonal_factors(periods_per_year, profile=None):
+    """Averages 12 monthly multipliers over each period of the schedule; None is a flat profile."""
+    n_periods = len(ANALYSIS_YEARS) * periods_per_year
+    if profile is None:
+        return np.ones(n_periods)
+    monthly = np.asarray(profile, dtype=float)
+    monthly = monthly / monthly.mean()
+    return np.tile(monthly.reshape(periods_per_year, -1).mean(axis=1), len(ANALYSIS_YEARS))
+
+
+def construction_draws(periods_per_year):
+    """
+    Returns the share of the capital investment drawn in each construction period, along an S-curve.
+
+    The cumulative share after a fraction x of the construction time is (1 - cos(pi x)) / 2: spending is
+    slow while mobilizing, peaks mid-way and tails off at commissioning. The curve is symmetric, so each of
+    the two construction years draws half of the investment, like the annual schedule.
+    """
+    bounds = np.linspace(0, 1, CONSTRUCTION_YEARS * periods_per_year + 1)
+    return np.diff((1 - np.cos(np.pi * bounds)) / 2)
+
+
+def _book(amounts, shares):
+    """
+    Books yearly amounts into periods: the sum of amount * share over the amounts.
+
+    Each amount is a scalar or one value per scenario; each share is a (1, periods) row, or (n, periods)
+    when its escalation differs by scenario. With common shares, the sum is a single matrix product.
+    """
+    if all(share.shape[0] == 1 for share in shares):
+        amounts = np.broadcast_arrays(*(np.asarray(amount, dtype=float) for amount in amounts))
+        return np.column_stack([np.reshape(amount, -1) for amount in amounts]) @ np.vstack(shares)
+    total = 0.0
+    for amount, share in zip(amounts, shares):
+        total = total + np.reshape(np.asarray(amount, dtype=float), (-1, 1)) * share
+    return total
+
+
+def period_cash_flow_schedule(discount_rate, tax_rate, water_selling_price, params=None, periods='monthly',
+                              ramp_up_months=None, profile=None, timing='mid'):
+    """
+    Builds the cash flow schedule at monthly or quarterly resolution for one or many scenarios at once.
+
+    The schedule follows `cash_flow_schedule` period by period: capital is drawn along the S-curve of
+    `construction_draws`, land at the start and working capital at the end of construction, both recovered
+    in the last period. Production ramps up linearly after construction and swings with the season;
+    revenue and the variable operating costs follow it, the fixed costs do not. Depreciation is spread
+    evenly over the periods of years 2 to 16, and taxes are charged on the operating periods. Escalation
+    of the yearly costs and prices (see `escalation`) applies to every period of the year.
+
+    Parameters:
+        discount_rate, tax_rate, water_selling_price (float or np.ndarray): As for `discounted_cash_flow_batch`.
+        params (dict, optional): Parameter mapping whose values are floats or arrays with one element per
+            scenario. Defaults to the parameters stored in the database.
+        periods (str): A resolution of `PERIODS_PER_YEAR`.
+        ramp_up_months (float, optional): Months to full production. Defaults to the 'ramp_up_months'
+            parameter, then to `DEFAULT_RAMP_UP_MONTHS`.
+        profile (array-like, optional): 12 monthly production multipliers, e.g. from `seasonal_profile`.
+            Defaults to a flat profile.
+        timing (str): One of `DISCOUNT_TIMINGS`.
+
+    Returns:
+        dict: Maps each name in `SCHEDULE_COLUMNS` to an (n, periods) array in $.
+
+    Raises:
+        ValueError: If `periods` or `timing` is unknown.
+    """
+    if periods not in PERIODS_PER_YEAR:
+        raise ValueError(f"Unknown period {periods!r}; expected one of {', '.join(PERIODS_PER_YEAR)}")
+    if timing not in DISCOUNT_TIMINGS:
+        raise ValueError(f"Unknown discount timing {timing!r}; expected one of {', '.join(DISCOUNT_TIMINGS)}")
+    if params is None:
+        params = get_parameters()
+    if ramp_up_months is None:
+        ramp_up_months = params.get('ramp_up_months', DEFAULT_RAMP_UP_MONTHS)
+
+    per_year = PERIODS_PER_YEAR[periods]
+    n_periods = len(ANALYSIS_YEARS) * per_year
+    period_years = np.repeat(ANALYSIS_YEARS, per_year)
+
+    (
+        land_cost,
+        total_capital_investment,
+        depreciation,
+        total_pec,
+        working_capital_total,
+        total_revenue,
+        water_revenue,
+        ammonia_revenue
+    ) = cash_flow_formulae(water_selling_price, params)
+
+    def column(value):
+        return np.reshape(np.asarray(value, dtype=float), (-1, 1))
+
+    def yearly(rate):
+        # Yearly escalation of every period, with the years' factors repeated over their periods
+        return escalation_factors(rate, ANALYSIS_YEARS)[:, period_years]
+
+    operating = period_years >= CONSTRUCTION_YEARS
+    season = seasonal_factors(per_year, profile)
+    sales = ramp_up_factors(per_year, ramp_up_months) * season / per_year
+
+    # Share of each yearly cost and revenue booked in each period. Fixed costs are spread evenly over the
+    # year; variable costs and revenue follow the seasonal production.
+    categories = opex_by_category(params)
+    costs = [categories.pop('other')]
+    cost_shares = [yearly(params.get(INFLATION_RATE, 0)) * operating / per_year]
+    for category, cost in categories.items():
+        share = yearly(category_rate(params, category)) * operating / per_year
+        costs.append(cost)
+        cost_shares.append(share * season if category in VARIABLE_COST_CATEGORIES else share)
+    revenues = [water_revenue, ammonia_revenue]
+    revenue_shares = [yearly(category_rate(params, price)) * sales for price in ('water', 'ammonia_price')]
+
+    operating_cost = _book(costs, cost_shares)
+    revenue = _book(revenues, revenue_shares)
+
+    # Capital is drawn during construction, land bought first and working capital provided last; both
+    # are recovered in the last period
+    construction = CONSTRUCTION_YEARS * per_year
+    capital_share, land_share, working_capital_share = np.zeros((3, 1, n_periods))
+    capital_share[0, :construction] = construction_draws(per_year)
+    land_share[0, 0] = working_capital_share[0, construction - 1] = 1
+    land_share[0, -1] = working_capital_share[0, -1] = -1
+    investment = _book(
+        [total_capital_investment, land_cost, working_capital_total],
+        [capital_share, land_share, working_capital_share]
+    )
+
+    shape = np.broadcast_shapes(investment.shape, operating_cost.shape, revenue.shape)
+    depreciated = operating & (period_years <= LAST_DEPRECIATION_YEAR)
+    depreciation_values = np.broadcast_to(column(depreciation) * depreciated / per_year, shape)
+
+    net_profit_before_taxes = revenue - operating_cost - depreciation_values - investment
+    federal_income_tax = column(tax_rate) / 100 * operating * net_profit_before_taxes
+    net_profit_after_taxes = net_profit_before_taxes - federal_income_tax
+    free_cash_flow = net_profit_after_taxes + depreciation_values
+
+    # With escalation, cash flows are in money of the day and discounted at the nominal rate
+    rate = nominal_discount_rate(discount_rate, params)
+    if timing == 'year':
+        elapsed = period_years
+    else:
+        elapsed = (np.arange(n_periods) + (0.5 if timing == 'mid' else 0.0)) / per_year
+    net_present_value = free_cash_flow * (1 + column(rate) / 100) ** -elapsed
+
+    schedule = {
+        'Annual Investment': investment,
+        'Operating Cost': operating_cost,
+        'Revenue': revenue,
+        'Depreciation': depreciation_values,
+        'Net Profit Before Taxes': net_profit_before_taxes,
+        'Federal Income Tax': federal_income_tax,
+        'Net Profit After Taxes': net_profit_after_taxes,
+        'Free Cash Flow': free_cash_flow,
+        'Cumulative Cash Flow': np.cumsum(free_cash_flow, axis=1),
+        'Net Present Value (NPV)': net_present_value,
+        'Cumulative NPV': np.cumsum(net_present_value, axis=1),
+    }
+    return {name: np.broadcast_to(values, shape) for name, values in schedule.items()}
+
+
+def annual_rollup(schedule):
+    """
+    Sums a period schedule into the years of the annual schedule.
+
+    Parameters:
+        schedule (dict): (n, periods) arrays, as returned by `period_cash_flow_schedule`.
+
+    Returns:
+        dict: (n, years) arrays of every column in `SCHEDULE_COLUMNS`. The cumulative columns are the
+        year-end values. With a flat profile and the default ramp-up the yearly cash flows match those of
+        the annual schedule; the NPV only does with 'year' timing, as 'mid' and 'start' also discount each
+        period within its year.
+    """
+    annual = {}
+    for name in SCHEDULE_COLUMNS:
+        values = schedule[name]
+        n, n_periods = values.shape
+        by_year = values.reshape(n, len(ANALYSIS_YEARS), n_periods // len(ANALYSIS_YEARS))
+        annual[name] = by_year[:, :, -1] if name.startswith('Cumulative') else by_year.sum(axis=2)
+    return annual
+
+
+@timed()
+def period_cash_flow_batch(discount_rate, tax_rate, water_selling_price, params=None, periods='monthly',
+                           ramp_up_months=None, profile=None, timing='mid'):
+    """
+    Evaluates the DCF headline metrics at monthly or quarterly resolution for many scenarios in one pass.
+
+    Parameters:
+        discount_rate, tax_rate, water_selling_price, params, periods, ramp_up_months, profile, timing:
+            See `period_cash_flow_schedule`.
+
+    Returns:
+        dict: Arrays with one element per scenario:
+            - 'npv': Final cumulative NPV ($M).
+            - 'irr': Internal rate of return of the period free cash flows, as an effective yearly rate (%).
+              NaN where it does not exist.
+            - 'capex': Total capital expenditure ($).
+    """
+    if params is None:
+        params = get_parameters()
+
+    schedule = period_cash_flow_schedule(
+        discount_rate, tax_rate, water_selling_price, params, periods, ramp_up_months, profile, timing
+    )
+    per_year = PERIODS_PER_YEAR[periods]
+    n = len(schedule['Cumulative NPV'])
+
+    # Solve for the period rate within the yearly bounds of `internal_rate_of_return`, then compound it
+    # into a yearly rate: (1 + r_period) ** periods_per_year - 1
+    low, high = ((1 + np.array([-99.0, 1000.0]) / 100) ** (1 / per_year) - 1) * 100
+    period_irr = internal_rate_of_return(schedule['Free Cash Flow'], low=low, high=high)
+    return {
+        'npv': schedule['Cumulative NPV'][:, -1] / 1_000_000,
+        'irr': ((1 + period_irr / 100) ** per_year - 1) * 100,
+        'capex': np.broadcast_to(capex_formulae(params)[9], (n,)).astype(float),
+    }
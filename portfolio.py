@@ -0,0 +1,155 @@
+import numpy as np
+
+from discounted_cash_flow import ANALYSIS_YEARS, PRODUCTION_RAMP, internal_rate_of_return, project_cash_flow_schedule
+from escalation import nominal_discount_rate
+from input.scenarios import parameter_groups
+from perf import timed
+
+# Calendar year of a site's first construction year when its parameters set no 'project_year'
+DEFAULT_START_YEAR = 2025
+
+# How a shared cost pool is split between the sites operating in a year
+ALLOCATION_KEYS = ('capacity', 'equal')
+
+
+def calendar_index(start_years):
+    """
+    Maps every site year onto the portfolio's calendar.
+
+    Parameters:
+        start_years (array-like): Calendar year of each site's year 0.
+
+    Returns:
+        tuple: (index, calendar_years):
+            - index: (n, years) position of each site year in `calendar_years`.
+            - calendar_years: Every calendar year from the first start to the last year of the latest site.
+    """
+    start_years = np.rint(np.asarray(start_years, dtype=float)).astype(int)
+    first_year = start_years.min()
+    index = (start_years - first_year)[:, None] + ANALYSIS_YEARS
+    return index, np.arange(first_year, first_year + index.max() + 1)
+
+
+def aggregate_by_year(values, index, n_years):
+    """
+    Sums site values into calendar years with one scatter-add.
+
+    Parameters:
+        values (np.ndarray): (n, years) values of each site year.
+        index (np.ndarray): (n, years) calendar positions, as returned by `calendar_index`.
+        n_years (int): Number of calendar years.
+
+    Returns:
+        np.ndarray: The total of each calendar year.
+    """
+    return np.bincount(index.ravel(), weights=np.broadcast_to(values, index.shape).ravel(), minlength=n_years)
+
+
+def allocate_shared_costs(shared_costs, allocation, capacity, index, n_years):
+    """
+    Splits the yearly shared cost pools between the sites operating in each calendar year.
+
+    Parameters:
+        shared_costs (dict): Maps each pool name to its yearly cost ($), a float or one value per calendar
+            year. A pool is only incurred in calendar years in which at least one site operates.
+        allocation (dict): Maps pool names to one of `ALLOCATION_KEYS`; pools not listed go by capacity.
+        capacity (np.ndarray): Ammonia capacity of each site (kg/day), the weight of the 'capacity' key.
+        index (np.ndarray): (n, years) calendar positions, as returned by `calendar_index`.
+        n_years (int): Number of calendar years.
+
+    Returns:
+        np.ndarray: (n, years) share of the pools charged to each site year ($).
+
+    Raises:
+        ValueError: If a pool's allocation key is not one of `ALLOCATION_KEYS`.
+    """
+    operating = PRODUCTION_RAMP > 0
+    allocated = np.zeros(index.shape)
+    for pool, cost in shared_costs.items():
+        key = allocation.get(pool, 'capacity')
+        if key not in ALLOCATION_KEYS:
+            raise ValueError(
+                f"Unknown allocation key {key!r} for {pool!r}; expected one of {', '.join(ALLOCATION_KEYS)}"
+            )
+        weights = np.where(
+            operating, np.reshape(capacity, (-1, 1)) if key == 'capacity' else 1.0, 0.0
+        ) * np.ones(index.shape)
+        # Total weight operating in each calendar year, then each site year's share of that year's pool
+        total = aggregate_by_year(weights, index, n_years)
+        cost = np.broadcast_to(np.asarray(cost, dtype=float), (n_years,))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = np.where(total > 0, cost / total, 0.0)
+        allocated += weights * rate[index]
+    return allocated
+
+
+@timed()
+def portfolio_analysis(discount_rate, tax_rate, water_selling_price, params, start_years=None, shared_costs=None,
+                       allocation=None):
+    """
+    Evaluates a fleet of plants in one batch and aggregates their cash flows by calendar year.
+
+    Parameters:
+        discount_rate (float): The real discount rate of the portfolio (%). Every site is discounted to the
+            first calendar year at the matching nominal rate of its own inflation.
+        tax_rate (float or np.ndarray): The tax rate (%), a scalar or one rate per site. Shared costs are
+            deductible at the rate of the site they are charged to.
+        water_selling_price (float or np.ndarray): The water selling price ($/Gal).
+        params (dict): Parameter mapping with one array element per site, e.g. from
+            `input.scenarios.load_scenarios`. Sites that set different optional parameters are evaluated
+            apart, see `input.scenarios.parameter_groups`.
+        start_years (array-like, optional): Calendar year of each site's first construction year. Defaults
+            to the sites' 'project_year', then to `DEFAULT_START_YEAR`.
+        shared_costs (dict, optional): Yearly cost pools shared by the fleet, see `allocate_shared_costs`.
+        allocation (dict, optional): Allocation key of each pool, see `allocate_shared_costs`.
+
+    Returns:
+        dict:
+            - 'calendar_year': The calendar years.
+            - 'cash_flow': Free cash flow of the fleet in each calendar year, after shared costs ($).
+            - 'shared_cost': After-tax shared costs in each calendar year ($).
+            - 'npv': NPV of the fleet, the sum of the site values ($M).
+            - 'irr': IRR of the fleet (%), NaN where it does not exist.
+            - 'site_npv': Stand-alone NPV of each site, discounted to the first calendar year ($M).
+            - 'site_shared_cost': Present value of the after-tax shared costs charged to each site ($M).
+            - 'site_value': Value attributed to each site, its NPV less its shared costs ($M). The site
+              values add up to 'npv'.
+    """
+    shared_costs = shared_costs or {}
+    allocation = allocation or {}
+    groups = parameter_groups(params)
+    n = sum(len(rows) for rows, _ in groups)
+    tax_rate = np.broadcast_to(tax_rate, (n,))
+    water_selling_price = np.broadcast_to(water_selling_price, (n,))
+    free_cash_flow = np.empty((n, len(ANALYSIS_YEARS)))
+    nominal_rate = np.empty(n)
+    for rows, group in groups:
+        schedule = project_cash_flow_schedule(discount_rate, tax_rate[rows], water_selling_price[rows], group)
+        free_cash_flow[rows] = schedule['Free Cash Flow']
+        nominal_rate[rows] = nominal_discount_rate(discount_rate, group)
+
+    if start_years is None:
+        start_years = np.nan_to_num(params.get('project_year', DEFAULT_START_YEAR), nan=DEFAULT_START_YEAR)
+    index, calendar_years = calendar_index(np.broadcast_to(start_years, (n,)))
+    n_years = len(calendar_years)
+
+    capacity = np.broadcast_to(params['capacity'], (n,))
+    shared = allocate_shared_costs(shared_costs, allocation, capacity, index, n_years)
+    shared *= 1 - np.reshape(tax_rate, (-1, 1)) / 100
+
+    # Each site year is discounted to the first calendar year at the site's nominal rate
+    discount_factors = (1 + np.reshape(nominal_rate, (-1, 1)) / 100) ** -index
+    cash_flow = aggregate_by_year(free_cash_flow - shared, index, n_years)
+    site_npv = (free_cash_flow * discount_factors).sum(axis=1) / 1_000_000
+    site_shared_cost = (shared * discount_factors).sum(axis=1) / 1_000_000
+
+    return {
+        'calendar_year': calendar_years,
+        'cash_flow': cash_flow,
+        'shared_cost': aggregate_by_year(shared, index, n_years),
+        'npv': float((site_npv - site_shared_cost).sum()),
+        'irr': internal_rate_of_return(cash_flow),
+        'site_npv': site_npv,
+        'site_shared_cost': site_shared_cost,
+        'site_value': site_npv - site_shared_cost,
+    }
@@ -0,0 +1,125 @@
+import numpy as np
+
+from perf import timed
+
+
+def _per_scenario(value):
+    """Shapes a scenario value to broadcast against item columns: scalars stay, arrays become (1, n)."""
+    value = np.asarray(value, dtype=float)
+    return value if value.ndim == 0 else value.reshape(1, -1)
+
+
+@timed()
+def equipment_costs(items, scale=1.0, project_year=None, escalation_rate=0.0, cost_indices=None):
+    """
+    Costs every pretreatment equipment item for one or many scenarios in vectorized column operations.
+
+        cost = reference cost * (capacity * scale / reference capacity) ** exponent * escalation
+
+    Parameters:
+    ----------
+    items (dict): Equipment columns as returned by `input.pretreat.get_pretreat_equipment_items`. An item
+        without capacities or exponent keeps its reference cost; one without a base year is not escalated.
+    scale (float or np.ndarray): Multiplies each item's capacity, e.g. the plant size of a capacity sweep.
+    project_year (float or np.ndarray, optional): The year to escalate the costs to. Defaults to no escalation.
+    escalation_rate (float or np.ndarray): Yearly cost escalation (%) from the base year to the project year,
+        used when no `cost_indices` are given.
+    cost_indices (dict, optional): Maps years to a cost index such as the CEPCI. Costs are escalated by the
+        ratio of the project year's index to the base year's, interpolated between the listed years.
+
+    Returns:
+    -------
+    np.ndarray
+        The cost of each item ($): shape (items,) for scalar inputs, (items, scenarios) when any of
+        `scale`, `project_year` or `escalation_rate` is an array with one element per scenario.
+    """
+    column = {key: np.asarray(items[key], dtype=float)[:, None] for key in
+              ('cost', 'base_capacity', 'capacity', 'exponent', 'base_year')}
+    scalar = all(np.ndim(value) == 0 for value in (scale, project_year, escalation_rate))
+
+    # Six-tenths rule per item, each with its own exponent
+    size_factor = (column['capacity'] * _per_scenario(scale) / column['base_capacity']) ** column['exponent']
+    costs = column['cost'] * np.where(np.isnan(size_factor), 1.0, size_factor)
+
+    if project_year is not None:
+        project_year = _per_scenario(project_year)
+        if cost_indices:
+            years = np.array(sorted(cost_indices), dtype=float)
+            indices = np.array([cost_indices[year] for year in sorted(cost_indices)], dtype=float)
+            escalation = np.interp(project_year, years, indices) / np.interp(column['base_year'], years, indices)
+        else:
+            escalation = (1 + _per_scenario(escalation_rate) / 100) ** (project_year - column['base_year'])
+        costs = costs * np.where(np.isnan(escalation), 1.0, escalation)
+
+    return costs[:, 0] if scalar else costs
+
+
+def pretreat_capital_cost(params):
+    """
+    Returns the purchased equipment cost of pretreatment rolled into the CAPEX.
+
+    Parameters:
+    ----------
+    params (dict): Parameter mapping as returned by `get_parameters`. The 'pretreat_pec' row is used as-is
+        wherever it is set. Scenarios whose 'pretreat_pec' is 0 cost the itemized equipment instead, when
+        the mapping carries it under 'pretreat_items' (as `get_parameters` provides it), with
+        `equipment_costs` and the optional 'pretreat_scale', 'project_year', 'cost_escalation_rate' and
+        'cost_indices' entries.
+
+    Returns:
+    -------
+    float or np.ndarray
+        The pretreatment PEC ($), one per scenario when any input is an array.
+    """
+    items = params.get('pretreat_items')
+    pretreat_pec = params['pretreat_pec']
+    if items is None or not len(items['equipment']) or np.all(pretreat_pec):
+        return pretreat_pec
+    costs = equipment_costs(
+        items, params.get('pretreat_scale', 1.0), params.get('project_year'),
+        params.get('cost_escalation_rate', 0.0), params.get('cost_indices')
+    ).sum(axis=0)
+    # Chosen per scenario, so that one scenario's summary row does not switch the items off for the others
+    pec = np.where(np.asarray(pretreat_pec) == 0, costs, pretreat_pec)
+    return float(pec) if pec.ndim == 0 else pec
+
+
+def with_pretreat_items(params, items):
+    """
+    Attaches itemized pretreatment equipment to a parameter mapping, e.g. one built by hand; the readers of
+    `input.parameters` and `input.scenarios` attach the database's items themselves.
+
+    The 'pretreat_pec' row stays the default: the items only take over in the scenarios where it is 0,
+    e.g. from a workbook without the summary row or a scenario overriding 'pretreat_pec' with 0 (see
+    `pretreat_capital_cost`).
+
+    Parameters:
+    ----------
+    params (dict): Parameter mapping as returned by `get_parameters`.
+    items (dict): Equipment columns as returned by `input.pretreat.get_pretreat_equipment_items`.
+
+    Returns:
+    -------
+    dict
+        `params` itself when there are no items, otherwise a copy with the items.
+    """
+    if not len(items['equipment']):
+        return params
+    return dict(params, pretreat_items=items)
+
+
+# Example usage: checks that the itemized variant of the workbook costs the items instead of the lump sum
+if __name__ == "__main__":
+    from input.data_reader import populate_db_from_excel
+    from input.scenarios import load_scenario
+    from input.schema import BASE_SCENARIO, ITEMIZED_PRETREAT_SCENARIO
+
+    populate_db_from_excel('data/input.xlsx')
+    base = load_scenario(BASE_SCENARIO)
+    itemized = load_scenario(ITEMIZED_PRETREAT_SCENARIO)
+    items_total = float(equipment_costs(itemized['pretreat_items']).sum())
+    print(f"Lump sum: {pretreat_capital_cost(base):,.2f} $, itemized: {pretreat_capital_cost(itemized):,.2f} $ "
+          f"(items total {items_total:,.2f} $)")
+    if pretreat_capital_cost(base) != base['pretreat_pec'] or not np.isclose(pretreat_capital_cost(itemized),
+                                                                           items_total):
+        raise SystemExit("The itemized pretreatment costs do not replace the lump sum")
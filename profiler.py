@@ -0,0 +1,209 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Worker threads whose stacks are sampled alongside the profiled thread
+SAMPLED_THREAD_PREFIXES = ('tea-view',)
+
+
+class _StackSampler(threading.Thread):
+    """Background thread that periodically records the Python stacks of the profiled threads."""
+
+    def __init__(self, target_ident, interval):
+        super().__init__(name='tea-profiler', daemon=True)
+        self.target_ident = target_ident
+        self.interval = interval
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+
+    def _sampled_idents(self):
+        idents = {self.target_ident}
+        for thread in threading.enumerate():
+            if thread.name.startswith(SAMPLED_THREAD_PREFIXES):
+                idents.add(thread.ident)
+        return idents
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in self._sampled_idents():
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+                    frame = frame.f_back
+                if stack:
+                    self.samples[tuple(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+class Profile:
+    """
+    Result of one profiler capture: deterministic cProfile statistics of the profiled thread and
+    sampled stacks of that thread and the view worker threads.
+    """
+
+    def __init__(self, name, profiler, samples, interval, wall_time):
+        self.name = name
+        self._profiler = profiler
+        self.stats = pstats.Stats(profiler)
+        self.samples = samples
+        self.interval = interval
+        self.wall_time = wall_time
+
+    def stats_rows(self, limit=30, sort='cumulative'):
+        """
+        Summarizes the cProfile statistics.
+
+        Parameters:
+            limit (int): Maximum number of functions to return.
+            sort (str): Either 'cumulative' or 'tottime'.
+
+        Returns:
+            list of dict: One row per function, most expensive first.
+        """
+        key = 3 if sort == 'cumulative' else 2
+        entries = sorted(self.stats.stats.items(), key=lambda item: item[1][key], reverse=True)[:limit]
+        rows = []
+        for (filename, line, function), (primitive_calls, calls, tottime, cumtime, _) in entries:
+            rows.append({
+                'function': f"{function} ({os.path.basename(filename)}:{line})",
+                'ncalls': calls if calls == primitive_calls else f"{calls}/{primitive_calls}",
+                'tottime_s': round(tottime, 6),
+                'cumtime_s': round(cumtime, 6),
+                'percall_ms': round(cumtime * 1000 / calls, 3) if calls else 0.0,
+            })
+        return rows
+
+    def stats_text(self, limit=30, sort='cumulative'):
+        """Returns the classic pstats table as text."""
+        stream = io.StringIO()
+        pstats.Stats(self._profiler, stream=stream).sort_stats(sort).print_stats(limit)
+        return stream.getvalue()
+
+    def collapsed_stacks(self):
+        """Returns the samples in collapsed-stack format (one `frame;frame;frame count` line per stack)."""
+        lines = []
+        for stack, count in self.samples.most_common():
+            frames = ';'.join(f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack)
+            lines.append(f"{frames} {count}")
+        return '\n'.join(lines) + '\n'
+
+    def speedscope(self):
+        """Returns the samples as a speedscope 'sampled' profile (https://www.speedscope.app)."""
+        frame_index = {}
+        frames = []
+        samples = []
+        weights = []
+        for stack, count in self.samples.items():
+            indices = []
+            for name, filename, line in stack:
+                key = (name, filename, line)
+                if key not in frame_index:
+                    frame_index[key] = len(frames)
+                    frames.append({'name': name, 'file': filename, 'line': line})
+                indices.append(frame_index[key])
+            samples.append(indices)
+            weights.append(count * self.interval)
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': self.name,
+            'exporter': 'tea-profiler',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': self.name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights,
+            }],
+        }
+
+    def write(self, directory):
+        """
+        Writes the pstats dump, the speedscope JSON and the collapsed stacks into `directory`.
+
+        Returns:
+            list of str: The paths of the written files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}")
+        paths = [f"{stem}.pstats", f"{stem}.speedscope.json", f"{stem}.collapsed.txt"]
+        self.stats.dump_stats(paths[0])
+        with open(paths[1], 'w') as f:
+            json.dump(self.speedscope(), f)
+        with open(paths[2], 'w') as f:
+            f.write(self.collapsed_stacks())
+        return paths
+
+
+class _Capture:
+    """Handle yielded by `capture`; `profile` is set once the block exits."""
+
+    profile = None
+
+
+@contextmanager
+def capture(name='rerun', interval=0.005):
+    """
+    Profiles the enclosed block with cProfile and a stack sampler.
+
+    Parameters:
+        name (str): Name of the profile, used in exported file names.
+        interval (float): Sampling interval in seconds.
+
+    Yields:
+        _Capture: A handle whose `profile` attribute holds the `Profile` after the block exits.
+    """
+    handle = _Capture()
+    profiler = cProfile.Profile()
+    sampler = _StackSampler(threading.get_ident(), interval)
+    start = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        yield handle
+    finally:
+        profiler.disable()
+        sampler.stop()
+        handle.profile = Profile(name, profiler, sampler.samples, interval, time.perf_counter() - start)
+
+
+def profile_directory():
+    """Returns the directory named by the TEA_PROFILE environment variable, or None when it is not set."""
+    return os.environ.get('TEA_PROFILE') or None
+
+
+@contextmanager
+def capture_from_env(name):
+    """
+    Profiles the enclosed block when TEA_PROFILE is set and writes the results into that directory.
+
+    Intended for headless runs; yields the capture handle, or None when profiling is off.
+    """
+    directory = profile_directory()
+    if directory is None:
+        yield None
+        return
+
+    with capture(name) as handle:
+        yield handle
+    for path in handle.profile.write(directory):
+        logger.info("Wrote profile %s", path)
@@ -0,0 +1,269 @@
+import logging
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+from discounted_cash_flow import (
+    ANALYSIS_YEARS, internal_rate_of_return, levelized_cost_terms, project_cash_flow_schedule
+)
+from escalation import ESCALATION_RATES, INFLATION_RATE
+from input.connection import database_path, read_connection, read_transaction
+from input.parameters import read_pretreat_items
+from input.scenarios import parameter_groups, scenario_matrix
+from perf import timed
+
+logger = logging.getLogger(__name__)
+
+# Optional parameters whose values other than 0 put a scenario on the escalated path
+ESCALATION_PARAMETERS = (INFLATION_RATE, *ESCALATION_RATES.values())
+
+
+@lru_cache(maxsize=4096)
+def _discount_factors(nominal_rate):
+    """Yearly discount factors of a nominal rate (%), shared by every scenario and query that uses it."""
+    factors = (1 + nominal_rate / 100) ** -ANALYSIS_YEARS
+    factors.flags.writeable = False
+    return factors
+
+
+class ScenarioTable:
+    """
+    Every stored scenario evaluated once in a few vectorized batches, so SQL functions answer each row with
+    a lookup and a dot product instead of running the formula chain.
+
+    Parameters:
+        db_file_path (str, optional): The database holding the scenarios. Defaults to the configured one.
+
+    Attributes:
+        parameters (dict): Maps each parameter to its array of per-scenario values, NaN where a scenario
+            does not set an optional parameter.
+        free_cash_flow (np.ndarray): (scenarios, years) free cash flow at each scenario's own tax rate
+            and water price ($). The discount rate only enters through discounting.
+        net_cost, production (np.ndarray): (scenarios, years) terms of `levelized_cost_terms`.
+    """
+
+    @timed('sql.scenario_table')
+    def __init__(self, db_file_path=None):
+        matrix, scenario_ids, names, categories = scenario_matrix(db_file_path)
+        self.row_of = {scenario_id: row for row, scenario_id in enumerate(scenario_ids.tolist())}
+        self.row_of.update((name, row) for row, name in enumerate(names))
+
+        self.parameters = {
+            name: matrix[:, column] for column, name in enumerate(categories) if not np.isnan(matrix[:, column]).all()
+        }
+        with read_transaction(db_file_path) as conn:
+            items = read_pretreat_items(conn)
+
+        params = self.parameters
+        n = len(scenario_ids)
+        years = len(ANALYSIS_YEARS)
+        self.free_cash_flow = np.empty((n, years))
+        self.net_cost = np.empty((n, years))
+        self.production = np.empty((n, years))
+        # Scenarios are evaluated in groups that take the same path as when the dashboard evaluates each on
+        # its own: those without escalation apart from the escalating ones, and each set of optional
+        # parameters (e.g. a polarization curve) apart from the others
+        escalating = np.zeros(n, dtype=bool)
+        for name in ESCALATION_PARAMETERS:
+            escalating |= np.nan_to_num(params.get(name, 0)) != 0
+        for part in (np.flatnonzero(~escalating), np.flatnonzero(escalating)):
+            if len(part):
+                for rows, group in parameter_groups({name: values[part] for name, values in params.items()}):
+                    if items is not None:
+                        group['pretreat_items'] = items
+                    self._evaluate(part[rows], group)
+        # Python floats, so the per-row lookups skip numpy scalar arithmetic
+        self.discount_rate = params['discount_rate'].tolist()
+        self.inflation = np.nan_to_num(params.get(INFLATION_RATE, np.zeros(n))).tolist()
+        self._irr = None
+
+    def _evaluate(self, rows, params):
+        """Fills the cash flow and levelized cost terms of `rows` from one vectorized batch."""
+        schedule = project_cash_flow_schedule(
+            params['discount_rate'], params['tax_rate'], params['water_selling_price'], params
+        )
+        self.free_cash_flow[rows] = schedule['Free Cash Flow']
+        self.net_cost[rows], self.production[rows] = levelized_cost_terms(params['water_selling_price'], params)
+
+    def row(self, scenario):
+        """Returns the row of a scenario_id or name, or None for an unknown scenario."""
+        return self.row_of.get(scenario)
+
+    def discount_factors(self, row, discount_rate=None):
+        """
+        Returns the yearly discount factors of a scenario. The rate defaults to the scenario's own, and is
+        the real rate: scenarios with inflation are discounted at the matching nominal rate.
+        """
+        if discount_rate is None:
+            discount_rate = self.discount_rate[row]
+        inflation = self.inflation[row]
+        if inflation:
+            discount_rate = ((1 + discount_rate / 100) * (1 + inflation / 100) - 1) * 100
+        return _discount_factors(float(discount_rate))
+
+    def npv(self, row, discount_rate=None):
+        """Final cumulative NPV ($M) of a scenario."""
+        return float(self.free_cash_flow[row] @ self.discount_factors(row, discount_rate)) / 1_000_000
+
+    def levelized_cost(self, row, discount_rate=None):
+        """Levelized cost of ammonia ($/kg) of a scenario."""
+        discount_factors = self.discount_factors(row, discount_rate)
+        return float(self.net_cost[row] @ discount_factors) / float(self.production[row] @ discount_factors)
+
+    def irr(self, row):
+        """IRR (%) of a scenario, solved for all scenarios at once on first use; None where it does not exist."""
+        if self._irr is None:
+            self._irr = internal_rate_of_return(self.free_cash_flow)
+        irr = float(self._irr[row])
+        return None if np.isnan(irr) else irr
+
+
+class TeaFunctions:
+    """
+    The SQL functions of one connection, backed by a `ScenarioTable` that is rebuilt when the database
+    changes.
+
+    Parameters:
+        db_file_path (str, optional): The database holding the scenarios. Defaults to the configured one.
+    """
+
+    def __init__(self, db_file_path=None):
+        self.db_file_path = database_path(db_file_path)
+        self._local = threading.local()
+        self._table = None
+        self._version = None
+
+    def table(self):
+        """
+        Returns the scenario table of the current database contents.
+
+        `PRAGMA data_version` of this thread's read connection changes whenever another connection commits,
+        so checking it costs one cheap statement per call and the table is only rebuilt after a write.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = read_connection(self.db_file_path)
+        version = (id(conn), conn.execute('PRAGMA data_version').fetchone()[0])
+        if self._table is None or version != self._version:
+            self._table = ScenarioTable(self.db_file_path)
+            self._version = version
+        return self._table
+
+    def scalar(self, method):
+        """Wraps a `ScenarioTable` method as an SQL function of (scenario, *args), NULL for unknown scenarios."""
+        def function(scenario, *args):
+            table = self.table()
+            row = table.row(scenario)
+            return None if row is None else getattr(table, method)(row, *args)
+        return function
+
+    def parameter(self, scenario, name):
+        """Resolved value of a parameter of a scenario, NULL when unknown or not set."""
+        table = self.table()
+        row = table.row(scenario)
+        values = table.parameters.get(name)
+        if row is None or values is None or np.isnan(values[row]):
+            return None
+        return float(values[row])
+
+    def portfolio_irr(self):
+        """Aggregate class: IRR (%) of the summed free cash flows of the scenarios in a group."""
+        functions = self
+
+        class PortfolioIRR:
+            def __init__(self):
+                self.rows = []
+
+            def step(self, scenario):
+                row = functions.table().row(scenario)
+                if row is not None:
+                    self.rows.append(row)
+
+            def finalize(self):
+                if not self.rows:
+                    return None
+                cash_flow = functions.table().free_cash_flow[self.rows].sum(axis=0)
+                irr = internal_rate_of_return(cash_flow)
+                return None if np.isnan(irr) else irr
+
+        return PortfolioIRR
+
+    def portfolio_levelized_cost(self):
+        """Aggregate class: levelized cost ($/kg) of the pooled costs and production of a group."""
+        functions = self
+
+        class PortfolioLevelizedCost:
+            def __init__(self):
+                self.net_cost = self.production = 0.0
+
+            def step(self, scenario, discount_rate):
+                table = functions.table()
+                row = table.row(scenario)
+                if row is not None:
+                    discount_factors = table.discount_factors(row, discount_rate)
+                    self.net_cost += float(table.net_cost[row] @ discount_factors)
+                    self.production += float(table.production[row] @ discount_factors)
+
+            def finalize(self):
+                return self.net_cost / self.production if self.production else None
+
+        return PortfolioLevelizedCost
+
+
+def register_tea_functions(conn, db_file_path=None):
+    """
+    Registers the TEA model on an SQLite connection as SQL functions.
+
+    Scenarios are given by scenario_id or name; a NULL discount rate means the scenario's own, and
+    unknown scenarios give NULL. Values are those of the scenario's stored parameters (tax rate and water
+    price included), read from `db_file_path`, which must be migrated (see `input.schema`). Changes
+    committed by any connection are picked up by the next call, while uncommitted changes of `conn`
+    itself are not seen.
+
+        tea_npv(scenario [, discount_rate])        Final cumulative NPV ($M)
+        tea_lcoa(scenario [, discount_rate])       Levelized cost of ammonia ($/kg)
+        tea_irr(scenario)                          IRR of the free cash flow (%)
+        tea_parameter(scenario, name)              Resolved value of a parameter
+        tea_portfolio_irr(scenario)                Aggregate: IRR of the group's summed cash flows (%)
+        tea_portfolio_lcoa(scenario, discount_rate)  Aggregate: levelized cost of the group ($/kg)
+
+    The portfolio NPV is SUM(tea_npv(...)).
+
+    Parameters:
+        conn (sqlite3.Connection): The connection to register the functions on.
+        db_file_path (str, optional): The database holding the scenarios. Defaults to the configured one.
+
+    Returns:
+        TeaFunctions: The registered functions, holding the cached scenario table.
+
+    Example:
+        SELECT name, tea_npv(scenario_id, 8.0) AS npv, tea_lcoa(scenario_id) AS lcoa
+        FROM scenarios ORDER BY npv DESC
+    """
+    functions = TeaFunctions(db_file_path)
+    for n_args in (1, 2):
+        conn.create_function('tea_npv', n_args, functions.scalar('npv'))
+        conn.create_function('tea_lcoa', n_args, functions.scalar('levelized_cost'))
+    conn.create_function('tea_irr', 1, functions.scalar('irr'))
+    conn.create_function('tea_parameter', 2, functions.parameter)
+    conn.create_aggregate('tea_portfolio_irr', 1, functions.portfolio_irr())
+    conn.create_aggregate('tea_portfolio_lcoa', 2, functions.portfolio_levelized_cost())
+    return functions
+
+
+if __name__ == "__main__":
+    import sys
+
+    from input.connection import write_connection
+    from input.schema import migrate
+
+    # Example usage: python sql_functions.py "SELECT name, tea_npv(scenario_id) FROM scenarios"
+    query = sys.argv[1] if len(sys.argv) > 1 else (
+        "SELECT name, tea_npv(scenario_id), tea_irr(scenario_id), tea_lcoa(scenario_id) FROM scenarios"
+    )
+    with write_connection() as conn:
+        migrate(conn)
+        register_tea_functions(conn)
+        for row in conn.execute(query):
+            print(*row, sep='\t')
@@ -0,0 +1,83 @@
+"""
+Headless core of the techno-economic assessment model: parameter store, formulae and DCF.
+
+Importing `tea` is cheap. Each name below is imported from its module on first access, and the
+core never imports streamlit, plotly or pandas (only the DataFrame-returning
+`discounted_cash_flow_analysis` and the Excel reader load pandas when called), so batch workers
+start quickly:
+
+    import tea
+    params = tea.get_parameters()
+    results = tea.discounted_cash_flow_batch(params['discount_rate'], params['tax_rate'],
+                                             params['water_selling_price'], params)
+"""
+import importlib
+
+# Public name -> module that defines it
+_EXPORTS = {
+    'PARAMETER_TABLES': 'input.parameters',
+    'get_parameters': 'input.parameters',
+    'parameters_from_excel': 'input.parameters',
+    'parameters_from_tables': 'input.parameters',
+    'parameters_from_matrix': 'input.parameters',
+    'read_parameter_matrix': 'input.data_reader',
+    'load_scenario': 'input.scenarios',
+    'save_variant': 'input.scenarios',
+    'list_scenarios': 'input.scenarios',
+    'delete_scenario': 'input.scenarios',
+    'load_scenarios': 'input.scenarios',
+    'parameter_groups': 'input.scenarios',
+    'scenario_matrix': 'input.scenarios',
+    'electrolyser_formulae': 'electrolyser_calc',
+    'cell_voltage': 'electrolyser_calc',
+    'fit_polarization_curve': 'electrolyser_calc',
+    'capex_formulae': 'capex_calc',
+    'equipment_costs': 'pretreat_calc',
+    'with_pretreat_items': 'pretreat_calc',
+    'get_pretreat_equipment_items': 'input.pretreat',
+    'opex_formulae': 'opex_calc',
+    'cash_flow_formulae': 'cash_flow_calc',
+    'cash_flow_schedule': 'discounted_cash_flow',
+    'discounted_cash_flow_analysis': 'discounted_cash_flow',
+    'discounted_cash_flow_schedule': 'discounted_cash_flow',
+    'discounted_cash_flow_batch': 'discounted_cash_flow',
+    'internal_rate_of_return': 'discounted_cash_flow',
+    'project_cash_flow_schedule': 'discounted_cash_flow',
+    'financing_schedule': 'financing',
+    'financed_cash_flow_batch': 'financing',
+    'weighted_average_cost_of_capital': 'financing',
+    'escalation_factors': 'escalation',
+    'opex_by_category': 'escalation',
+    'nominal_discount_rate': 'escalation',
+    'levelized_cost_of_ammonia': 'discounted_cash_flow',
+    'levelized_cost_terms': 'discounted_cash_flow',
+    'period_cash_flow_schedule': 'periodic_cash_flow',
+    'period_cash_flow_batch': 'periodic_cash_flow',
+    'annual_rollup': 'periodic_cash_flow',
+    'optimize_current_density': 'design_optimizer',
+    'scale_parameters': 'capacity_sweep',
+    'capacity_sweep': 'capacity_sweep',
+    'learning_curve_batch': 'learning_curve',
+    'project_parameters': 'learning_curve',
+    'get_learning_curves': 'input.learning',
+    'portfolio_analysis': 'portfolio',
+    'register_tea_functions': 'sql_functions',
+    'explore_design_space': 'design_space',
+    'pareto_front': 'design_space',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    try:
+        module = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module 'tea' has no attribute '{name}'") from None
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
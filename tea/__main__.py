@@ -0,0 +1,48 @@
+"""
+Headless command-line entry point of the TEA model.
+
+    python -m tea batch scenarios.csv --out results.parquet
+    python -m tea import sites/ --db data/sites.db
+
+Runs from the repository root, like the dashboard.
+"""
+import argparse
+import sys
+
+from logging_config import configure_logging
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m tea', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    batch = subcommands.add_parser('batch', help='evaluate a table of scenarios on top of the base workbook')
+    batch.add_argument('scenarios', help='CSV or Parquet file with one scenario per row of parameter overrides')
+    batch.add_argument('--out', required=True, help='output file (.parquet for Parquet, otherwise CSV)')
+    batch.add_argument('--excel', default='data/input.xlsx', help='workbook holding the base case')
+    batch.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    batch.add_argument('--chunk-size', type=int, default=None, help='scenarios per chunk and row group')
+
+    bulk_import = subcommands.add_parser('import', help='import a directory of site workbooks into one database')
+    bulk_import.add_argument('directory', help='directory holding one workbook per site')
+    bulk_import.add_argument('--db', required=True, help='SQLite database to write')
+    bulk_import.add_argument('--workers', type=int, default=None, help='worker processes (default: CPU count)')
+    bulk_import.add_argument('--batch-size', type=int, default=None, help='workbooks per task and transaction')
+
+    args = parser.parse_args(argv)
+    configure_logging()
+
+    if args.command == 'batch':
+        from tea.batch import DEFAULT_CHUNK_SIZE, run_batch
+
+        run_batch(args.scenarios, args.out, args.excel, args.workers, args.chunk_size or DEFAULT_CHUNK_SIZE)
+    elif args.command == 'import':
+        from input.bulk_import import DEFAULT_BATCH_SIZE, import_workbook_directory
+
+        import_workbook_directory(args.directory, args.db, args.workers, args.batch_size or DEFAULT_BATCH_SIZE)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
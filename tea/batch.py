@@ -0,0 +1,174 @@
+import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from discounted_cash_flow import discounted_cash_flow_batch
+from input.parameters import PARAMETER_NAMES, parameters_from_excel
+from input.scenarios import parameter_groups
+from perf import log_memory_report, memory_stage, trace_run
+
+logger = logging.getLogger(__name__)
+
+# Metric columns written for every scenario
+RESULT_COLUMNS = ('npv', 'irr', 'capex', 'opex', 'total_revenue')
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+def evaluate_scenarios(base_parameters, overrides, n_scenarios):
+    """
+    Evaluates a block of scenarios in one vectorized pass.
+
+    Parameters:
+        base_parameters (dict): Parameter mapping of the base case, as returned by `parameters_from_excel`.
+        overrides (dict): Maps parameter names to arrays of `n_scenarios` values. NaN keeps the base value,
+            or leaves an optional parameter the base case does not set unset. Scenarios that set different
+            optional parameters are evaluated apart, see `input.scenarios.parameter_groups`.
+        n_scenarios (int): Number of scenarios in the block.
+
+    Returns:
+        dict: Maps each name in `RESULT_COLUMNS` to an array of `n_scenarios` values.
+    """
+    params = dict(base_parameters)
+    for name, values in overrides.items():
+        values = np.asarray(values, dtype=float)
+        params[name] = np.where(np.isnan(values), float(base_parameters.get(name, np.nan)), values)
+
+    results = {column: np.empty(n_scenarios) for column in RESULT_COLUMNS}
+    for rows, group in parameter_groups(params) if overrides else [(slice(None), params)]:
+        group_results = discounted_cash_flow_batch(
+            group['discount_rate'], group['tax_rate'], group['water_selling_price'], group
+        )
+        for column in RESULT_COLUMNS:
+            results[column][rows] = group_results[column]
+    return results
+
+
+def _read_scenarios(scenarios_path, chunk_size):
+    """Yields the scenario table in DataFrame chunks of at most `chunk_size` rows."""
+    import pandas as pd
+
+    if scenarios_path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(scenarios_path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(scenarios_path, chunksize=chunk_size)
+
+
+class _ResultWriter:
+    """Appends result chunks to a CSV file, or to a Parquet file with one row group per chunk."""
+
+    def __init__(self, out_path):
+        self.out_path = out_path
+        self.parquet = out_path.endswith('.parquet')
+        self._writer = None
+        self._header_written = False
+
+    def write(self, df):
+        if self.parquet:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise RuntimeError("pyarrow is required for Parquet output; use a .csv output instead") from e
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.out_path, table.schema)
+            self._writer.write_table(table)
+        else:
+            df.to_csv(self.out_path, mode='a' if self._header_written else 'w', header=not self._header_written,
+                      index=False)
+            self._header_written = True
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def _result_frame(chunk, results):
+    df = chunk.copy()
+    for column in RESULT_COLUMNS:
+        df[column] = results[column]
+    return df
+
+
+def run_batch(scenarios_path, out_path, excel_file_path='data/input.xlsx', workers=None,
+              chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Evaluates every scenario of a scenario table and streams the results to CSV or Parquet.
+
+    Parameters:
+        scenarios_path (str): CSV or Parquet file with one scenario per row. Columns named after parameters
+            (e.g. 'capacity', 'discount_rate', 'water_selling_price') override the base case, and an optional
+            'scenario_id' column is copied to the output unchanged. Any other column is rejected, so that a
+            misspelt parameter name fails the run instead of silently leaving the base value in place.
+        out_path (str): Output file; '.parquet' writes Parquet row groups, anything else writes CSV.
+        excel_file_path (str): Workbook holding the base case.
+        workers (int, optional): Worker processes. Defaults to the CPU count; 0 or 1 evaluates in this process.
+        chunk_size (int): Scenarios per vectorized evaluation and per output row group.
+
+    Returns:
+        int: Number of scenarios evaluated.
+
+    Raises:
+        ValueError: If a column is neither a parameter name nor 'scenario_id'.
+    """
+    from profiler import capture_from_env
+
+    workers = os.cpu_count() if workers is None else workers
+
+    with trace_run('batch') as trace, capture_from_env('batch'):
+        with memory_stage('data_loading'):
+            base_parameters = parameters_from_excel(excel_file_path)
+
+        writer = _ResultWriter(out_path)
+        evaluated = 0
+        try:
+            with memory_stage('evaluation'):
+                if workers > 1:
+                    evaluated = _run_in_pool(base_parameters, scenarios_path, chunk_size, workers, writer)
+                else:
+                    for chunk in _read_scenarios(scenarios_path, chunk_size):
+                        overrides = _overrides(chunk)
+                        writer.write(_result_frame(chunk, evaluate_scenarios(base_parameters, overrides, len(chunk))))
+                        evaluated += len(chunk)
+        finally:
+            writer.close()
+
+    logger.info("Evaluated %d scenarios into %s", evaluated, out_path)
+    if trace is not None:
+        logger.info("Batch trace: %s", trace.to_json(indent=None))
+        log_memory_report(trace, logger)
+    return evaluated
+
+
+def _overrides(chunk):
+    unknown = [column for column in chunk.columns if column not in PARAMETER_NAMES and column != 'scenario_id']
+    if unknown:
+        raise ValueError(f"Unknown scenario columns (not parameter names): {', '.join(unknown)}")
+    return {column: chunk[column].to_numpy(dtype=float) for column in chunk.columns if column in PARAMETER_NAMES}
+
+
+def _run_in_pool(base_parameters, scenarios_path, chunk_size, workers, writer):
+    """Evaluates chunks on worker processes, keeping at most two chunks per worker in flight."""
+    evaluated = 0
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk in _read_scenarios(scenarios_path, chunk_size):
+            pending.append((chunk, executor.submit(evaluate_scenarios, base_parameters, _overrides(chunk), len(chunk))))
+            # Results are written in input order; waiting on the oldest chunk bounds memory use
+            while len(pending) >= 2 * workers:
+                done_chunk, future = pending.popleft()
+                writer.write(_result_frame(done_chunk, future.result()))
+                evaluated += len(done_chunk)
+        while pending:
+            done_chunk, future = pending.popleft()
+            writer.write(_result_frame(done_chunk, future.result()))
+            evaluated += len(done_chunk)
+    return evaluated